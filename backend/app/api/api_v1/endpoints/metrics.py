@@ -0,0 +1,32 @@
+"""
+Prometheus scrape endpoint.
+
+GET /metrics — text exposition format, unauthenticated like a health check.
+Mounted at the root (not under /api/v1) and only when METRICS_ENABLED is set.
+"""
+import logging
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db
+from app.core.metrics import CONTENT_TYPE, REGISTRY, SCANS
+from app.models.scan import ScanJob
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+SCAN_STATUSES = ("pending", "running", "interrupted", "completed", "failed", "cancelled", "timed_out")
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(db: Session = Depends(get_db)) -> Response:
+    """Current metrics of this process, plus scan counts per status from the database."""
+    try:
+        counts = dict(db.query(ScanJob.status, func.count(ScanJob.id)).group_by(ScanJob.status).all())
+        SCANS.replace({(status,): counts.get(status, 0) for status in set(SCAN_STATUSES) | set(counts)})
+    except Exception as e:
+        logger.warning(f"Scan counts unavailable for /metrics: {e}")
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -9,8 +9,9 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.config import settings
 from app.db.session import get_db
-from app.models.scan import ScanJob, ScanResult
+from app.models.scan import ScanJob, ScanResult, ScanCheckpoint, ScanShard
 from app.models.user import User
 from app.schemas.scan import (
     ScanJob as ScanJobSchema,
@@ -18,9 +19,14 @@ from app.schemas.scan import (
     ScanJobCreate,
     ScanResult as ScanResultSchema,
     ScanResultUpdate,
+    ScanPerf as ScanPerfSchema,
+    ScanPlan as ScanPlanSchema,
     DashboardStats,
 )
 from app.scanner.engine import ScannerEngine
+from app.scanner.perf import summary as perf_summary
+from app.scanner.registry import UnknownRuleError, resolve as resolve_rules
+from app.scanner.shards import finish_sharded_scan
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -397,6 +403,14 @@ def generate_docx_report(scan: ScanJob, results: list, output_path: str):
 # ENDPOINTS
 # ---------------------------------------------------------------------------
 
+def _check_rule_selection(config: Dict[str, Any]) -> None:
+    try:
+        if not resolve_rules(config):
+            raise HTTPException(status_code=400, detail="Scan config selects no rules")
+    except UnknownRuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/", response_model=ScanJobSchema)
 def create_scan(
     *,
@@ -406,11 +420,14 @@ def create_scan(
     current_user: User = Depends(deps.get_current_active_admin),
 ) -> Any:
     logger.info(f"[DEBUG] Received scan creation request: {scan_in}")
+    _check_rule_selection(scan_in.config or {})
+
     try:
         scan = ScanJob(
             target_url=scan_in.target_url,
             spec_url=scan_in.spec_url,
             config=scan_in.config,
+            spec_content=scan_in.spec_content,
             status="pending",
         )
         db.add(scan)
@@ -418,9 +435,12 @@ def create_scan(
         db.refresh(scan)
         logger.info(f"[DEBUG] Scan created in DB with ID: {scan.id}")
 
-        scanner = ScannerEngine(db, scan.id)
-        background_tasks.add_task(scanner.run, scan_in.spec_content)
-        logger.info(f"[DEBUG] Background task scheduled for scan {scan.id}")
+        if settings.SCAN_EXECUTION_MODE == "inline":
+            scanner = ScannerEngine(db, scan.id)
+            background_tasks.add_task(scanner.run, scan_in.spec_content)
+            logger.info(f"[DEBUG] Background task scheduled for scan {scan.id}")
+        else:
+            logger.info(f"[DEBUG] Scan {scan.id} queued for a worker")
 
         return scan
     except Exception as e:
@@ -428,6 +448,97 @@ def create_scan(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/plan", response_model=ScanPlanSchema)
+async def plan_scan(
+    *,
+    db: Session = Depends(get_db),
+    scan_in: ScanJobCreate,
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Dry run: how many work units and probes a scan of this spec would run,
+    without creating the scan or sending requests to the target. Needs
+    ``spec_content`` or a loadable ``spec_url``.
+    """
+    config = scan_in.config or {}
+    _check_rule_selection(config)
+    plan = await ScannerEngine(db, None).preview_plan(scan_in.target_url, scan_in.spec_content,
+                                                      scan_in.spec_url, config)
+    if plan is None:
+        raise HTTPException(status_code=400, detail="No endpoints found in the spec")
+    return plan
+
+
+@router.post("/{scan_id}/resume", response_model=ScanJobSchema)
+def resume_scan(
+    scan_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Resume an interrupted, failed, cancelled or timed-out scan, skipping work
+    units that already completed. The scan deadline starts over.
+    """
+    scan = db.query(ScanJob).filter(ScanJob.id == scan_id).first()
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    if scan.status not in ("interrupted", "failed", "cancelled", "timed_out"):
+        raise HTTPException(
+            status_code=400,
+            detail="Only interrupted, failed, cancelled or timed-out scans can be resumed.",
+        )
+
+    scan.status = "pending"
+    scan.status_reason = None
+    scan.completed_at = None
+    scan.deadline_at = None
+    scan.cancel_requested_at = None
+    scan.attempts = 0
+    db.commit()
+    db.refresh(scan)
+
+    # In queue mode the next worker to claim the scan resumes it from its checkpoints.
+    if settings.SCAN_EXECUTION_MODE == "inline":
+        scanner = ScannerEngine(db, scan.id)
+        background_tasks.add_task(scanner.run, None, True)
+    logger.info(f"Resume scheduled for scan {scan.id}")
+    return scan
+
+
+@router.post("/{scan_id}/cancel", response_model=ScanJobSchema)
+def cancel_scan(
+    scan_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Cancel a pending or running scan. A running scan notices the request
+    within SCANNER_CANCEL_POLL_INTERVAL, stops its in-flight requests and
+    ends as ``cancelled``; findings stored so far are kept.
+    """
+    scan = db.query(ScanJob).filter(ScanJob.id == scan_id).first()
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    if scan.status not in ("pending", "running"):
+        raise HTTPException(status_code=400, detail="Only pending or running scans can be cancelled.")
+
+    scan.cancel_requested_at = datetime.utcnow()
+    if scan.status == "pending":
+        scan.status = "cancelled"
+        scan.status_reason = "Cancelled by request"
+        scan.completed_at = datetime.utcnow()
+    for shard in scan.shards:
+        if shard.status == "pending":
+            shard.status = "cancelled"
+    db.commit()
+    if scan.shard_count:
+        finish_sharded_scan(db, scan.id)
+    db.refresh(scan)
+    logger.info(f"Cancel requested for scan {scan.id} by {current_user.email}")
+    return scan
+
+
 @router.get("/dashboard/stats", response_model=DashboardStats)
 def get_dashboard_stats(
     db: Session = Depends(get_db),
@@ -556,6 +667,23 @@ def read_scan(
     return scan
 
 
+@router.get("/{scan_id}/perf", response_model=ScanPerfSchema)
+def read_scan_perf(
+    scan_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Request latency of a scan: target latency and scheduler queue wait, with
+    p50/p95/p99 and timeout counts, overall, per rule and per endpoint.
+    Recorded when the scan (or each shard) finishes.
+    """
+    scan = db.query(ScanJob).filter(ScanJob.id == scan_id).first()
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return {"scan_id": scan.id, "status": scan.status, **perf_summary(scan.perf)}
+
+
 @router.get("/{scan_id}/results", response_model=List[ScanResultSchema])
 def read_scan_results(
     scan_id: int,
@@ -564,7 +692,12 @@ def read_scan_results(
 ) -> Any:
     logger.info(f"DEBUG: Entering read_scan_results for scan_id {scan_id}")
     try:
-        results = db.query(ScanResult).filter(ScanResult.job_id == scan_id).all()
+        results = (
+            db.query(ScanResult)
+            .filter(ScanResult.job_id == scan_id)
+            .order_by(ScanResult.position, ScanResult.id)
+            .all()
+        )
         logger.info(f"[DEBUG] Retrieved {len(results)} results")
         return results
     except Exception as e:
@@ -619,7 +752,12 @@ def download_docx_report(
             detail="Report can only be generated for completed or failed scans.",
         )
 
-    results = db.query(ScanResult).filter(ScanResult.job_id == scan_id).all()
+    results = (
+        db.query(ScanResult)
+        .filter(ScanResult.job_id == scan_id)
+        .order_by(ScanResult.position, ScanResult.id)
+        .all()
+    )
 
     try:
         tmp_dir = tempfile.mkdtemp()
@@ -652,6 +790,8 @@ def delete_scan(
         raise HTTPException(status_code=404, detail="Scan not found")
 
     db.query(ScanResult).filter(ScanResult.job_id == scan_id).delete()
+    db.query(ScanCheckpoint).filter(ScanCheckpoint.job_id == scan_id).delete()
+    db.query(ScanShard).filter(ScanShard.job_id == scan_id).delete()
     db.delete(scan)
     db.commit()
     return {"detail": "Scan deleted"}
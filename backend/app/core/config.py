@@ -72,6 +72,59 @@ class Settings(BaseSettings):
     LOCKOUT_MINUTES: int = 15            # lock duration
     MIN_PASSWORD_LENGTH: int = 12
 
+    # ── Scanner ───────────────────────────────────────────────────────────────
+    SCANNER_MAX_PARALLEL_RULES: int = 8  # rules executed concurrently per scan
+    SCANNER_HTTP_MAX_CONNECTIONS: int = 100      # shared pool size per scan
+    SCANNER_HTTP_MAX_KEEPALIVE: int = 20         # idle connections kept open
+    SCANNER_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    SCANNER_HTTP_TIMEOUT: float = 5.0            # default per-request timeout
+    SCANNER_HTTP_CONNECT_TIMEOUT: float = 5.0
+    SCANNER_HTTP_PROXY: Optional[str] = None
+    SCANNER_HTTP2: bool = False                  # offer HTTP/2 (ALPN) to TLS targets; needs `h2`
+    SCANNER_MAX_IN_FLIGHT: int = 64              # requests in flight per scan
+    SCANNER_MAX_IN_FLIGHT_PER_HOST: int = 10     # requests in flight per target host
+    SCANNER_REQUESTS_PER_SECOND: float = 0       # per-host cap; 0 disables
+    # Adapt each host's in-flight limit (up to SCANNER_MAX_IN_FLIGHT_PER_HOST) to
+    # its latency and 429/503 responses, starting from SCANNER_ADAPTIVE_INITIAL_LIMIT.
+    SCANNER_ADAPTIVE_CONCURRENCY: bool = True
+    SCANNER_ADAPTIVE_INITIAL_LIMIT: int = 4
+    SCANNER_CACHE_ENABLED: bool = True           # share identical GET responses across rules
+    SCANNER_CACHE_MAX_ENTRIES: int = 4096
+    SCANNER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    SCANNER_CACHE_MAX_BODY_BYTES: int = 1024 * 1024  # larger bodies are never cached
+    SCANNER_MAX_BODY_BYTES: int = 1024 * 1024   # response body bytes a rule reads at most
+    SCANNER_FINDINGS_BATCH_SIZE: int = 500       # rows per INSERT when storing findings
+    SCANNER_CHECKPOINT_CHUNK_SIZE: int = 50      # endpoints per checkpointed work unit
+    SCANNER_SCAN_DEADLINE: float = 0             # seconds a scan may run in total; 0 = no deadline
+    SCANNER_RULE_BUDGET: float = 0               # default seconds per rule per scan; 0 = rule's own default
+    SCANNER_MAX_REQUESTS: int = 0                # requests a scan may send to the target; 0 = unlimited
+    SCANNER_CANCEL_POLL_INTERVAL: float = 2.0    # how often a running scan checks for cancel / deadline
+    SCANNER_RESUME_ON_STARTUP: bool = True       # resume scans interrupted by a restart (inline mode)
+    SCANNER_CASSETTE_DIR: str = "cassettes"      # where scans with `record_cassette` write their exchanges
+    SCANNER_CASSETTE_MAX_BODY_BYTES: int = 8 * 1024 * 1024  # response body bytes recorded per exchange
+    SCANNER_SPEC_CACHE_DIR: str = "spec-cache"   # parsed specs by content hash, plus ETag/Last-Modified per spec_url
+    SCANNER_SPEC_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # LRU-evicted above this; 0 = no spec cache
+    SCANNER_SPEC_PARSE_PROCESS_BYTES: int = 256 * 1024  # YAML specs this big are parsed in a worker process
+    SCANNER_SPEC_PARSE_WORKERS: int = 2          # spec parser processes; 0 = always parse in a thread
+
+    # ── Scan execution ────────────────────────────────────────────────────────
+    # inline: scans run as background tasks of the API process.
+    # queue:  the API only enqueues; `python -m app.worker` processes run scans.
+    SCAN_EXECUTION_MODE: str = "inline"
+    SCANNER_WORKER_CONCURRENCY: int = 2          # scans per worker process
+    SCANNER_WORKER_POLL_INTERVAL: float = 2.0    # seconds between queue polls when idle
+    SCANNER_WORKER_HEARTBEAT_INTERVAL: float = 15.0
+    SCANNER_WORKER_LEASE_TIMEOUT: float = 120.0  # heartbeat age after which a scan is requeued
+    SCANNER_WORKER_MAX_ATTEMPTS: int = 3
+    # Queue mode only: scans with more endpoints than this are split into shards
+    # that separate workers run in parallel (0 disables sharding).
+    SCANNER_SHARD_ENDPOINTS: int = 500
+    SCANNER_MAX_SHARDS: int = 16
+    SCANNER_WORKER_METRICS_PORT: int = 0         # serve a worker's /metrics on this port; 0 = off
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+    METRICS_ENABLED: bool = True                 # Prometheus text format on GET /metrics
+
 
 @lru_cache()
 def get_settings() -> Settings:
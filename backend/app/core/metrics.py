@@ -0,0 +1,248 @@
+"""
+Prometheus metrics in the text exposition format (version 0.0.4).
+
+A small in-process registry rather than a client library: counters, gauges
+and fixed-bucket histograms are plain dicts keyed by label values, each
+guarded by a lock because sync API handlers run in a threadpool. Updating a
+metric costs a dict lookup and a few additions, so metrics stay on in
+production. Labels are bounded (rule IDs, route templates, statement kinds),
+never raw URLs.
+
+Scan counts per status are read from the database when ``/metrics`` is
+scraped, so they include scans run by queue workers. Scan traffic metrics
+are kept by the process running the scan: the API in inline mode, each
+worker in queue mode (served on SCANNER_WORKER_METRICS_PORT).
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def replace(self, values: Dict[Tuple[str, ...], float]) -> None:
+        """Swap in a complete set of samples (for gauges computed at scrape time)."""
+        values = {self._key(labels): value for labels, value in values.items()}
+        with self._lock:
+            self._values = values
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # per label set: [count per bucket..., count above the last bucket, sum]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SCANS = REGISTRY.register(Gauge(
+    "apiscan_scans", "Scans by status (pending = queued, running = active), read from the database.", ["status"],
+))
+SCAN_REQUESTS = REGISTRY.register(Counter(
+    "apiscan_scan_requests_total", "Requests sent to scan targets, by rule.", ["rule"],
+))
+SCAN_REQUEST_ERRORS = REGISTRY.register(Counter(
+    "apiscan_scan_request_errors_total", "Requests to scan targets that failed with a transport error or timeout.",
+    ["rule"],
+))
+SCAN_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "apiscan_scan_request_duration_seconds", "Time until response headers for requests to scan targets.", ["rule"],
+    buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+))
+FINDINGS_INSERTED = REGISTRY.register(Counter(
+    "apiscan_findings_inserted_total", "Findings written to the database.",
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "apiscan_db_query_duration_seconds", "Database statement execution time, by statement kind.", ["statement"],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "apiscan_http_request_duration_seconds", "API request handling time, by route template.",
+    ["method", "route", "status"],
+))
+
+_STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def _statement_kind(statement: str) -> str:
+    kind = statement.lstrip()[:6].upper()
+    return kind if kind in _STATEMENT_KINDS else "OTHER"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement executed through ``engine`` into DB_QUERY_DURATION."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            DB_QUERY_DURATION.observe(time.perf_counter() - starts.pop(), _statement_kind(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        starts = exception_context.connection.info.get("metrics_query_start") \
+            if exception_context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request into HTTP_REQUEST_DURATION,
+    labelled with the matched route template (``/api/v1/scans/{scan_id}``)
+    rather than the raw path, or ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._endpoint_paths: Dict = {}
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")  # set by FastAPI's APIRoute
+        if route is not None:
+            return route.path
+        # Plain Starlette routes (e.g. the OpenAPI schema) only leave their endpoint in the scope.
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._endpoint_paths:
+            for candidate in getattr(scope.get("app"), "routes", ()):
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    self._endpoint_paths[endpoint] = candidate.path
+                    break
+            else:
+                self._endpoint_paths[endpoint] = "unmatched"
+        return self._endpoint_paths[endpoint]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope.get("method", "-"), self._route(scope), status[0],
+            )
@@ -1,10 +1,12 @@
 import os
+from typing import List
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import NullPool, StaticPool
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 _database_url = settings.DATABASE_URL
 _is_sqlite = _database_url.startswith("sqlite")
@@ -30,6 +32,8 @@ else:
         )
 
 engine = create_engine(_database_url, **_engine_kwargs)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -42,3 +46,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def missing_columns(bind, metadata) -> List[str]:
+    """``table.column`` for each model column absent from an existing table; ``create_all`` does not add them."""
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in columns)
+    return missing
@@ -6,9 +6,10 @@ from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 
-from app.api.api_v1.endpoints import login, users, scans, setup
+from app.api.api_v1.endpoints import login, users, scans, setup, metrics
 from app.core.config import settings
-from app.db.session import engine
+from app.core.metrics import MetricsMiddleware
+from app.db.session import engine, missing_columns
 from app.models import user, scan
 
 # ── App ───────────────────────────────────────────────────────────────────────
@@ -26,12 +27,45 @@ def _startup() -> None:
     try:
         user.Base.metadata.create_all(bind=engine)
         scan.Base.metadata.create_all(bind=engine)
+        missing = missing_columns(engine, scan.Base.metadata)
+        if missing:
+            logger.error(f"Database schema is out of date, missing columns: {', '.join(missing)}. "
+                         "See 'Upgrading' in CHANGELOG.md.")
         from app.initial_data import init as _init
         _init()
     except Exception as _e:
         logger.warning(f"Startup bootstrap skipped: {_e}")
 
 
+@app.on_event("startup")
+async def _resume_interrupted_scans() -> None:
+    """In inline mode scans run in-process, so any scan still 'running' was cut off by a restart."""
+    if settings.SCAN_EXECUTION_MODE != "inline" or not settings.SCANNER_RESUME_ON_STARTUP:
+        return
+    import asyncio
+    from app.db.session import SessionLocal
+    from app.scanner.engine import ScannerEngine, mark_interrupted_scans
+
+    async def _resume(scan_id: int) -> None:
+        db = SessionLocal()
+        try:
+            await ScannerEngine(db, scan_id).run(resume=True)
+        finally:
+            db.close()
+
+    db = SessionLocal()
+    try:
+        scan_ids = mark_interrupted_scans(db)
+    except Exception as _e:
+        logger.warning(f"Interrupted scan recovery skipped: {_e}")
+        return
+    finally:
+        db.close()
+    for scan_id in scan_ids:
+        logger.info(f"Resuming interrupted scan {scan_id}")
+        asyncio.create_task(_resume(scan_id))
+
+
 # ── Security headers middleware ───────────────────────────────────────────────
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next) -> Response:
@@ -61,8 +95,15 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["Authorization", "Content-Type", "Accept"],
     )
 
+# ── Metrics ───────────────────────────────────────────────────────────────────
+# Added last so it is the outermost middleware and times the full request.
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 app.include_router(login.router,  prefix=f"{settings.API_V1_STR}",        tags=["auth"])
 app.include_router(setup.router,  prefix=f"{settings.API_V1_STR}/setup",  tags=["setup"])
 app.include_router(users.router,  prefix=f"{settings.API_V1_STR}/users",  tags=["users"])
 app.include_router(scans.router,  prefix=f"{settings.API_V1_STR}/scans",  tags=["scans"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["metrics"])
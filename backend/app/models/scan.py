@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, String, JSON, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -9,19 +9,53 @@ class ScanJob(Base):
     id = Column(Integer, primary_key=True, index=True)
     target_url = Column(String) # Base URL for the API
     spec_url = Column(String, nullable=True) # URL or path to local file
-    status = Column(String, default="pending") # pending, running, completed, failed
+    status = Column(String, default="pending") # pending, running, interrupted, completed, failed, cancelled, timed_out
+    status_reason = Column(String, nullable=True) # why the scan stopped early / which rules ran out of budget
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
-    config = Column(JSON, default={}) # Auth tokens, specific rules to run
+    config = Column(JSON, default={}) # Auth tokens, rule selection (app/scanner/registry.py)
+    endpoints = Column(JSON, nullable=True) # endpoint list frozen at scan start, reused on resume
+    units_total = Column(Integer, nullable=True) # work units (rule x endpoint chunk) planned
+    spec_content = Column(JSON, nullable=True) # inline spec, kept so queue workers can run the scan
+    shard_count = Column(Integer, nullable=True) # set when the work units are split across shards
+    deadline_at = Column(DateTime, nullable=True) # scan is stopped as timed_out after this
+    cancel_requested_at = Column(DateTime, nullable=True) # set by POST /scans/{id}/cancel
+    traffic = Column(JSON, nullable=True) # request/byte/error/time counters per rule and endpoint (app/scanner/accounting.py)
+    perf = Column(JSON, nullable=True) # latency histograms per rule and endpoint (app/scanner/perf.py)
+    plan = Column(JSON, nullable=True) # planned units and probes per rule, set before any rule runs (app/scanner/planner.py)
+    baseline_scan_id = Column(Integer, nullable=True) # earlier scan an incremental rescan was diffed against
+    config_hash = Column(String, nullable=True) # spec source + result-affecting config; incremental baselines must match it
+    diff = Column(JSON, nullable=True) # endpoint diff against the baseline and what was carried forward (app/scanner/incremental.py)
+
+    # Queue lease (see app/scanner/queue.py)
+    lease_owner = Column(String, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)
     
     # Relationships
-    results = relationship("ScanResult", back_populates="job")
+    results = relationship(
+        "ScanResult",
+        back_populates="job",
+        order_by=lambda: (ScanResult.position, ScanResult.id),
+    )
+    checkpoints = relationship("ScanCheckpoint", back_populates="job", cascade="all, delete-orphan")
+    shards = relationship(
+        "ScanShard",
+        back_populates="job",
+        cascade="all, delete-orphan",
+        order_by=lambda: ScanShard.index,
+    )
+
+    @property
+    def units_done(self) -> int:
+        return len(self.checkpoints)
 
 class ScanResult(Base):
     __tablename__ = "scan_results"
 
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(Integer, ForeignKey("scan_jobs.id"))
+    position = Column(BigInteger, nullable=True) # stable ordering: rule, endpoint chunk, then order within the rule
     rule_id = Column(String)
     severity = Column(String) # high, medium, low, info
     description = Column(String)
@@ -44,5 +78,44 @@ class ScanResult(Base):
     availability = Column(String, default="")
     status = Column(String, default="Open")  # Open, In Progress, Fixed, Accepted Risk
     cvss_score = Column(String, default="")
+    carried_from_scan_id = Column(Integer, nullable=True) # scan that first reported a finding carried forward by an incremental rescan
 
     job = relationship("ScanJob", back_populates="results")
+
+
+class ScanCheckpoint(Base):
+    """A completed work unit of a scan; resumed scans skip these."""
+    __tablename__ = "scan_checkpoints"
+    __table_args__ = (UniqueConstraint("job_id", "unit", name="uq_scan_checkpoint_unit"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("scan_jobs.id"), index=True)
+    unit = Column(String) # "<rule id>#<endpoint chunk>"
+    finding_count = Column(Integer, default=0)
+    completed_at = Column(DateTime, default=datetime.utcnow)
+
+    job = relationship("ScanJob", back_populates="checkpoints")
+
+
+class ScanShard(Base):
+    """A slice of a scan's work units that a queue worker runs independently."""
+    __tablename__ = "scan_shards"
+    __table_args__ = (UniqueConstraint("job_id", "index", name="uq_scan_shard_index"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("scan_jobs.id"), index=True)
+    index = Column(Integer)
+    status = Column(String, default="pending") # pending, running, completed, failed, cancelled, timed_out
+    units_total = Column(Integer, default=0)
+    units_done = Column(Integer, default=0)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    traffic = Column(JSON, nullable=True) # this shard's counters, summed into ScanJob.traffic when the scan finishes
+    perf = Column(JSON, nullable=True) # this shard's latency histograms, merged into ScanJob.perf
+
+    # Queue lease (see app/scanner/queue.py)
+    lease_owner = Column(String, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)
+
+    job = relationship("ScanJob", back_populates="shards")
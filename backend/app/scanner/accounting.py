@@ -0,0 +1,170 @@
+"""
+Traffic accounting and request budget for a scan.
+
+``AccountingTransport`` sits between the response cache and the scheduler,
+so it sees every request that goes to the target (cache hits are free) and
+can refuse one before it waits for a scheduler slot. For each rule and each
+endpoint (``METHOD /path``) it counts requests, transport errors, response
+bytes read and seconds spent (from admission to the end of the body, so
+including time queued in the scheduler). Once the scan's request budget
+(``max_requests``, SCANNER_MAX_REQUESTS) is spent, further requests fail
+with RequestBudgetExhausted; rules treat that like any other transport
+error and the engine starts no new work units.
+
+The counters are stored on ``ScanJob.traffic`` (``ScanShard.traffic`` for
+shards, summed by the reduce step) as::
+
+    {"max_requests": 0, "budget_exhausted": false,
+     "total": {...}, "rules": {rule_id: {...}}, "endpoints": {"GET /x": {...}}}
+
+where each ``{...}`` is ``{"requests", "errors", "bytes", "seconds"}``.
+"""
+import math
+import time
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# Distinct endpoint keys kept; the rest (e.g. payloads appended to paths) are pooled.
+MAX_ENDPOINT_KEYS = 500
+OTHER_ENDPOINTS = "(other)"
+
+
+def request_budget(config: Dict, shard_count: int = 1) -> int:
+    """Requests the scan (or each of its ``shard_count`` shards) may send; 0 = unlimited."""
+    budget = int(config.get("max_requests") or settings.SCANNER_MAX_REQUESTS or 0)
+    if budget and shard_count > 1:
+        budget = math.ceil(budget / shard_count)
+    return budget
+
+
+def _counter() -> Dict:
+    return {"requests": 0, "errors": 0, "bytes": 0, "seconds": 0.0}
+
+
+def _add(into: Dict, counts: Dict) -> None:
+    for key, value in counts.items():
+        into[key] = into.get(key, 0) + value
+
+
+class RequestBudgetExhausted(httpx.TransportError):
+    """Raised instead of sending a request once the scan's request budget is spent."""
+
+
+class TrafficAccount:
+    def __init__(self, max_requests: int = 0, initial: Optional[Dict] = None):
+        self.max_requests = max(0, int(max_requests or 0))
+        initial = initial or {}
+        self.total = {**_counter(), **initial.get("total", {})}
+        self.rules: Dict[str, Dict] = {k: dict(v) for k, v in initial.get("rules", {}).items()}
+        self.endpoints: Dict[str, Dict] = {k: dict(v) for k, v in initial.get("endpoints", {}).items()}
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.max_requests) and self.total["requests"] >= self.max_requests
+
+    def _endpoint(self, endpoint: str) -> Dict:
+        counts = self.endpoints.get(endpoint)
+        if counts is None:
+            if len(self.endpoints) >= MAX_ENDPOINT_KEYS:
+                endpoint = OTHER_ENDPOINTS
+            counts = self.endpoints.setdefault(endpoint, _counter())
+        return counts
+
+    def charge(self, rule: str, endpoint: str) -> bool:
+        """Count a request about to be sent; False when the budget is already spent."""
+        if self.exhausted:
+            return False
+        for counts in (self.total, self.rules.setdefault(rule, _counter()), self._endpoint(endpoint)):
+            counts["requests"] += 1
+        return True
+
+    def record(self, rule: str, endpoint: str, nbytes: int = 0, seconds: float = 0.0,
+               error: bool = False) -> None:
+        for counts in (self.total, self.rules.setdefault(rule, _counter()), self._endpoint(endpoint)):
+            counts["bytes"] += nbytes
+            counts["seconds"] += seconds
+            counts["errors"] += int(error)
+
+    def to_dict(self) -> Dict:
+        def rounded(counts: Dict) -> Dict:
+            return {**counts, "seconds": round(counts["seconds"], 3)}
+
+        return {
+            "max_requests": self.max_requests,
+            "budget_exhausted": self.exhausted,
+            "total": rounded(self.total),
+            "rules": {k: rounded(v) for k, v in sorted(self.rules.items())},
+            "endpoints": {k: rounded(v) for k, v in sorted(self.endpoints.items())},
+        }
+
+    @staticmethod
+    def merge(parts: Iterable[Optional[Dict]]) -> Dict:
+        """Sum traffic dicts (e.g. of all shards of a scan)."""
+        merged = {"max_requests": 0, "budget_exhausted": False, "total": _counter(), "rules": {}, "endpoints": {}}
+        for part in parts:
+            if not part:
+                continue
+            merged["max_requests"] += part.get("max_requests", 0)
+            merged["budget_exhausted"] |= bool(part.get("budget_exhausted"))
+            _add(merged["total"], part.get("total", {}))
+            for section in ("rules", "endpoints"):
+                for key, counts in part.get(section, {}).items():
+                    _add(merged[section].setdefault(key, _counter()), counts)
+        return merged
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    """Counts the body bytes actually read and records the request when the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, done):
+        self._stream = stream
+        self._done = done
+        self.nbytes = 0
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self.nbytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._done is not None:
+                done, self._done = self._done, None
+                done(self.nbytes)
+
+
+class AccountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, account: TrafficAccount):
+        self._transport = transport
+        self.account = account
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        rule = request.extensions.get("scan_rule", "-")
+        endpoint = f"{request.method} {request.url.path}"
+        if not self.account.charge(rule, endpoint):
+            raise RequestBudgetExhausted(
+                f"Request budget of {self.account.max_requests} requests exhausted", request=request
+            )
+        started = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.account.record(rule, endpoint, seconds=time.monotonic() - started, error=True)
+            raise
+
+        def done(nbytes: int) -> None:
+            self.account.record(rule, endpoint, nbytes=nbytes, seconds=time.monotonic() - started)
+
+        if response.is_closed:
+            done(len(response.content))
+            return response
+        response.stream = _CountingStream(response.stream, done)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -0,0 +1,129 @@
+"""
+Bounded, streaming reads of response bodies for rules.
+
+``RuleClient.fetch`` streams a response and keeps at most ``max_bytes`` of its
+body instead of downloading it in full, so one endpoint returning a huge
+export cannot make every rule download and decode it. An optional
+BodyMatcher is fed the body chunk by chunk and stops the read as soon as one
+of its markers shows up. The result is a BoundedResponse, which behaves like
+an ``httpx.Response`` for the attributes rules use and records whether the
+body was truncated.
+"""
+import codecs
+import json
+from typing import Any, Iterable, Optional, Pattern, Union
+
+import httpx
+
+Marker = Union[str, Pattern]
+
+
+def _encoding(response: httpx.Response) -> str:
+    encoding = response.charset_encoding or "utf-8"
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return "utf-8"
+    return encoding
+
+
+class BodyMatcher:
+    """
+    Incremental search for plain-string or regex markers over a body fed in
+    text chunks. A match spanning two chunks is still found as long as it is
+    shorter than ``overlap`` characters.
+    """
+
+    def __init__(self, markers: Iterable[Marker], ignore_case: bool = False, overlap: int = 256):
+        markers = list(markers)
+        self.ignore_case = ignore_case
+        self.strings = [m.lower() if ignore_case else m for m in markers if isinstance(m, str)]
+        self.patterns = [m for m in markers if not isinstance(m, str)]
+        self.overlap = max([overlap] + [len(m) for m in self.strings])
+        self.match: Optional[str] = None
+        self._tail = ""
+
+    def feed(self, text: str) -> Optional[str]:
+        """Search the next chunk; returns the first marker text found, if any."""
+        if self.match is not None:
+            return self.match
+        window = self._tail + text
+        haystack = window.lower() if self.ignore_case else window
+        best = None
+        for marker in self.strings:
+            index = haystack.find(marker)
+            if index != -1 and (best is None or index < best[0]):
+                best = (index, window[index:index + len(marker)])
+        for pattern in self.patterns:
+            found = pattern.search(window)
+            if found and (best is None or found.start() < best[0]):
+                best = (found.start(), found.group(0))
+        if best is not None:
+            self.match = best[1]
+        self._tail = window[-self.overlap:]
+        return self.match
+
+
+class BoundedResponse:
+    """
+    A streamed response with at most ``max_bytes`` of its body read.
+    Unknown attributes (``status_code``, ``headers``, ``url`` ...) come from
+    the underlying ``httpx.Response``.
+    """
+
+    def __init__(self, response: httpx.Response, body: bytes, truncated: bool,
+                 match: Optional[str] = None, limit: Optional[int] = None):
+        self.response = response
+        self.body = body
+        self.truncated = truncated
+        self.match = match
+        self.limit = limit
+        self._text: Optional[str] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.response, name)
+
+    @property
+    def content(self) -> bytes:
+        return self.body
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.body.decode(_encoding(self.response), errors="replace")
+        return self._text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def annotate(self, details: Any) -> Any:
+        """Record in finding details that the evidence comes from a truncated body."""
+        if not self.truncated:
+            return details
+        if isinstance(details, dict):
+            return {**details, "body_truncated": True, "body_bytes_read": len(self.body)}
+        if isinstance(details, str):
+            return f"{details} (response body truncated after {len(self.body)} bytes)"
+        return details
+
+
+async def read_bounded(response: httpx.Response, max_bytes: Optional[int],
+                       matcher: Optional[BodyMatcher] = None) -> BoundedResponse:
+    """Read an open streamed response up to ``max_bytes``, or until ``matcher`` matches."""
+    decoder = codecs.getincrementaldecoder(_encoding(response))(errors="replace") if matcher is not None else None
+    chunks = []
+    size = 0
+    truncated = False
+    async for chunk in response.aiter_bytes():
+        if max_bytes is not None and size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+            truncated = True
+        chunks.append(chunk)
+        size += len(chunk)
+        if decoder is not None and matcher.feed(decoder.decode(chunk)):
+            break
+        if truncated:
+            break
+    return BoundedResponse(response, b"".join(chunks), truncated,
+                           matcher.match if matcher is not None else None, max_bytes)
+
@@ -0,0 +1,200 @@
+"""
+Scan-scoped response cache.
+
+Several rules send the same plain authenticated GET to the same URLs. The
+CachingTransport keys responses by method, URL, headers and body, serves
+repeats from memory and coalesces concurrent identical requests so only one
+of them reaches the target (single-flight).
+
+Only GET and HEAD are cached, and only responses the target meant: 408,
+425, 429 and 5xx statuses are transient, so they are passed through and
+never served to other rules. A rule that needs a fresh response every time
+(e.g. the rate-limit burst) sends ``extensions={"scan_cache": False}``.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+CACHEABLE_METHODS = {"GET", "HEAD"}
+TRANSIENT_STATUSES = {408, 425, 429}  # plus every 5xx
+# Response extensions worth keeping; others (e.g. the network stream) pin connection state.
+KEPT_EXTENSIONS = ("http_version", "reason_phrase")
+
+
+def cacheable_status(status_code: int) -> bool:
+    return status_code < 500 and status_code not in TRANSIENT_STATUSES
+
+
+class CachedResponse:
+    __slots__ = ("status_code", "headers", "content", "extensions")
+
+    def __init__(self, status_code: int, headers: List[Tuple[bytes, bytes]], content: bytes, extensions: Dict):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.extensions = extensions
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            self.status_code,
+            headers=self.headers,
+            stream=httpx.ByteStream(self.content),
+            request=request,
+            extensions=dict(self.extensions),
+        )
+
+
+class ResponseCache:
+    """Bounded LRU of raw responses plus hit/miss counters."""
+
+    def __init__(self, max_entries: int, max_bytes: int, max_body_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_body_bytes
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.total_bytes = 0
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def key_for(request: httpx.Request) -> str:
+        digest = hashlib.sha256()
+        digest.update(request.method.encode())
+        digest.update(b"\0")
+        digest.update(str(request.url).encode())
+        for name, value in sorted(request.headers.raw):
+            digest.update(b"\0" + name.lower() + b":" + value)
+        digest.update(b"\0")
+        digest.update(request.content)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        if entry.size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old.size
+        self.entries[key] = entry
+        self.total_bytes += entry.size
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "uncacheable": self.uncacheable,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+
+class _ReplayThenRest(httpx.AsyncByteStream):
+    """Body stream that yields the chunks already buffered, then the remainder."""
+
+    def __init__(self, buffered: List[bytes], rest, stream: httpx.AsyncByteStream):
+        self._buffered = buffered
+        self._rest = rest
+        self._stream = stream
+
+    async def __aiter__(self):
+        for chunk in self._buffered:
+            yield chunk
+        async for chunk in self._rest:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper serving identical GET/HEAD requests from a ResponseCache."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cache: ResponseCache):
+        self._transport = transport
+        self.cache = cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in CACHEABLE_METHODS or request.extensions.get("scan_cache") is False:
+            return await self._transport.handle_async_request(request)
+
+        key = self.cache.key_for(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.hits += 1
+            return entry.to_response(request)
+
+        pending = self.cache.inflight.get(key)
+        if pending is not None:
+            entry = await asyncio.shield(pending)
+            if entry is not None:
+                self.cache.coalesced += 1
+                return entry.to_response(request)
+            # The leader could not cache its response; fetch independently.
+            return await self._transport.handle_async_request(request)
+
+        self.cache.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.cache.inflight[key] = future
+        entry = None
+        try:
+            response = await self._transport.handle_async_request(request)
+            entry, response = await self._buffer(request, response)
+            if entry is not None:
+                self.cache.put(key, entry)
+            return response
+        finally:
+            del self.cache.inflight[key]
+            future.set_result(entry)
+
+    async def _buffer(self, request: httpx.Request, response: httpx.Response):
+        """
+        Read the body up to the cache's size limit. Larger bodies and transient
+        statuses are passed through uncached. If reading fails the response is
+        closed, so the scheduler gets its slot back.
+        """
+        if not cacheable_status(response.status_code):
+            self.cache.uncacheable += 1
+            return None, response
+        chunks: List[bytes] = []
+        size = 0
+        iterator = response.stream.__aiter__()
+        try:
+            async for chunk in iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.cache.max_body_bytes:
+                    self.cache.uncacheable += 1
+                    response.stream = _ReplayThenRest(chunks, iterator, response.stream)
+                    return None, response
+        except BaseException:
+            await response.aclose()
+            raise
+        await response.aclose()
+        extensions = {k: v for k, v in response.extensions.items() if k in KEPT_EXTENSIONS}
+        entry = CachedResponse(response.status_code, list(response.headers.raw), b"".join(chunks), extensions)
+        return entry, entry.to_response(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
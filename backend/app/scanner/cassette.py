@@ -0,0 +1,247 @@
+"""
+Record and replay of a scan's HTTP exchanges ("cassettes").
+
+RecordingTransport sits directly above the network transport and writes
+every exchange of a scan to a CassetteWriter. A request is keyed by method,
+URL scheme, path, query and a hash of its body. The host is left out, so a
+cassette recorded against ``http://127.0.0.1:8900`` replays for any target URL.
+Each response is saved with its status, headers and body; a transport error
+such as a timeout is saved as the error's name. The body of every response
+is read to the end (up to SCANNER_CASSETTE_MAX_BODY_BYTES), even when a rule
+stopped reading early, so the replay can serve any rule.
+
+ReplayTransport serves a Cassette in place of the network. The file is
+memory-mapped, and bodies are decompressed on first use and kept in a small
+LRU cache. When a key was recorded more than once (for example the
+rate-limit burst), its responses come back in recorded order and then wrap
+around. A request that is not in the cassette fails with ConnectError, as an
+unreachable target would. The same Cassette can back any number of
+ReplayTransports, so one recording can drive many runs and rule CPU cost can
+be profiled without network time.
+
+File layout:
+
+    MAGIC                 8 bytes
+    bodies                zlib-compressed, each distinct body (by SHA-256) stored once
+    index                 zlib-compressed JSON: meta, body offsets, exchanges
+    footer                index offset and length (little-endian u64) + MAGIC
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+MAGIC = b"APICAS01"
+FOOTER = struct.Struct("<QQ8s")
+BODY_CACHE_ENTRIES = 256
+
+
+def request_key(request: httpx.Request, body: bytes) -> str:
+    url = request.url
+    target = url.raw_path.decode("ascii", "replace")
+    digest = hashlib.sha256(body).hexdigest()[:16] if body else "-"
+    return f"{request.method} {url.scheme} {target} {digest}"
+
+
+class CassetteWriter:
+    def __init__(self, path: str, max_body_bytes: int, meta: Optional[Dict] = None):
+        self.path = path
+        self.max_body_bytes = max_body_bytes
+        self.meta = dict(meta or {})
+        self.exchanges: List[Dict] = []
+        self._blobs: List[Tuple[int, int, int]] = []  # (offset, compressed length, raw length)
+        self._body_ids: Dict[bytes, int] = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._partial = f"{path}.part"
+        self._file = open(self._partial, "wb")
+        self._file.write(MAGIC)
+
+    def _body_id(self, body: bytes) -> int:
+        digest = hashlib.sha256(body).digest()
+        body_id = self._body_ids.get(digest)
+        if body_id is None:
+            compressed = zlib.compress(body, 6)
+            self._blobs.append((self._file.tell(), len(compressed), len(body)))
+            self._file.write(compressed)
+            body_id = self._body_ids[digest] = len(self._blobs) - 1
+        return body_id
+
+    def add(self, key: str, status: Optional[int] = None, headers: Optional[List[Tuple[bytes, bytes]]] = None,
+            body: bytes = b"", error: Optional[str] = None) -> None:
+        if error is not None:
+            self.exchanges.append({"k": key, "x": error})
+            return
+        self.exchanges.append({
+            "k": key,
+            "s": status,
+            "h": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers or []],
+            "b": self._body_id(body),
+        })
+
+    def close(self) -> Dict:
+        """Write the index and move the finished cassette into place; returns its stats."""
+        index = zlib.compress(json.dumps({
+            "version": 1,
+            "meta": self.meta,
+            "bodies": self._blobs,
+            "exchanges": self.exchanges,
+        }, separators=(",", ":")).encode(), 6)
+        offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(FOOTER.pack(offset, len(index), MAGIC))
+        self._file.close()
+        os.replace(self._partial, self.path)
+        return self.stats()
+
+    def stats(self) -> Dict:
+        return {
+            "exchanges": len(self.exchanges),
+            "bodies": len(self._blobs),
+            "body_bytes": sum(raw for _, _, raw in self._blobs),
+            "stored_bytes": sum(length for _, length, _ in self._blobs),
+        }
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes the body through and records it once closed, reading whatever the rule left unread."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, max_bytes: int, done):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._max_bytes = max_bytes
+        self._done = done
+        self._chunks: List[bytes] = []
+        self._size = 0
+
+    def _keep(self, chunk: bytes) -> None:
+        if self._size < self._max_bytes:
+            chunk = chunk[:self._max_bytes - self._size]
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+
+    async def __aiter__(self):
+        async for chunk in self._iterator:
+            self._keep(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        if self._done is None:
+            return
+        done, self._done = self._done, None
+        try:
+            async for chunk in self._iterator:
+                self._keep(chunk)
+                if self._size >= self._max_bytes:
+                    break
+        except httpx.HTTPError:
+            pass
+        finally:
+            await self._stream.aclose()
+            done(b"".join(self._chunks))
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, writer: CassetteWriter):
+        self._transport = transport
+        self.writer = writer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request, await request.aread())
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError as exc:
+            self.writer.add(key, error=type(exc).__name__)
+            raise
+        status, headers = response.status_code, list(response.headers.raw)
+        if response.is_closed:
+            self.writer.add(key, status, headers, response.content[:self.writer.max_body_bytes])
+            return response
+        response.stream = _RecordingStream(
+            response.stream, self.writer.max_body_bytes,
+            lambda body: self.writer.add(key, status, headers, body),
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class Cassette:
+    """A recorded cassette, memory-mapped for replay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset, length, magic = FOOTER.unpack(self._map[-FOOTER.size:])
+        if self._map[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a scan cassette")
+        index = json.loads(zlib.decompress(self._map[offset:offset + length]))
+        self.meta: Dict = index["meta"]
+        self._blobs: List[List[int]] = index["bodies"]
+        self.exchanges: List[Dict] = index["exchanges"]
+        self.by_key: Dict[str, List[int]] = {}
+        for position, exchange in enumerate(self.exchanges):
+            self.by_key.setdefault(exchange["k"], []).append(position)
+        self._bodies: "OrderedDict[int, bytes]" = OrderedDict()
+
+    def body(self, body_id: int) -> bytes:
+        body = self._bodies.get(body_id)
+        if body is not None:
+            self._bodies.move_to_end(body_id)
+            return body
+        offset, length, _ = self._blobs[body_id]
+        body = zlib.decompress(self._map[offset:offset + length])
+        self._bodies[body_id] = body
+        if len(self._bodies) > BODY_CACHE_ENTRIES:
+            self._bodies.popitem(last=False)
+        return body
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Network stand-in serving the responses of a Cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._served: Dict[str, int] = {}
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request, await request.aread())
+        positions = self.cassette.by_key.get(key)
+        if not positions:
+            self.misses += 1
+            raise httpx.ConnectError(f"No recorded response for {request.method} {request.url}", request=request)
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        exchange = self.cassette.exchanges[positions[served % len(positions)]]
+        if "x" in exchange:
+            error = getattr(httpx, exchange["x"], None)
+            if not (isinstance(error, type) and issubclass(error, httpx.TransportError)):
+                error = httpx.TransportError
+            raise error(f"Recorded {exchange['x']}", request=request)
+        return httpx.Response(
+            exchange["s"],
+            headers=[(k.encode("latin-1"), v.encode("latin-1")) for k, v in exchange["h"]],
+            content=self.cassette.body(exchange["b"]),
+            request=request,
+            extensions={"http_version": b"HTTP/1.1"},
+        )
@@ -0,0 +1,101 @@
+"""
+Endpoint classification, done once per scan.
+
+When a scan freezes its endpoint list, every endpoint gets ``tags``:
+
+    file-serving   serves or loads files (PATH-TRAV-001)
+    url-accepting  fetches, proxies or calls back to URLs (SSRF-001)
+    admin          administrative functions (BFLA-001)
+    auth           login and token issuing (JWT-001)
+    payment        money-moving business flows (BUSINESS-LOGIC)
+    id-bearing     has a path parameter or a numeric ID segment (BOLA-IDOR)
+    sensitive      auth, admin, payment or account data; scanned first (app/scanner/priority.py)
+
+Rules filter endpoints by tag instead of matching keywords themselves.
+
+All tags come from one precompiled regex, run once over the lowercased
+path. It is a lookahead at every position, so overlapping keywords are all
+seen. Each keyword maps to its own tags plus those of any keyword that is
+its prefix. An endpoint gets a tag exactly when the path contains one of
+the tag's keywords. Adding a tag or keyword only grows the tables below.
+"""
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+TAG_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "file-serving": (
+        "/file", "/download", "/static", "/media", "/resource",
+        "/template", "/load", "/include", "/view", "/read",
+        "/export", "/report", "/attachment",
+    ),
+    "url-accepting": (
+        "/fetch", "/proxy", "/redirect", "/url", "/webhook",
+        "/callback", "/load", "/download", "/import", "/request",
+    ),
+    "admin": (
+        "/admin", "/manage", "/internal", "/console",
+        "/config", "/settings", "/superuser", "/staff",
+    ),
+    "auth": ("/login", "/auth", "/token", "/signin", "/oauth"),
+    "payment": ("transfer", "payment", "checkout", "order", "purchase", "withdraw", "deposit"),
+    "sensitive": (
+        "auth", "login", "logout", "token", "session", "oauth", "password", "passwd", "credential", "admin",
+        "internal", "pay", "checkout", "billing", "invoice", "card", "refund", "transfer", "wallet", "account",
+    ),
+}
+
+# Tags matched by pattern rather than keyword; patterns must not start like any keyword
+TAG_PATTERNS: Dict[str, str] = {
+    "id-bearing": r"\{[^}/]*\}|/\d+(?=/|$)",
+}
+
+
+def _build():
+    tags_of: Dict[str, set] = {}
+    for tag, keywords in TAG_KEYWORDS.items():
+        for keyword in keywords:
+            tags_of.setdefault(keyword.lower(), set()).add(tag)
+    # The longest keyword at a position wins the alternation, so it also carries its prefixes' tags
+    keyword_tags = {
+        keyword: frozenset(tag for other, tags in tags_of.items() if keyword.startswith(other) for tag in tags)
+        for keyword in tags_of
+    }
+    pattern_groups = {f"p{i}": tag for i, tag in enumerate(TAG_PATTERNS)}
+    keywords = "|".join(re.escape(keyword) for keyword in sorted(keyword_tags, key=len, reverse=True))
+    alternatives = [f"(?P<{group}>{TAG_PATTERNS[tag]})" for group, tag in pattern_groups.items()]
+    matcher = re.compile("(?=(?:" + "|".join(alternatives + [f"(?P<kw>{keywords})"]) + "))")
+    return matcher, keyword_tags, pattern_groups
+
+
+MATCHER, _KEYWORD_TAGS, _PATTERN_TAGS = _build()
+
+
+def classify(path: str) -> List[str]:
+    """The tags of an endpoint path, sorted."""
+    tags = set()
+    for match in MATCHER.finditer(path.lower()):
+        group = match.lastgroup
+        if group == "kw":
+            tags |= _KEYWORD_TAGS[match.group("kw")]
+        else:
+            tags.add(_PATTERN_TAGS[group])
+    return sorted(tags)
+
+
+def classify_endpoints(endpoints: List[Dict]) -> List[Dict]:
+    """Set ``tags`` on every endpoint; returns ``endpoints``."""
+    for endpoint in endpoints:
+        endpoint['tags'] = classify(endpoint.get('path') or "")
+    return endpoints
+
+
+def endpoint_tags(endpoint: Dict) -> FrozenSet[str]:
+    """An endpoint's tags, classifying it now if the scan did not (e.g. a rule run on its own)."""
+    tags = endpoint.get('tags')
+    if tags is None:
+        tags = endpoint['tags'] = classify(endpoint.get('path') or "")
+    return frozenset(tags)
+
+
+def tagged(endpoints: List[Dict], tag: str) -> List[Dict]:
+    return [endpoint for endpoint in endpoints if tag in endpoint_tags(endpoint)]
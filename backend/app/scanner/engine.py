@@ -1,82 +1,143 @@
 from sqlalchemy.orm import Session
-from app.models.scan import ScanJob, ScanResult
-from datetime import datetime
+from app.core.config import settings
+from app.models.scan import ScanJob, ScanResult, ScanShard
+from app.scanner.accounting import TrafficAccount, request_budget
+from app.scanner.cassette import CassetteWriter
+from app.scanner.classify import classify_endpoints
+from app.scanner.findings import FindingWriter, unit_position
+from app.scanner.incremental import (
+    carried_rows, carried_rules, config_hash, diff_endpoints, endpoint_key, find_baseline, finished_rules,
+    hash_endpoints, summarize,
+)
+from app.scanner.http import build_scan_client, build_response_cache, build_scheduler, ConnectionStats
+from app.scanner.perf import ScanPerf
+from app.scanner.planner import Probe, ProbeExecutor, plan_summary, probe_demand
+from app.scanner.priority import order_endpoints, order_units
+from app.scanner.registry import load_rules
+from app.scanner.spec import SpecResolver, parse_document_async
+from app.scanner.spec_cache import SpecCache, build_spec_cache, content_digest
+from app.scanner.shards import shard_count_for, shard_of, ensure_shards, finish_sharded_scan
+from app.scanner.rules.base import BaseRule, ProbeRule
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, List, Dict, Optional, NamedTuple, Set
+from collections import deque
+from contextlib import asynccontextmanager
+from sqlalchemy import update
 import asyncio
+import logging
+import os
 import httpx
-import yaml
-import json
-from app.scanner.rules.security_headers import SecurityHeadersRule
-from app.scanner.rules.auth_checks import AuthRequiredRule
-from app.scanner.rules.rate_limit import RateLimitRule
-from app.scanner.rules.injection import InjectionRule
-from app.scanner.rules.sensitive_data import SensitiveDataRule
-from app.scanner.rules.bola import BolaRule
-from app.scanner.rules.openapi_contract import OpenAPIContractRule
-from app.scanner.rules.deserialization import DeserializationRule
-from app.scanner.rules.fuzzing import FuzzingRule
-from app.scanner.rules.business_logic import BusinessLogicRule
-from app.scanner.rules.cors_check import CORSCheckRule
-from app.scanner.rules.html_injection import HTMLInjectionRule
-from app.scanner.rules.jwt_security import JWTSecurityRule
-from app.scanner.rules.ssrf_check import SSRFCheckRule
-from app.scanner.rules.mass_assignment import MassAssignmentRule
-from app.scanner.rules.broken_function_auth import BrokenFunctionAuthRule
-from app.scanner.rules.path_traversal import PathTraversalRule
-from app.scanner.rules.cookie_security import CookieSecurityRule
-from app.scanner.rules.tls_enforcement import TLSEnforcementRule
-from app.scanner.rules.fingerprint_headers import FingerprintHeadersRule
+
+logger = logging.getLogger(__name__)
+
+
+class WorkUnit(NamedTuple):
+    """One rule run over one chunk of endpoints; the unit of concurrency and checkpointing."""
+    key: str
+    rule_index: int
+    rule: BaseRule
+    chunk_index: int
+    endpoints: List[Dict]
+    probes: Optional[List[Probe]] = None  # planned requests of a ProbeRule; None for rules that send their own
+
+    @property
+    def position(self) -> int:
+        return unit_position(self.rule_index, self.chunk_index)
+
+
+class RuleSetChanged(ValueError):
+    """The selected rules no longer match the rule order a scan froze in its plan."""
+
+
+def mark_interrupted_scans(db: Session) -> List[int]:
+    """
+    Flag scans left in ``running`` by a previous process as ``interrupted``.
+    Only safe when a single process runs scans.
+    """
+    scans = db.query(ScanJob).filter(ScanJob.status == "running").all()
+    for scan in scans:
+        scan.status = "interrupted"
+    db.commit()
+    return [scan.id for scan in scans]
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
 
 class ScannerEngine:
-    def __init__(self, db: Session, scan_id: int):
+    def __init__(self, db: Session, scan_id: int, max_parallel_rules: Optional[int] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cassette: Optional[CassetteWriter] = None):
         self.db = db
         self.scan_id = scan_id
-        self.rules = [
-            SecurityHeadersRule(),
-            AuthRequiredRule(),
-            RateLimitRule(),
-            InjectionRule(),
-            SensitiveDataRule(),
-            BolaRule(),
-            OpenAPIContractRule(),
-            DeserializationRule(),
-            FuzzingRule(),
-            BusinessLogicRule(),
-            CORSCheckRule(),
-            HTMLInjectionRule(),
-            JWTSecurityRule(),
-            SSRFCheckRule(),
-            MassAssignmentRule(),
-            BrokenFunctionAuthRule(),
-            PathTraversalRule(),
-            CookieSecurityRule(),
-            TLSEnforcementRule(),
-            FingerprintHeadersRule(),
-        ]
+        self.max_parallel_rules = max_parallel_rules or settings.SCANNER_MAX_PARALLEL_RULES
+        self.transport = transport
+        self.cassette = cassette
+        self.over_budget: Set[str] = set()
+        self._rule_started: Dict[str, float] = {}
+        self.traffic: Optional[TrafficAccount] = None
+        self.perf: Optional[ScanPerf] = None
+        self.probes: Optional[ProbeExecutor] = None
+        self.spec: Optional[SpecResolver] = None
+        # Loaded from the registry by select_rules() once the scan config is known.
+        self.rules: Optional[List[BaseRule]] = None
 
     async def fetch_spec(self, url: str):
+        """
+        Load and parse the spec at ``url`` (HTTP(S) or a local path), through
+        the spec cache: URLs are fetched with conditional GETs, and content
+        that was parsed before is not parsed again. Reading, parsing and cache
+        lookups run off the event loop, so a large spec doesn't stall the scans
+        sharing it.
+        """
+        cache = build_spec_cache()
         if url.startswith("http"):
             try:
-                async with httpx.AsyncClient(verify=False) as client:
-                    resp = await client.get(url)
-                    try:
-                        return resp.json()
-                    except:
-                        return yaml.safe_load(resp.text)
+                async with httpx.AsyncClient(verify=False, transport=self.transport) as client:
+                    headers = cache.conditional_headers(url) if cache is not None else {}
+                    resp = await client.get(url, headers=headers)
+                    if resp.status_code == 304:
+                        digest = cache.validators(url).get("digest", "") if cache is not None else ""
+                        spec = await asyncio.to_thread(cache.get, digest) if cache is not None else None
+                        if spec is not None:
+                            logger.debug(f"Spec {url} not modified; using cached parse")
+                            return spec
+                        resp = await client.get(url)
+                # Only a 200 is the spec; an error page that happens to parse must not be cached under its hash
+                stored = cache if resp.status_code == 200 else None
+                spec, digest = await self.parse_spec(resp.content, stored, resp.headers.get("content-type"), url)
+                if stored is not None and spec is not None:
+                    cache.remember(url, digest, resp.headers.get("etag"), resp.headers.get("last-modified"))
+                return spec
             except Exception:
                 return None
         else:
             # Local file reading if it's a path
             try:
-                with open(url, 'r') as f:
-                    content = f.read()
-                    try:
-                        return json.loads(content)
-                    except:
-                        return yaml.safe_load(content)
+                content = await asyncio.to_thread(_read_file, url)
             except Exception:
                 return None
+            return (await self.parse_spec(content, cache, None, url))[0]
 
-        return None
+    async def parse_spec(self, content: bytes, cache: Optional[SpecCache] = None,
+                         content_type: Optional[str] = None, name: Optional[str] = None):
+        """
+        Parse spec bytes with the one parser ``spec_format`` picks for them,
+        off the event loop; returns (spec or None, content digest).
+        """
+        digest = content_digest(content)
+        spec = await asyncio.to_thread(cache.get, digest) if cache is not None else None
+        if spec is not None:
+            return spec, digest
+        try:
+            spec = await parse_document_async(content, content_type, name)
+        except Exception:
+            return None, digest
+        if cache is not None and isinstance(spec, dict):
+            await asyncio.to_thread(cache.put, digest, spec)
+        return spec, digest
 
     def parse_endpoints(self, spec: dict):
         endpoints = []
@@ -91,7 +152,7 @@ class ScannerEngine:
                     })
         return endpoints
 
-    async def discover_endpoints(self, target_url: str):
+    async def discover_endpoints(self, target_url: str, client: httpx.AsyncClient):
         """Probes common paths to find valid endpoints."""
         common_paths = [
             "/", "/api", "/api/v1", "/health", "/status", 
@@ -101,16 +162,15 @@ class ScannerEngine:
             "/api/scans", "/api/jobs"
         ]
         discovered = []
-        
-        async with httpx.AsyncClient(verify=False, timeout=5.0) as client:
-            tasks = []
-            for path in common_paths:
-                tasks.append(self._check_path(client, target_url, path))
-            
-            results = await asyncio.gather(*tasks)
-            for res in results:
-                if res:
-                    discovered.append(res)
+
+        tasks = []
+        for path in common_paths:
+            tasks.append(self._check_path(client, target_url, path))
+
+        results = await asyncio.gather(*tasks)
+        for res in results:
+            if res:
+                discovered.append(res)
         return discovered
 
     async def _check_path(self, client, base_url, path):
@@ -129,64 +189,478 @@ class ScannerEngine:
             pass
         return None
 
-    async def run(self, spec_content: dict = None):
+    def select_rules(self, config: Dict) -> List[BaseRule]:
+        """The rules this scan runs; only the selected rule modules are imported."""
+        if self.rules is None:
+            self.rules = load_rules(config)
+        return self.rules
+
+    def rule_slots(self, scan: ScanJob, frozen: bool) -> Dict[str, int]:
+        """
+        Each selected rule's slot in finding and checkpoint positions
+        (app/scanner/findings.py). A scan freezes its rule order in
+        ``ScanJob.plan``; resumed runs and shards (``frozen``) reuse it, so a
+        slot always means the same rule. RuleSetChanged when the selected
+        rules differ from the frozen ones.
+        """
+        selected = [rule.id for rule in self.rules]
+        order = (scan.plan or {}).get("rule_order") if frozen else None
+        if order is None:
+            order = selected
+        elif sorted(order) != sorted(selected):
+            added = sorted(set(selected) - set(order))
+            removed = sorted(set(order) - set(selected))
+            raise RuleSetChanged(f"Rules changed since the scan was planned (added: {', '.join(added) or '-'}; "
+                                 f"removed: {', '.join(removed) or '-'})")
+        return {rule_id: slot for slot, rule_id in enumerate(order)}
+
+    def plan_units(self, endpoints: List[Dict], chunk_size: int, target_url: str = "",
+                   config: Optional[Dict] = None, carried: Optional[Set[str]] = None,
+                   slots: Optional[Dict[str, int]] = None) -> List[WorkUnit]:
+        """
+        Split the scan into work units. Endpoint-scoped rules get one unit per
+        ``chunk_size`` endpoints, sensitive endpoints first; every other rule
+        sees the full list, in spec order, in one unit.
+        Units of ProbeRules carry the probes they will send (app/scanner/planner.py).
+        Endpoint-scoped rules in ``carried`` skip endpoints marked ``unchanged``
+        by an incremental rescan (app/scanner/incremental.py).
+        ``slots`` maps rule IDs to their position slot (``rule_slots``); by default, their index.
+        """
+        chunk_size = max(1, chunk_size)
+        config = config or {}
+        carried = carried or set()
+        slots = slots or {rule.id: index for index, rule in enumerate(self.rules)}
+        units = []
+
+        def unit(index: int, rule: BaseRule, chunk_index: int, chunk: List[Dict]) -> WorkUnit:
+            probes = rule.plan(target_url, chunk, config) if isinstance(rule, ProbeRule) else None
+            return WorkUnit(f"{rule.id}#{chunk_index}", index, rule, chunk_index, chunk, probes)
+
+        for rule in self.rules:
+            index = slots[rule.id]
+            rule_endpoints = endpoints
+            if rule.endpoint_scoped and rule.id in carried:
+                rule_endpoints = [endpoint for endpoint in endpoints if not endpoint.get('unchanged')]
+                if not rule_endpoints:
+                    continue
+            if rule.endpoint_scoped and len(rule_endpoints) > chunk_size:
+                rule_endpoints = order_endpoints(rule_endpoints, config)
+                for chunk_index, start in enumerate(range(0, len(rule_endpoints), chunk_size)):
+                    units.append(unit(index, rule, chunk_index, rule_endpoints[start:start + chunk_size]))
+            else:
+                units.append(unit(index, rule, 0, rule_endpoints))
+        return units
+
+    async def _run_rule(self, unit: WorkUnit, target_url: str, config: Dict,
+                        client: httpx.AsyncClient) -> List[Dict]:
+        if unit.probes is None:
+            return await unit.rule.run(target_url, unit.endpoints, config, client=client)
+        results = await self.probes.fetch_all(unit.probes, unit.rule.id)
+        return unit.rule.analyze(target_url, unit.endpoints, config, results)
+
+    async def _run_unit(self, unit: WorkUnit, target_url: str, config: Dict, client: httpx.AsyncClient,
+                        writer: FindingWriter, shard_id: Optional[int] = None) -> int:
+        """
+        Run a single work unit, isolating the scan from any exception its rule
+        raises, and persist its findings and checkpoint as soon as it finishes.
+        """
+        if self.traffic is not None and self.traffic.exhausted:
+            logger.debug(f"Request budget exhausted; skipping unit {unit.key}")
+            return 0
+        budget_left = self.rule_budget_left(unit.rule, config)
+        if budget_left is not None and budget_left <= 0:
+            self.over_budget.add(unit.rule.id)
+            logger.warning(f"Rule {unit.rule.id} is out of time budget; skipping unit {unit.key}")
+            return 0
+        try:
+            findings = await asyncio.wait_for(
+                self._run_rule(unit, target_url, config, client), budget_left
+            )
+        except asyncio.TimeoutError:
+            self.over_budget.add(unit.rule.id)
+            logger.warning(f"Rule {unit.rule.id} ran out of time budget on unit {unit.key}")
+            return 0
+        except Exception as e:
+            logger.warning(f"Rule {unit.rule.id} failed on unit {unit.key}: {e}", exc_info=True)
+            return 0
+        stored = writer.write(unit.position, findings, unit=unit.key)
+        if shard_id is not None:
+            self.db.execute(
+                update(ScanShard)
+                .where(ScanShard.id == shard_id)
+                .values(units_done=ScanShard.units_done + 1)
+            )
+            self.db.commit()
+        return stored
+
+    async def run_units(self, units: List[WorkUnit], target_url: str, config: Dict,
+                        client: httpx.AsyncClient, writer: FindingWriter,
+                        shard_id: Optional[int] = None) -> List[int]:
+        """
+        Run work units concurrently, at most ``max_parallel_rules`` at a time,
+        starting them in priority order (app/scanner/priority.py). Returns the
+        number of findings stored per unit, in the same order as ``units``.
+        """
+        limit = max(1, int(config.get('max_parallel_rules') or self.max_parallel_rules))
+        self.probes = ProbeExecutor(client, *probe_demand(unit.probes for unit in units))
+        pending = deque(order_units(units, config))
+        stored = [0] * len(units)
+
+        async def worker() -> None:
+            while pending:
+                index = pending.popleft()
+                stored[index] = await self._run_unit(units[index], target_url, config, client, writer, shard_id)
+
+        await asyncio.gather(*(worker() for _ in range(min(limit, len(units)))))
+        if self.probes.sent:
+            logger.info(f"Scan {self.scan_id}: {self.probes.sent} probes sent, {self.probes.shared} shared between units")
+        return stored
+
+    def cassette_writer(self, config: Dict, name: str) -> Optional[CassetteWriter]:
+        """
+        The cassette to record this run into: the one given to the engine, or
+        ``SCANNER_CASSETTE_DIR/<name>.cassette`` when the scan config sets
+        ``record_cassette``. A resumed scan re-records only what it still runs.
+        """
+        if self.cassette is not None:
+            return self.cassette
+        if not config.get('record_cassette'):
+            return None
+        path = os.path.join(settings.SCANNER_CASSETTE_DIR, f"{name}.cassette")
+        return CassetteWriter(path, settings.SCANNER_CASSETTE_MAX_BODY_BYTES, meta={"scan_id": self.scan_id})
+
+    @asynccontextmanager
+    async def open_client(self, config: Dict, traffic: Optional[TrafficAccount] = None,
+                          perf: Optional[ScanPerf] = None,
+                          cassette: Optional[CassetteWriter] = None) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Open the shared scan client, counting its traffic into ``traffic``,
+        its latencies into ``perf`` and recording its exchanges into
+        ``cassette``; log its connection, cache and scheduler counters on close.
+        """
+        cache = build_response_cache(config)
+        scheduler = build_scheduler(config)
+        connections = ConnectionStats()
+        self.traffic = traffic
+        self.perf = perf
+        try:
+            async with build_scan_client(config, transport=self.transport, scheduler=scheduler, cache=cache,
+                                         connection_stats=connections, traffic=traffic, perf=perf,
+                                         recorder=cassette) as client:
+                yield client
+        finally:
+            if cassette is not None:
+                logger.info(f"Scan {self.scan_id} cassette {cassette.path}: {cassette.close()}")
+            logger.info(f"Scan {self.scan_id} connections: {connections.stats()}")
+            if traffic is not None:
+                logger.info(f"Scan {self.scan_id} traffic: {traffic.total}")
+            if perf is not None:
+                logger.info(f"Scan {self.scan_id} latency: {perf.latency.summary()}, "
+                            f"queue wait: {perf.queue.summary()}")
+            if cache is not None:
+                logger.info(f"Scan {self.scan_id} response cache: {cache.stats()}")
+            if scheduler.controllers:
+                logger.info(f"Scan {self.scan_id} adaptive concurrency: {scheduler.stats()}")
+
+    def rule_budget_left(self, rule: BaseRule, config: Dict) -> Optional[float]:
+        """
+        Seconds the rule may still run in this process, counted from its first
+        unit, or None when it has no budget. Budgets come from the scan's
+        ``rule_budgets`` / ``rule_budget`` config, SCANNER_RULE_BUDGET, then the
+        rule's own ``time_budget``.
+        """
+        budget = (config.get('rule_budgets') or {}).get(rule.id) or config.get('rule_budget') \
+            or settings.SCANNER_RULE_BUDGET or rule.time_budget
+        if not budget:
+            return None
+        now = asyncio.get_running_loop().time()
+        started = self._rule_started.setdefault(rule.id, now)
+        return float(budget) - (now - started)
+
+    def cancel_requested(self) -> bool:
+        return self.db.query(ScanJob.cancel_requested_at).filter(
+            ScanJob.id == self.scan_id
+        ).scalar() is not None
+
+    async def supervise(self, work: Awaitable, deadline_at: Optional[datetime]) -> Optional[str]:
+        """
+        Await ``work`` until it finishes, the scan is cancelled through the API
+        or its deadline passes, checking every SCANNER_CANCEL_POLL_INTERVAL.
+        Returns None if the work finished, else "cancelled" or "timed_out";
+        the work is cancelled in-flight, units already stored are kept.
+        """
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                timeout = settings.SCANNER_CANCEL_POLL_INTERVAL
+                if deadline_at is not None:
+                    timeout = min(timeout, max(0.0, (deadline_at - datetime.utcnow()).total_seconds()))
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+                if done:
+                    task.result()
+                    return None
+                if self.cancel_requested():
+                    outcome = "cancelled"
+                elif deadline_at is not None and datetime.utcnow() >= deadline_at:
+                    outcome = "timed_out"
+                else:
+                    continue
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return outcome
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def pending_units(self, units: List[WorkUnit], writer: FindingWriter) -> List[WorkUnit]:
+        """Drop checkpointed units and discard partial findings of the others."""
+        done = writer.completed_units()
+        remaining = [unit for unit in units if unit.key not in done]
+        for unit in remaining:
+            writer.discard_unit(unit.position)
+        return remaining
+
+    def diff_against_baseline(self, scan: ScanJob, endpoints: List[Dict]) -> None:
+        """
+        Mark the endpoints unchanged since the target's baseline scan and
+        record which rules skip them (app/scanner/incremental.py).
+        """
+        baseline = find_baseline(self.db, scan)
+        if baseline is None:
+            logger.info(f"Scan {self.scan_id}: no baseline scan of {scan.target_url} "
+                        f"with the same config; scanning every endpoint")
+            return
+        diff = diff_endpoints(endpoints, baseline.endpoints)
+        for endpoint in endpoints:
+            if endpoint_key(endpoint) in diff.unchanged:
+                endpoint['unchanged'] = True
+        scoped = {rule.id for rule in self.rules if rule.endpoint_scoped}
+        scan.baseline_scan_id = baseline.id
+        scan.diff = summarize(baseline, diff, scoped & finished_rules(self.db, baseline))
+        logger.info(f"Scan {self.scan_id}: {len(diff.added)} added, {len(diff.changed)} changed, "
+                    f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged endpoints since scan {baseline.id}")
+
+    def carry_findings(self, scan: ScanJob, writer: FindingWriter) -> int:
+        """
+        Copy the baseline's findings on unchanged endpoints into this scan.
+        Copies left by an interrupted run are replaced, so this is safe to repeat.
+        """
+        self.db.query(ScanResult).filter(
+            ScanResult.job_id == scan.id, ScanResult.carried_from_scan_id.isnot(None)
+        ).delete(synchronize_session=False)
+        rows = carried_rows(self.db, scan, self.rule_slots(scan, frozen=True))
+        writer.write_rows(rows)
+        scan.diff = {**scan.diff, "carried_findings": len(rows)}
+        self.db.commit()
+        return len(rows)
+
+    async def load_spec(self, scan: ScanJob, spec_content: Optional[dict]) -> Optional[dict]:
+        """
+        The scan's spec (inline, or fetched from ``spec_url``). It also becomes
+        the SpecResolver behind ``self.spec``, with remote referenced documents prefetched.
+        """
+        if spec_content:
+            logger.debug(f"Scan {self.scan_id}: using provided spec content")
+            spec, location = spec_content, None
+        elif scan.spec_url:
+            spec, location = await self.fetch_spec(scan.spec_url), scan.spec_url
+        else:
+            return None
+        if isinstance(spec, dict):
+            self.spec = SpecResolver(spec, location)
+            if location and location.startswith("http"):
+                await self.spec.prefetch(self.fetch_spec)
+        return spec
+
+    async def prepare_spec(self, scan: ScanJob, spec_content: Optional[dict]) -> None:
+        """Give rules that read the spec its resolver, loading the spec if this run hasn't."""
+        needing = [rule for rule in self.rules if rule.needs_spec]
+        if not needing:
+            return
+        if self.spec is None:
+            await self.load_spec(scan, spec_content or scan.spec_content)
+        for rule in needing:
+            rule.spec = self.spec
+
+    async def load_endpoints(self, scan: ScanJob, spec_content: Optional[dict],
+                             client: httpx.AsyncClient) -> List[Dict]:
+        endpoints = []
+        spec = await self.load_spec(scan, spec_content)
+        if spec:
+            endpoints = self.parse_endpoints(spec)
+
+        # If no endpoints found from spec, use heuristic discovery
+        if not endpoints:
+            endpoints = await self.discover_endpoints(scan.target_url, client)
+
+        # If still no endpoints, add root at least
+        if not endpoints:
+             endpoints = [{'path': '/', 'method': 'GET', 'details': {'description': 'Fallback root'}}]
+        return endpoints
+
+    async def preview_plan(self, target_url: str, spec_content: Optional[dict], spec_url: Optional[str],
+                           config: Dict) -> Optional[Dict]:
+        """
+        Plan a scan without running it: the ``plan_summary`` a scan of this
+        spec would start with. None when the spec can't be loaded, since
+        heuristic discovery would have to send requests.
+        """
+        spec = spec_content or (await self.fetch_spec(spec_url) if spec_url else None)
+        endpoints = classify_endpoints(self.parse_endpoints(spec) if isinstance(spec, dict) else [])
+        if not endpoints:
+            return None
+        self.select_rules(config)
+        return plan_summary(self.plan_units(endpoints, settings.SCANNER_CHECKPOINT_CHUNK_SIZE, target_url, config),
+                            [rule.id for rule in self.rules])
+
+    async def run(self, spec_content: dict = None, resume: bool = False):
+        """
+        Run the scan. With ``resume=True`` the endpoint list frozen by the
+        earlier run is reused, checkpointed units are skipped and their stored
+        findings kept, and partial findings of unfinished units are discarded.
+        """
         scan = self.db.query(ScanJob).filter(ScanJob.id == self.scan_id).first()
-        if not scan:
+        if not scan or scan.cancel_requested_at is not None:
             return
         
         scan.status = "running"
+        config = scan.config or {}
+        deadline = config.get('deadline_seconds') or settings.SCANNER_SCAN_DEADLINE
+        if deadline and scan.deadline_at is None:
+            scan.deadline_at = datetime.utcnow() + timedelta(seconds=float(deadline))
         self.db.commit()
         
+        traffic = TrafficAccount(request_budget(config), initial=scan.traffic if resume else None)
+        perf = ScanPerf(scan.perf if resume else None)
         try:
-            endpoints = []
-            if spec_content:
-                print(f"[DEBUG] Using provided spec content directly")
-                endpoints = self.parse_endpoints(spec_content)
-            elif scan.spec_url:
-                spec = await self.fetch_spec(scan.spec_url)
-                if spec:
-                    endpoints = self.parse_endpoints(spec)
-            
-            # If no endpoints found from spec, use heuristic discovery
-            if not endpoints:
-                endpoints = await self.discover_endpoints(scan.target_url)
-            
-            # If still no endpoints, add root at least
-            if not endpoints:
-                 endpoints = [{'path': '/', 'method': 'GET', 'details': {'description': 'Fallback root'}}]
-
-            for rule in self.rules:
-                findings = await rule.run(scan.target_url, endpoints, scan.config or {})
-                for finding in findings:
-                    result = ScanResult(
-                        job_id=self.scan_id,
-                        rule_id=finding['rule_id'],
-                        severity=finding['severity'],
-                        description=finding['description'],
-                        details=finding['details'],
-                        endpoint=finding['endpoint'],
-                        method=finding['method'],
-                        # Metadata
-                        impact=finding.get('impact'),
-                        remediation=finding.get('remediation'),
-                        proof_of_concept=finding.get('proof_of_concept'),
-                        cvss_vector=finding.get('cvss_vector'),
-                        attack_vector=finding.get('attack_vector'),
-                        attack_complexity=finding.get('attack_complexity'),
-                        privileges_required=finding.get('privileges_required'),
-                        user_interaction=finding.get('user_interaction'),
-                        scope=finding.get('scope'),
-                        confidentiality=finding.get('confidentiality'),
-                        integrity=finding.get('integrity'),
-                        availability=finding.get('availability')
+            self.select_rules(config)
+            slots = self.rule_slots(scan, frozen=resume)
+            writer = FindingWriter(self.db, self.scan_id, settings.SCANNER_FINDINGS_BATCH_SIZE)
+            async with self.open_client(config, traffic, perf,
+                                        self.cassette_writer(config, f"scan-{self.scan_id}")) as client:
+                if resume and scan.endpoints:
+                    endpoints = scan.endpoints
+                else:
+                    endpoints = classify_endpoints(
+                        await self.load_endpoints(scan, spec_content or scan.spec_content, client)
                     )
-                    self.db.add(result)
-            
-            scan.status = "completed"
+                    try:
+                        hash_endpoints(endpoints, self.spec)
+                    except Exception as e:  # hashes only serve incremental rescans; a full scan runs without them
+                        logger.warning(f"Scan {self.scan_id}: cannot hash endpoints, scanning every endpoint: {e}")
+                        for endpoint in endpoints:
+                            endpoint.pop('hash', None)
+                    scan.config_hash = config_hash(scan)
+                    if config.get('incremental') and all('hash' in endpoint for endpoint in endpoints):
+                        self.diff_against_baseline(scan, endpoints)
+                    scan.endpoints = endpoints
+
+                await self.prepare_spec(scan, spec_content)
+                units = self.plan_units(endpoints, settings.SCANNER_CHECKPOINT_CHUNK_SIZE, scan.target_url, config,
+                                        carried_rules(scan), slots)
+                scan.units_total = len(units)
+                scan.plan = plan_summary(units, sorted(slots, key=slots.get))
+                self.db.commit()
+                if scan.diff:
+                    self.carry_findings(scan, writer)
+
+                shard_count = shard_count_for(scan, len(endpoints), config)
+                if shard_count > 1:
+                    ensure_shards(self.db, scan, shard_count, units)
+                    logger.info(f"Scan {self.scan_id}: {len(units)} units split into {shard_count} shards")
+                    return
+
+                if resume:
+                    total = len(units)
+                    units = self.pending_units(units, writer)
+                    logger.info(f"Resuming scan {self.scan_id}: {total - len(units)} units done, {len(units)} remaining")
+
+                outcome = await self.supervise(
+                    self.run_units(units, scan.target_url, config, client, writer), scan.deadline_at
+                )
+
+            scan.status = outcome or "completed"
+            scan.traffic = traffic.to_dict()
+            scan.perf = perf.to_dict()
+            if outcome == "cancelled":
+                scan.status_reason = "Cancelled by request"
+            elif outcome == "timed_out":
+                scan.status_reason = f"Scan deadline ({scan.deadline_at:%Y-%m-%d %H:%M:%S} UTC) reached"
+            elif traffic.exhausted:
+                scan.status_reason = f"Request budget of {traffic.max_requests} requests exhausted"
+            elif self.over_budget:
+                scan.status_reason = f"Time budget exhausted for: {', '.join(sorted(self.over_budget))}"
             scan.completed_at = datetime.utcnow()
             self.db.commit()
+            if outcome:
+                logger.info(f"Scan {self.scan_id} stopped early: {scan.status_reason}")
+        except RuleSetChanged as e:
+            # Positions of this scan's findings and checkpoints belong to the frozen rule order
+            scan.status = "failed"
+            scan.status_reason = f"Cannot resume: {e}"
+            scan.completed_at = datetime.utcnow()
+            self.db.commit()
+            logger.error(f"Scan {self.scan_id} not resumed: {e}")
         except Exception as e:
             scan.status = "failed"
+            scan.traffic = traffic.to_dict()
+            scan.perf = perf.to_dict()
             scan.completed_at = datetime.utcnow()
             self.db.commit()
-            print(f"Scan failed: {e}")
+            logger.error(f"Scan {self.scan_id} failed: {e}", exc_info=True)
+
+    async def run_shard(self, shard_id: int):
+        """
+        Run one shard of a sharded scan: the work units assigned to it that
+        have no checkpoint yet. The last shard to finish completes the scan.
+        """
+        shard = self.db.query(ScanShard).filter(ScanShard.id == shard_id).first()
+        if not shard:
+            return
+        scan = shard.job
+        self.scan_id = scan.id
+        shard.started_at = shard.started_at or datetime.utcnow()
+        self.db.commit()
+
+        try:
+            config = scan.config or {}
+            self.select_rules(config)
+            await self.prepare_spec(scan, None)
+            writer = FindingWriter(self.db, scan.id, settings.SCANNER_FINDINGS_BATCH_SIZE)
+            slots = self.rule_slots(scan, frozen=True)
+            units = [
+                unit for unit in self.plan_units(scan.endpoints or [], settings.SCANNER_CHECKPOINT_CHUNK_SIZE,
+                                                 scan.target_url, config, carried_rules(scan), slots)
+                if shard_of(unit, scan.shard_count) == shard.index
+            ]
+            remaining = self.pending_units(units, writer)
+            shard.units_total = len(units)
+            shard.units_done = len(units) - len(remaining)
+            self.db.commit()
+
+            traffic = TrafficAccount(request_budget(config, scan.shard_count), initial=shard.traffic)
+            cassette = self.cassette_writer(config, f"scan-{scan.id}-shard-{shard.index}")
+            async with self.open_client(config, traffic, ScanPerf(shard.perf), cassette) as client:
+                outcome = await self.supervise(
+                    self.run_units(remaining, scan.target_url, config, client, writer, shard_id=shard.id),
+                    scan.deadline_at,
+                )
+            shard.status = outcome or "completed"
+            if traffic.exhausted:
+                logger.info(f"Shard {shard.index} of scan {scan.id}: request budget exhausted")
+            if self.over_budget:
+                logger.info(f"Shard {shard.index} of scan {scan.id}: time budget exhausted for "
+                            f"{', '.join(sorted(self.over_budget))}")
+        except Exception as e:
+            shard.status = "failed"
+            logger.error(f"Shard {shard.index} of scan {scan.id} failed: {e}", exc_info=True)
+
+        if self.traffic is not None:
+            shard.traffic = self.traffic.to_dict()
+        if self.perf is not None:
+            shard.perf = self.perf.to_dict()
+        shard.completed_at = datetime.utcnow()
+        shard.lease_owner = None
+        shard.heartbeat_at = None
+        self.db.commit()
+        finish_sharded_scan(self.db, scan.id)
@@ -0,0 +1,233 @@
+"""
+Scan-scoped HTTP client.
+
+The engine opens one pooled ``httpx.AsyncClient`` per scan and hands it to
+every rule, so connections (and TLS sessions) to the target are reused across
+rules instead of each rule paying its own handshakes. All traffic on that
+client is admitted through the scan's RequestScheduler, behind a response
+cache that collapses identical GETs from different rules. Requests that get
+past the cache are counted per rule and endpoint by the scan's TrafficAccount,
+and client event hooks feed the scan's latency histograms (ScanPerf).
+
+With ``http2`` enabled (SCANNER_HTTP2 or the per-scan ``http2`` key) the client
+offers HTTP/2 via ALPN on TLS targets and multiplexes rule requests as streams
+over a few connections; targets that only negotiate HTTP/1.1, and plain
+``http://`` targets, keep using HTTP/1.1. ConnectionStats reports which
+protocol was used and how many requests each connection carried.
+"""
+import logging
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, Optional, Any
+
+import httpx
+from httpx import USE_CLIENT_DEFAULT
+
+from app.core.config import settings
+from app.scanner.accounting import AccountingTransport, TrafficAccount
+from app.scanner.body import BodyMatcher, BoundedResponse, read_bounded
+from app.scanner.cache import CachingTransport, ResponseCache
+from app.scanner.cassette import CassetteWriter, RecordingTransport
+from app.scanner.perf import PerfTransport, ScanPerf
+from app.scanner.scheduler import RequestScheduler, SchedulingTransport
+
+logger = logging.getLogger(__name__)
+
+
+def build_scheduler(config: Dict) -> RequestScheduler:
+    """Build the request scheduler for a scan from settings and per-scan overrides."""
+    return RequestScheduler(
+        max_in_flight=config.get("max_in_flight") or settings.SCANNER_MAX_IN_FLIGHT,
+        max_in_flight_per_host=config.get("max_in_flight_per_host") or settings.SCANNER_MAX_IN_FLIGHT_PER_HOST,
+        requests_per_second=float(config.get("requests_per_second") or settings.SCANNER_REQUESTS_PER_SECOND),
+        adaptive=bool(config.get("adaptive_concurrency", settings.SCANNER_ADAPTIVE_CONCURRENCY)),
+        adaptive_initial_limit=settings.SCANNER_ADAPTIVE_INITIAL_LIMIT,
+    )
+
+
+def build_response_cache(config: Dict) -> Optional[ResponseCache]:
+    """Build the response cache for a scan, or None when disabled."""
+    if not config.get("response_cache", settings.SCANNER_CACHE_ENABLED):
+        return None
+    return ResponseCache(
+        max_entries=settings.SCANNER_CACHE_MAX_ENTRIES,
+        max_bytes=settings.SCANNER_CACHE_MAX_BYTES,
+        max_body_bytes=settings.SCANNER_CACHE_MAX_BODY_BYTES,
+    )
+
+
+class ConnectionStats:
+    """Requests per HTTP version and per connection (HTTP/2 streams or HTTP/1.1 keep-alive reuse)."""
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.requests_per_connection: Dict[int, int] = {}
+        # Keep each connection's stream object so its id() is never reused for another one.
+        self._connections: Dict[int, Any] = {}
+
+    def record(self, response: httpx.Response) -> None:
+        version = response.extensions.get("http_version", b"HTTP/1.1")
+        if isinstance(version, bytes):
+            version = version.decode("ascii", "replace")
+        self.versions[version] = self.versions.get(version, 0) + 1
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            key = id(stream)
+            self._connections.setdefault(key, stream)
+            self.requests_per_connection[key] = self.requests_per_connection.get(key, 0) + 1
+
+    def stats(self) -> Dict:
+        counts = sorted(self.requests_per_connection.values(), reverse=True)
+        return {
+            "http_versions": dict(self.versions),
+            "connections": len(counts),
+            "max_streams_per_connection": counts[0] if counts else 0,
+            "avg_streams_per_connection": round(sum(counts) / len(counts), 1) if counts else 0,
+        }
+
+
+class ConnectionStatsTransport(httpx.AsyncBaseTransport):
+    """Innermost wrapper: records the protocol and connection of every network response."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: ConnectionStats):
+        self._transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self._transport.handle_async_request(request)
+        self.stats.record(response)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def build_network_transport(config: Dict, limits: httpx.Limits) -> httpx.AsyncHTTPTransport:
+    """Connection pool to the target, with HTTP/2 offered when enabled and available."""
+    kwargs: Dict[str, Any] = {
+        "verify": bool(config.get("verify_tls", False)),
+        "limits": limits,
+        "proxy": config.get("proxy") or settings.SCANNER_HTTP_PROXY,
+    }
+    if config.get("http2", settings.SCANNER_HTTP2):
+        try:
+            return httpx.AsyncHTTPTransport(http2=True, **kwargs)
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+    return httpx.AsyncHTTPTransport(**kwargs)
+
+
+def build_scan_client(config: Dict, transport: Optional[httpx.AsyncBaseTransport] = None,
+                      scheduler: Optional[RequestScheduler] = None,
+                      cache: Optional[ResponseCache] = None,
+                      connection_stats: Optional[ConnectionStats] = None,
+                      traffic: Optional[TrafficAccount] = None,
+                      perf: Optional[ScanPerf] = None,
+                      recorder: Optional[CassetteWriter] = None) -> httpx.AsyncClient:
+    """
+    Build the shared client for a scan.
+    config: Scan configuration; honours ``verify_tls``, ``proxy``, ``timeout`` and ``http2``.
+    transport: Optional network transport override (tests, cassette replay).
+    scheduler: Request scheduler; one is built from ``config`` when omitted.
+    cache: Response cache layered above the scheduler; None disables caching.
+    connection_stats: Collects per-connection / protocol counters when given.
+    traffic: Counts traffic per rule / endpoint and enforces its request budget when given.
+    perf: Records latency histograms through event hooks when given.
+    recorder: Records every network exchange into a cassette when given.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.SCANNER_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SCANNER_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SCANNER_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        config.get("timeout") or settings.SCANNER_HTTP_TIMEOUT,
+        connect=settings.SCANNER_HTTP_CONNECT_TIMEOUT,
+    )
+    if transport is None:
+        transport = build_network_transport(config, limits)
+    if recorder is not None:
+        transport = RecordingTransport(transport, recorder)
+    if connection_stats is not None:
+        transport = ConnectionStatsTransport(transport, connection_stats)
+    transport = SchedulingTransport(transport, scheduler or build_scheduler(config))
+    if traffic is not None:
+        transport = AccountingTransport(transport, traffic)
+    if cache is not None:
+        transport = CachingTransport(transport, cache)
+    if perf is not None:
+        transport = PerfTransport(transport, perf)
+    kwargs: Dict[str, Any] = {
+        "transport": transport,
+        "timeout": timeout,
+        "follow_redirects": False,
+        # Rules used to get a fresh cookie jar each; never let Set-Cookie from
+        # one rule leak into another rule's requests on the shared client.
+        "cookies": CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    }
+    if perf is not None:
+        kwargs["event_hooks"] = perf.event_hooks()
+    return httpx.AsyncClient(**kwargs)
+
+
+class RuleClient:
+    """
+    Per-rule view of the shared scan client.
+
+    Applies the rule's default headers and timeout to every request while the
+    underlying connection pool stays shared. Headers passed on a request are
+    merged over the rule defaults, and each request is tagged with the rule ID
+    so the scheduler can queue fairly between rules. ``fetch`` reads bodies
+    through a bounded stream capped at ``max_body_bytes``.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, headers: Optional[Dict[str, str]] = None,
+                 timeout: Any = USE_CLIENT_DEFAULT, rule_id: str = "-",
+                 max_body_bytes: Optional[int] = None):
+        self.client = client
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.rule_id = rule_id
+        self.max_body_bytes = max_body_bytes or settings.SCANNER_MAX_BODY_BYTES
+
+    def _prepare(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        headers = dict(self.headers)
+        headers.update(kwargs.pop("headers", None) or {})
+        kwargs["headers"] = headers
+        kwargs.setdefault("timeout", self.timeout)
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions.setdefault("scan_rule", self.rule_id)
+        kwargs["extensions"] = extensions
+        return kwargs
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self.client.request(method, url, **self._prepare(kwargs))
+
+    async def fetch(self, method: str, url: str, matcher: Optional[BodyMatcher] = None,
+                    max_bytes: Optional[int] = None, **kwargs) -> BoundedResponse:
+        """
+        Send a request and stream at most ``max_bytes`` (default: the rule's
+        cap) of the body, stopping early once ``matcher`` finds a marker.
+        """
+        async with self.client.stream(method, url, **self._prepare(kwargs)) as response:
+            return await read_bounded(response, max_bytes or self.max_body_bytes, matcher)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("HEAD", url, **kwargs)
+
+    async def options(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("OPTIONS", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
@@ -0,0 +1,189 @@
+"""
+Incremental rescans: scan only what changed since the target's last scan.
+
+Every endpoint frozen by a scan carries ``hash``, a digest of its method,
+path and operation definition, including every schema the operation
+reaches through ``$ref``s. A scan with ``"incremental": true`` in its config
+diffs its endpoints against the target's most recent completed scan, its
+baseline:
+
+- Endpoint-scoped rules that finished every unit in the baseline scan only
+  added and changed endpoints. Unchanged endpoints are marked
+  ``unchanged`` in ``ScanJob.endpoints``, so resumed and sharded runs plan
+  the same units.
+- Those rules' baseline findings on unchanged endpoints are copied into the
+  new scan, with ``carried_from_scan_id`` set to the scan that first
+  reported them.
+- Every other rule (new to this scan, cut short in the baseline, or looking
+  at the whole API) scans everything, as in a full scan.
+
+A baseline is the latest scan of the same ``target_url`` that completed
+without stopping early (no ``status_reason``), with the same
+``config_hash``: the spec source and every config key that can change
+findings (auth, body limits, TLS, proxy, ...). Keys that only change how
+fast or how long a scan runs, or which rules run, are left out; rules are
+matched one by one above. Without a baseline the scan is a full scan.
+``ScanJob.diff`` summarises the diff.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.scan import ScanCheckpoint, ScanJob, ScanResult
+from app.scanner.findings import CHUNK_SHIFT, RULE_SHIFT, unit_position
+from app.scanner.spec import SpecResolver
+
+CARRIED_CHUNK = (1 << (RULE_SHIFT - CHUNK_SHIFT)) - 1  # chunk slot of carried findings, after every real chunk
+
+EndpointKey = Tuple[str, str]  # (METHOD, path)
+
+# Config keys that do not change which findings a rule reports, so scans differing only in these can share a baseline
+NEUTRAL_CONFIG_KEYS = frozenset({
+    "incremental", "rules", "rule_categories", "rule_tags", "exclude_rules", "rule_priorities", "priority_paths",
+    "max_parallel_rules", "max_in_flight", "max_in_flight_per_host", "requests_per_second", "adaptive_concurrency",
+    "response_cache", "http2", "record_cassette", "deadline_seconds", "rule_budget", "rule_budgets", "max_requests",
+    "shard_endpoints",
+})
+
+
+def endpoint_key(endpoint: Dict) -> EndpointKey:
+    return (endpoint.get('method') or "").upper(), endpoint.get('path') or ""
+
+
+def _string_keys(node: Any) -> Any:
+    """``node`` with every mapping key a string, as JSON (and the spec cache) would store it."""
+    if isinstance(node, dict):
+        return {str(key): _string_keys(value) for key, value in node.items()}
+    if isinstance(node, (list, tuple)):
+        return [_string_keys(item) for item in node]
+    return node
+
+
+def _canonical(node: Any) -> bytes:
+    # YAML gives unquoted status codes int keys next to "default"; sort_keys cannot compare those
+    return json.dumps(_string_keys(node), sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def hash_endpoints(endpoints: List[Dict], resolver: Optional[SpecResolver] = None) -> None:
+    """Set ``hash`` on every endpoint. Referenced schemas are part of the hash, so editing one changes every operation using it."""
+    digests: Dict[int, bytes] = {}  # per referenced node; the spec keeps the nodes alive
+
+    def digest(node: Any) -> bytes:
+        key = id(node)
+        if key not in digests:
+            digests[key] = hashlib.sha256(_canonical(node)).digest()
+        return digests[key]
+
+    for endpoint in endpoints:
+        h = hashlib.sha256()
+        method, path = endpoint_key(endpoint)
+        details = endpoint.get('details')
+        h.update(f"{method} {path}\n".encode())
+        h.update(_canonical(details))
+        if resolver is not None:
+            for ref, target in sorted(resolver.referenced(details), key=lambda pair: pair[0]):
+                h.update(ref.encode())
+                h.update(digest(target))
+        endpoint['hash'] = h.hexdigest()
+
+
+class SpecDiff(NamedTuple):
+    added: List[EndpointKey]
+    changed: List[EndpointKey]
+    removed: List[EndpointKey]
+    unchanged: Set[EndpointKey]
+
+
+def diff_endpoints(endpoints: List[Dict], previous: List[Dict]) -> SpecDiff:
+    before = {endpoint_key(e): e.get('hash') for e in previous}
+    added, changed, unchanged = [], [], set()
+    for endpoint in endpoints:
+        key = endpoint_key(endpoint)
+        if key not in before:
+            added.append(key)
+        elif before[key] is None or before[key] != endpoint.get('hash'):
+            changed.append(key)
+        else:
+            unchanged.add(key)
+    current = {endpoint_key(e) for e in endpoints}
+    return SpecDiff(added, changed, [key for key in before if key not in current], unchanged)
+
+
+def config_hash(scan: ScanJob) -> str:
+    """Digest of the scan's spec source and result-affecting config (see NEUTRAL_CONFIG_KEYS)."""
+    config = {key: value for key, value in (scan.config or {}).items() if key not in NEUTRAL_CONFIG_KEYS}
+    return hashlib.sha256(_canonical({"spec_url": scan.spec_url, "config": config})).hexdigest()
+
+
+def find_baseline(db: Session, scan: ScanJob) -> Optional[ScanJob]:
+    """The target's latest scan before ``scan`` with the same config hash that completed in full and recorded endpoint hashes."""
+    if scan.config_hash is None:
+        return None
+    baseline = (
+        db.query(ScanJob)
+        .filter(ScanJob.target_url == scan.target_url, ScanJob.id != scan.id, ScanJob.status == "completed",
+                ScanJob.status_reason.is_(None), ScanJob.config_hash == scan.config_hash)
+        .order_by(ScanJob.id.desc())
+        .first()
+    )
+    if baseline is None or not baseline.endpoints or not all('hash' in e for e in baseline.endpoints):
+        return None
+    return baseline
+
+
+def finished_rules(db: Session, baseline: ScanJob) -> Set[str]:
+    """Rules whose every planned unit reached its checkpoint in ``baseline``."""
+    done: Dict[str, int] = {}
+    for (unit,) in db.query(ScanCheckpoint.unit).filter(ScanCheckpoint.job_id == baseline.id):
+        rule_id = unit.rpartition("#")[0]
+        done[rule_id] = done.get(rule_id, 0) + 1
+    planned = (baseline.plan or {}).get("rules") or {}
+    return {rule_id for rule_id, entry in planned.items() if done.get(rule_id, 0) >= entry.get("units", 0)}
+
+
+def carried_rules(scan: ScanJob) -> Set[str]:
+    """Rule IDs that skip the endpoints marked ``unchanged`` in this scan."""
+    return set((scan.diff or {}).get("carried_rules") or [])
+
+
+def carried_rows(db: Session, scan: ScanJob, rule_indexes: Dict[str, int]) -> List[Dict]:
+    """The baseline findings carried into ``scan``, as ScanResult rows for the FindingWriter."""
+    baseline_id = (scan.diff or {}).get("baseline_scan_id")
+    rules = carried_rules(scan) & set(rule_indexes)
+    if baseline_id is None or not rules:
+        return []
+    unchanged = {endpoint_key(e) for e in scan.endpoints or [] if e.get('unchanged')}
+    columns = [c.key for c in ScanResult.__table__.columns if c.key not in ("id", "job_id", "position")]
+    counts: Dict[str, int] = {}
+    rows = []
+    query = (
+        db.query(ScanResult)
+        .filter(ScanResult.job_id == baseline_id, ScanResult.rule_id.in_(rules))
+        .order_by(ScanResult.position, ScanResult.id)
+    )
+    for result in query:
+        if ((result.method or "").upper(), result.endpoint) not in unchanged:
+            continue
+        index = counts[result.rule_id] = counts.get(result.rule_id, 0) + 1
+        row = {column: getattr(result, column) for column in columns}
+        row.update({
+            "job_id": scan.id,
+            "position": unit_position(rule_indexes[result.rule_id], CARRIED_CHUNK) + index - 1,
+            "carried_from_scan_id": result.carried_from_scan_id or baseline_id,
+        })
+        rows.append(row)
+    return rows
+
+
+def summarize(baseline: ScanJob, diff: SpecDiff, rules: Iterable[str]) -> Dict:
+    return {
+        "baseline_scan_id": baseline.id,
+        "added": len(diff.added),
+        "changed": len(diff.changed),
+        "removed": len(diff.removed),
+        "unchanged": len(diff.unchanged),
+        "carried_rules": sorted(rules),
+        "carried_findings": 0,
+    }
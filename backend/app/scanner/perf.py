@@ -0,0 +1,216 @@
+"""
+Per-scan latency histograms.
+
+Event hooks on the scan client time every request from the moment a rule
+sends it until the response headers arrive. SchedulingTransport stamps the
+moment a request is admitted (``scan_sent_at``), so the time splits into:
+
+  queue wait: waiting for the scheduler (concurrency limits, rate limit,
+              Retry-After pauses); high values mean our limits are the bottleneck
+  latency:    time the target took to answer; high values mean a slow target
+
+Responses served by the response cache were never admitted and are only
+counted as cache hits. Requests that time out before any response have no
+response hook, so PerfTransport counts them instead.
+
+Samples are not kept. Each LatencyHistogram has HDR-style log buckets, each
+10% wider than the one before, from 1 ms to 5 min. Percentiles therefore
+come out within 10% of the real value, and a histogram uses at most ~130
+counters. ScanPerf keeps one for the whole scan and one per rule (latency and
+queue wait), and one per endpoint (latency). It is stored on ``ScanJob.perf``
+(``ScanShard.perf`` for shards, merged by the reduce step). ``summary`` turns
+it into the p50/p95/p99 report served by ``GET /scans/{id}/perf``.
+"""
+import math
+import time
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from app.scanner.accounting import MAX_ENDPOINT_KEYS, OTHER_ENDPOINTS
+
+MIN_SECONDS = 0.001
+GROWTH = 1.1
+MAX_INDEX = math.ceil(math.log(300 / MIN_SECONDS, GROWTH))
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    def __init__(self, data: Optional[Dict] = None):
+        data = data or {}
+        self.counts: Dict[int, int] = {int(k): v for k, v in data.get("buckets", {}).items()}
+        self.count = data.get("count", 0)
+        self.sum = data.get("sum", 0.0)
+        self.max = data.get("max", 0.0)
+        self.timeouts = data.get("timeouts", 0)
+
+    @staticmethod
+    def bucket(seconds: float) -> int:
+        if seconds <= MIN_SECONDS:
+            return 0
+        return min(MAX_INDEX, math.ceil(math.log(seconds / MIN_SECONDS, GROWTH)))
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        return MIN_SECONDS * GROWTH ** index
+
+    def record(self, seconds: float) -> None:
+        index = self.bucket(seconds)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (capped at the observed max)."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        self.timeouts += other.timeouts
+
+    def summary(self) -> Dict:
+        result = {"count": self.count, "timeouts": self.timeouts,
+                  "mean": round(self.sum / self.count, 4) if self.count else None,
+                  "max": round(self.max, 4) if self.count else None}
+        for q in PERCENTILES:
+            value = self.percentile(q)
+            result[f"p{q}"] = round(value, 4) if value is not None else None
+        return result
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "sum": round(self.sum, 4), "max": round(self.max, 4),
+                "timeouts": self.timeouts, "buckets": {str(k): v for k, v in sorted(self.counts.items())}}
+
+
+def _histograms(data: Optional[Dict]) -> Dict[str, LatencyHistogram]:
+    return {key: LatencyHistogram(value) for key, value in (data or {}).items()}
+
+
+class ScanPerf:
+    def __init__(self, initial: Optional[Dict] = None):
+        initial = initial or {}
+        self.latency = LatencyHistogram(initial.get("latency"))
+        self.queue = LatencyHistogram(initial.get("queue"))
+        self.rules = _histograms(initial.get("rules"))
+        self.rule_queue = _histograms(initial.get("rule_queue"))
+        self.endpoints = _histograms(initial.get("endpoints"))
+        self.cache_hits = initial.get("cache_hits", 0)
+
+    def _endpoint(self, endpoint: str) -> LatencyHistogram:
+        histogram = self.endpoints.get(endpoint)
+        if histogram is None:
+            if len(self.endpoints) >= MAX_ENDPOINT_KEYS:
+                endpoint = OTHER_ENDPOINTS
+            histogram = self.endpoints.setdefault(endpoint, LatencyHistogram())
+        return histogram
+
+    @staticmethod
+    def _labels(request: httpx.Request):
+        return request.extensions.get("scan_rule", "-"), f"{request.method} {request.url.path}"
+
+    async def on_request(self, request: httpx.Request) -> None:
+        request.extensions["scan_perf_start"] = time.monotonic()
+
+    async def on_response(self, response: httpx.Response) -> None:
+        request = response.request
+        started = request.extensions.get("scan_perf_start")
+        sent_at = request.extensions.get("scan_sent_at")
+        if started is None:
+            return
+        if sent_at is None:
+            self.cache_hits += 1
+            return
+        now = time.monotonic()
+        rule, endpoint = self._labels(request)
+        latency, waited = now - sent_at, sent_at - started
+        for histogram in (self.latency, self.rules.setdefault(rule, LatencyHistogram()), self._endpoint(endpoint)):
+            histogram.record(latency)
+        for histogram in (self.queue, self.rule_queue.setdefault(rule, LatencyHistogram())):
+            histogram.record(waited)
+
+    def timeout(self, request: httpx.Request) -> None:
+        rule, endpoint = self._labels(request)
+        for histogram in (self.latency, self.rules.setdefault(rule, LatencyHistogram()), self._endpoint(endpoint)):
+            histogram.timeouts += 1
+
+    def event_hooks(self) -> Dict:
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+    def to_dict(self) -> Dict:
+        return {
+            "cache_hits": self.cache_hits,
+            "latency": self.latency.to_dict(),
+            "queue": self.queue.to_dict(),
+            "rules": {k: v.to_dict() for k, v in sorted(self.rules.items())},
+            "rule_queue": {k: v.to_dict() for k, v in sorted(self.rule_queue.items())},
+            "endpoints": {k: v.to_dict() for k, v in sorted(self.endpoints.items())},
+        }
+
+    @staticmethod
+    def merge(parts: Iterable[Optional[Dict]]) -> Dict:
+        """Merge stored perf dicts (e.g. of all shards of a scan)."""
+        merged = ScanPerf()
+        for part in parts:
+            if not part:
+                continue
+            other = ScanPerf(part)
+            merged.latency.merge(other.latency)
+            merged.queue.merge(other.queue)
+            merged.cache_hits += other.cache_hits
+            for mine, theirs in ((merged.rules, other.rules), (merged.rule_queue, other.rule_queue),
+                                 (merged.endpoints, other.endpoints)):
+                for key, histogram in theirs.items():
+                    mine.setdefault(key, LatencyHistogram()).merge(histogram)
+        return merged.to_dict()
+
+
+def summary(perf: Optional[Dict]) -> Dict:
+    """Percentile report of a stored perf dict, slowest rules and endpoints (by p95) first."""
+    perf = ScanPerf(perf)
+
+    def by_p95(histograms: Dict[str, LatencyHistogram]) -> Dict[str, Dict]:
+        summaries = {key: histogram.summary() for key, histogram in histograms.items()}
+        return dict(sorted(summaries.items(), key=lambda item: -(item[1]["p95"] or 0)))
+
+    rules = by_p95(perf.rules)
+    for rule, report in rules.items():
+        queue = perf.rule_queue.get(rule)
+        report["queue_p95"] = queue.summary()["p95"] if queue is not None else None
+    return {
+        "cache_hits": perf.cache_hits,
+        "latency": perf.latency.summary(),
+        "queue": perf.queue.summary(),
+        "rules": rules,
+        "endpoints": by_p95(perf.endpoints),
+    }
+
+
+class PerfTransport(httpx.AsyncBaseTransport):
+    """Outermost wrapper: counts requests that time out before a response (no response hook fires for them)."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, perf: ScanPerf):
+        self._transport = transport
+        self.perf = perf
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            self.perf.timeout(request)
+            raise
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
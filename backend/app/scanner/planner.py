@@ -0,0 +1,143 @@
+"""
+Scan planning for declarative rules.
+
+A ProbeRule (app/scanner/rules/base.py) does not send requests itself.
+Its ``plan`` returns the Probes it needs, which are request templates, and
+its ``analyze`` turns their responses into findings. The engine plans every
+work unit before sending any request. This gives three things:
+
+- The scan's size is known up front (``plan_summary``, stored on
+  ``ScanJob.plan`` and returned by ``POST /scans/plan``).
+- A probe that several rules or units ask for is sent once per scan.
+- All probes go through one ProbeExecutor on the shared scan client, so
+  they pass through the same scheduler, cache, budget and accounting as
+  every other request.
+
+Rules that still send their own requests in ``run`` stay as they are. The
+plan counts their units, but their request count is unknown until they run.
+"""
+import asyncio
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from app.scanner.body import BoundedResponse
+from app.scanner.http import RuleClient
+
+
+HEADERS_ONLY = 1  # body cap for probes whose analyzer only looks at status and headers
+
+
+class Probe(NamedTuple):
+    """A request a rule needs sent. Probes with the same ``key`` are sent once."""
+    method: str
+    url: str
+    headers: Tuple[Tuple[str, str], ...] = ()
+    content: bytes = b""
+    timeout: Optional[float] = None
+    max_body_bytes: Optional[int] = None  # None = SCANNER_MAX_BODY_BYTES; HEADERS_ONLY when the body is unused
+
+    @classmethod
+    def make(cls, method: str, url: str, headers: Optional[Dict[str, str]] = None, content: bytes = b"",
+             timeout: Optional[float] = None, max_body_bytes: Optional[int] = None) -> "Probe":
+        pairs = tuple(sorted((k.lower(), v) for k, v in (headers or {}).items()))
+        return cls(method.upper(), url, pairs, content, timeout, max_body_bytes)
+
+    @property
+    def key(self) -> Tuple:
+        return self.method, self.url, self.headers, self.content
+
+
+class ProbeResult(NamedTuple):
+    probe: Probe
+    response: Optional[BoundedResponse]
+    error: Optional[str] = None
+
+
+class ProbeExecutor:
+    """
+    Sends probes over the scan client, each distinct probe once. ``expected``
+    is how often each probe key will be asked for according to the plan. A
+    response is dropped once every consumer has it, so memory stays bounded
+    by the probes in flight rather than the whole scan.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, expected: Optional[Dict[Tuple, int]] = None,
+                 body_limits: Optional[Dict[Tuple, Optional[int]]] = None):
+        self.client = client
+        self.expected = dict(expected or {})
+        self.body_limits = dict(body_limits or {})
+        self._tasks: Dict[Tuple, asyncio.Task] = {}
+        self.sent = 0
+        self.shared = 0
+
+    async def _send(self, probe: Probe, rule_id: str) -> ProbeResult:
+        self.sent += 1
+        limit = self.body_limits[probe.key] if probe.key in self.body_limits else probe.max_body_bytes
+        timeout = probe.timeout if probe.timeout is not None else httpx.USE_CLIENT_DEFAULT
+        client = RuleClient(self.client, timeout=timeout, rule_id=rule_id, max_body_bytes=limit)
+        try:
+            response = await client.fetch(probe.method, probe.url, headers=dict(probe.headers),
+                                          content=probe.content or None)
+        except httpx.HTTPError as e:
+            return ProbeResult(probe, None, f"{type(e).__name__}: {e}")
+        return ProbeResult(probe, response)
+
+    async def fetch(self, probe: Probe, rule_id: str) -> ProbeResult:
+        key = probe.key
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self._send(probe, rule_id))
+        else:
+            self.shared += 1
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            left = self.expected.get(key, 1) - 1
+            self.expected[key] = left
+            if left <= 0 and task.done():
+                self._tasks.pop(key, None)
+        return result._replace(probe=probe)
+
+    async def fetch_all(self, probes: Iterable[Probe], rule_id: str) -> List[ProbeResult]:
+        return list(await asyncio.gather(*(self.fetch(probe, rule_id) for probe in probes)))
+
+
+def probe_demand(probe_lists: Iterable[Optional[List[Probe]]]) -> Tuple[Dict[Tuple, int], Dict[Tuple, Optional[int]]]:
+    """How often each probe key is planned, and the largest body limit asked for it."""
+    counts: Dict[Tuple, int] = {}
+    limits: Dict[Tuple, Optional[int]] = {}
+    for probes in probe_lists:
+        for probe in probes or ():
+            key = probe.key
+            counts[key] = counts.get(key, 0) + 1
+            if key not in limits:
+                limits[key] = probe.max_body_bytes
+            elif limits[key] is not None:
+                # None means the default (SCANNER_MAX_BODY_BYTES), which wins over explicit caps
+                limits[key] = None if probe.max_body_bytes is None else max(limits[key], probe.max_body_bytes)
+    return counts, limits
+
+
+def plan_summary(units: List, rule_order: Optional[List[str]] = None) -> Dict:
+    """
+    Size of a planned scan. Probes are counted for declarative rules; rules
+    that send their own requests have ``probes: None``. ``rule_order`` is the
+    scan's rule slots (ScannerEngine.rule_slots), kept so resumed runs reuse them.
+    """
+    rules: Dict[str, Dict] = {}
+    for unit in units:
+        entry = rules.setdefault(unit.rule.id, {"units": 0, "probes": 0 if unit.probes is not None else None})
+        entry["units"] += 1
+        if unit.probes is not None:
+            entry["probes"] += len(unit.probes)
+    counts, _ = probe_demand(unit.probes for unit in units)
+    return {
+        "endpoints": len({(e.get("method"), e.get("path")) for unit in units for e in unit.endpoints}),
+        "units": len(units),
+        "rules": rules,
+        "probes": sum(counts.values()),
+        "unique_probes": len(counts),
+        "unplanned_rules": sorted(rule_id for rule_id, entry in rules.items() if entry["probes"] is None),
+        "rule_order": list(rule_order) if rule_order is not None else list(rules),
+    }
@@ -0,0 +1,54 @@
+"""
+Order of scan work: the most important checks run first.
+
+Work units are started in order of
+
+1. the scan's ``rule_priorities`` config ({rule ID: number}, higher first, default 0);
+2. rule severity (critical, high, medium, low, info);
+3. whether the unit covers sensitive endpoints;
+4. plan order.
+
+Endpoint-scoped rules split into several units are chunked sensitive-first,
+so their first chunk holds the auth, admin and payment endpoints. This
+only groups endpoints into units. The frozen endpoint list, and the list
+handed to rules that see the whole API (which sample e.g. "the first GET"),
+keep spec order. Sensitive endpoints carry the ``sensitive`` tag
+(app/scanner/classify.py) or match a regex in the scan's ``priority_paths``
+config.
+"""
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from app.scanner.classify import endpoint_tags
+
+SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+
+
+def _extra_pattern(config: Dict) -> Optional[Pattern]:
+    patterns = config.get('priority_paths') or []
+    return re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+
+
+def is_sensitive(endpoint: Dict, extra: Optional[Pattern] = None) -> bool:
+    return "sensitive" in endpoint_tags(endpoint) or bool(extra is not None and extra.search(endpoint.get('path') or ""))
+
+
+def order_endpoints(endpoints: List[Dict], config: Dict) -> List[Dict]:
+    """Sensitive endpoints first, otherwise in spec order; for chunking endpoint-scoped rules only."""
+    extra = _extra_pattern(config)
+    return sorted(endpoints, key=lambda endpoint: not is_sensitive(endpoint, extra))
+
+
+def unit_priority(unit, config: Dict, extra: Optional[Pattern] = None) -> Tuple:
+    """Sort key of a work unit; smaller runs first."""
+    user = (config.get('rule_priorities') or {}).get(unit.rule.id, 0)
+    severity = SEVERITY_RANK.get((unit.rule.severity or "").lower(), len(SEVERITY_RANK))
+    sensitive = any(is_sensitive(endpoint, extra) for endpoint in unit.endpoints)
+    return -float(user), severity, not sensitive, unit.position
+
+
+def order_units(units: List, config: Dict) -> List[int]:
+    """Indexes of ``units`` in the order they should start."""
+    extra = _extra_pattern(config)
+    keys = [unit_priority(unit, config, extra) for unit in units]
+    return sorted(range(len(units)), key=keys.__getitem__)
@@ -0,0 +1,156 @@
+"""
+Database-backed scan job queue.
+
+Pending ScanJob rows are the queue. A worker claims one by moving it to
+``running`` and stamping its lease (``lease_owner`` / ``heartbeat_at``):
+  * PostgreSQL: ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent workers
+    never block on, or double-claim, the same row.
+  * SQLite (no row locks): a compare-and-set ``UPDATE ... WHERE status =
+    'pending'``; a worker that loses the race simply tries the next row.
+
+Workers refresh ``heartbeat_at`` while a scan runs. Scans whose heartbeat goes
+stale (crashed or partitioned worker) are put back to ``pending`` and resumed
+from their checkpoints by the next worker to claim them.
+
+Shards of a large scan (ScanShard, see app/scanner/shards.py) are leased the
+same way, through the ``*_shard`` variants.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import update, func
+from sqlalchemy.orm import Session
+
+from app.models.scan import ScanJob, ScanShard
+
+
+def _supports_skip_locked(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _claim(db: Session, model, worker_id: str) -> Optional[int]:
+    now = datetime.utcnow()
+    if _supports_skip_locked(db):
+        row = (
+            db.query(model)
+            .filter(model.status == "pending")
+            .order_by(model.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if row is None:
+            db.rollback()
+            return None
+        row.status = "running"
+        row.lease_owner = worker_id
+        row.heartbeat_at = now
+        row.attempts = (row.attempts or 0) + 1
+        db.commit()
+        return row.id
+
+    candidates = [
+        row_id for (row_id,) in
+        db.query(model.id).filter(model.status == "pending").order_by(model.id).limit(10)
+    ]
+    for row_id in candidates:
+        claimed = db.execute(
+            update(model)
+            .where(model.id == row_id, model.status == "pending")
+            .values(status="running", lease_owner=worker_id, heartbeat_at=now,
+                    attempts=func.coalesce(model.attempts, 0) + 1)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return row_id
+    return None
+
+
+def _heartbeat(db: Session, model, row_id: int, worker_id: str) -> bool:
+    renewed = db.execute(
+        update(model)
+        .where(model.id == row_id, model.lease_owner == worker_id, model.status == "running")
+        .values(heartbeat_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return bool(renewed)
+
+
+def _release(db: Session, model, row_id: int, worker_id: str) -> None:
+    db.execute(
+        update(model)
+        .where(model.id == row_id, model.lease_owner == worker_id, model.status == "running")
+        .values(status="pending", lease_owner=None, heartbeat_at=None)
+    )
+    db.commit()
+
+
+def _requeue_stale(db: Session, model, lease_timeout: float, max_attempts: int) -> Tuple[List, List]:
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_timeout)
+    stale = (
+        db.query(model)
+        .filter(model.status == "running", model.heartbeat_at < cutoff)
+        .all()
+    )
+    requeued, failed = [], []
+    for row in stale:
+        row.lease_owner = None
+        row.heartbeat_at = None
+        if (row.attempts or 0) >= max_attempts:
+            row.status = "failed"
+            row.completed_at = datetime.utcnow()
+            failed.append(row)
+        else:
+            row.status = "pending"
+            requeued.append(row.id)
+    db.commit()
+    return requeued, failed
+
+
+def claim_next_scan(db: Session, worker_id: str) -> Optional[int]:
+    """Claim the oldest pending scan for ``worker_id`` and return its ID, or None."""
+    return _claim(db, ScanJob, worker_id)
+
+
+def heartbeat(db: Session, scan_id: int, worker_id: str) -> bool:
+    """Refresh the lease on a running scan. Returns False if the lease was lost."""
+    return _heartbeat(db, ScanJob, scan_id, worker_id)
+
+
+def release_scan(db: Session, scan_id: int, worker_id: str) -> None:
+    """Give a running scan back to the queue (worker shutdown); checkpoints are kept."""
+    _release(db, ScanJob, scan_id, worker_id)
+
+
+def requeue_stale_scans(db: Session, lease_timeout: float, max_attempts: int) -> List[int]:
+    """
+    Put running scans with a stale heartbeat back to ``pending``, or mark them
+    ``failed`` once they have used up ``max_attempts`` claims.
+    """
+    requeued, _ = _requeue_stale(db, ScanJob, lease_timeout, max_attempts)
+    return requeued
+
+
+def claim_next_shard(db: Session, worker_id: str) -> Optional[int]:
+    """Claim the oldest pending scan shard for ``worker_id`` and return its ID, or None."""
+    return _claim(db, ScanShard, worker_id)
+
+
+def heartbeat_shard(db: Session, shard_id: int, worker_id: str) -> bool:
+    return _heartbeat(db, ScanShard, shard_id, worker_id)
+
+
+def release_shard(db: Session, shard_id: int, worker_id: str) -> None:
+    _release(db, ScanShard, shard_id, worker_id)
+
+
+def requeue_stale_shards(db: Session, lease_timeout: float, max_attempts: int) -> List[int]:
+    """
+    Same as ``requeue_stale_scans`` for shards. A shard that runs out of
+    attempts fails, and so does its scan once no other shard is still running.
+    """
+    from app.scanner.shards import finish_sharded_scan
+
+    requeued, failed = _requeue_stale(db, ScanShard, lease_timeout, max_attempts)
+    for job_id in {shard.job_id for shard in failed}:
+        finish_sharded_scan(db, job_id)
+    return requeued
@@ -0,0 +1,139 @@
+"""
+Rule registry: which rules exist, and which of them a scan runs.
+
+Built-in rules are listed in BUILTIN_RULES by ID, ``module:Class``, OWASP
+API Top 10 category and tags, so rules can be selected without importing
+them. A rule module is imported only when its rule is selected. The list
+order is the order rules are planned in, which fixes their checkpoint
+positions; append new rules at the end.
+
+Third-party rules are discovered through the ``apiscan.rules`` entry point
+group. The entry point name is the rule ID and its value the rule class:
+
+    [project.entry-points."apiscan.rules"]
+    ACME-001 = "acme_rules.secrets:SecretsRule"
+
+Their category and tags are class attributes, so a third-party rule is
+imported when a scan selects by category or tag, or runs every rule.
+
+Scan config keys (all optional; without any of them every rule runs):
+
+    rules             rule IDs to run
+    rule_categories   categories to run, e.g. ["API1", "API8"]
+    rule_tags         tags to run, e.g. ["passive"]
+    exclude_rules     rule IDs to leave out of the selection
+"""
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.scanner.rules.base import BaseRule
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "apiscan.rules"
+
+
+class RuleSpec(NamedTuple):
+    id: str
+    target: str  # "module:Class"
+    category: Optional[str] = None  # None = read from the class (third-party rules)
+    tags: Tuple[str, ...] = ()
+
+    @property
+    def builtin(self) -> bool:
+        return self.category is not None
+
+    def load_class(self) -> type:
+        module, _, name = self.target.partition(":")
+        cls = getattr(importlib.import_module(module), name)
+        if not (isinstance(cls, type) and issubclass(cls, BaseRule)):
+            raise TypeError(f"Rule {self.id} ({self.target}) is not a BaseRule subclass")
+        return cls
+
+    def load(self) -> BaseRule:
+        rule = self.load_class()()
+        if self.builtin:
+            rule.category, rule.tags = self.category, self.tags
+        return rule
+
+
+_RULES = "app.scanner.rules"
+
+BUILTIN_RULES: List[RuleSpec] = [
+    RuleSpec("SEC-HEADERS", f"{_RULES}.security_headers:SecurityHeadersRule", "API8", ("passive", "headers")),
+    RuleSpec("AUTH-MISSING", f"{_RULES}.auth_checks:AuthRequiredRule", "API2", ("auth",)),
+    RuleSpec("RATE-LIMIT", f"{_RULES}.rate_limit:RateLimitRule", "API4", ("intrusive",)),
+    RuleSpec("INJECTION-BASIC", f"{_RULES}.injection:InjectionRule", "API10", ("injection",)),
+    RuleSpec("SENSITIVE-DATA", f"{_RULES}.sensitive_data:SensitiveDataRule", "API3", ("passive",)),
+    RuleSpec("BOLA-IDOR", f"{_RULES}.bola:BolaRule", "API1", ("authz",)),
+    RuleSpec("OPENAPI-CONTRACT", f"{_RULES}.openapi_contract:OpenAPIContractRule", "API9", ("passive", "spec")),
+    RuleSpec("DESERIALIZATION", f"{_RULES}.deserialization:DeserializationRule", "API10", ("injection",)),
+    RuleSpec("FUZZING", f"{_RULES}.fuzzing:FuzzingRule", "API4", ("intrusive",)),
+    RuleSpec("BUSINESS-LOGIC", f"{_RULES}.business_logic:BusinessLogicRule", "API6", ("intrusive",)),
+    RuleSpec("CORS-001", f"{_RULES}.cors_check:CORSCheckRule", "API8", ("headers",)),
+    RuleSpec("HTML-INJ-001", f"{_RULES}.html_injection:HTMLInjectionRule", "API8", ("injection",)),
+    RuleSpec("JWT-001", f"{_RULES}.jwt_security:JWTSecurityRule", "API2", ("auth",)),
+    RuleSpec("SSRF-001", f"{_RULES}.ssrf_check:SSRFCheckRule", "API7", ("injection",)),
+    RuleSpec("MASS-ASSIGN-001", f"{_RULES}.mass_assignment:MassAssignmentRule", "API3", ("intrusive", "authz")),
+    RuleSpec("BFLA-001", f"{_RULES}.broken_function_auth:BrokenFunctionAuthRule", "API5", ("intrusive", "authz")),
+    RuleSpec("PATH-TRAV-001", f"{_RULES}.path_traversal:PathTraversalRule", "API8", ("injection",)),
+    RuleSpec("COOKIE-SEC", f"{_RULES}.cookie_security:CookieSecurityRule", "API8", ("passive", "headers")),
+    RuleSpec("TLS-ENFORCE", f"{_RULES}.tls_enforcement:TLSEnforcementRule", "API8", ("passive", "transport")),
+    RuleSpec("FINGERPRINT", f"{_RULES}.fingerprint_headers:FingerprintHeadersRule", "API8", ("passive", "headers")),
+]
+
+
+class UnknownRuleError(ValueError):
+    pass
+
+
+def discover() -> List[RuleSpec]:
+    """Built-in rules followed by entry-point rules (sorted by ID); built-in IDs win."""
+    specs = list(BUILTIN_RULES)
+    known = {spec.id for spec in specs}
+    for ep in sorted(entry_points(group=ENTRY_POINT_GROUP), key=lambda ep: ep.name):
+        if ep.name in known:
+            logger.warning(f"Ignoring rule entry point {ep.name} ({ep.value}): rule ID already registered")
+            continue
+        known.add(ep.name)
+        specs.append(RuleSpec(ep.name, ep.value))
+    return specs
+
+
+def _values(config: Dict, key: str) -> List[str]:
+    value = config.get(key) or []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def resolve(config: Dict, specs: Optional[List[RuleSpec]] = None) -> List[RuleSpec]:
+    """
+    The rules a scan with ``config`` runs, in registry order. Raises
+    UnknownRuleError for rule IDs that are not registered.
+    """
+    specs = discover() if specs is None else specs
+    ids, categories, tags = _values(config, "rules"), _values(config, "rule_categories"), _values(config, "rule_tags")
+    excluded = set(_values(config, "exclude_rules"))
+    unknown = sorted((set(ids) | excluded) - {spec.id for spec in specs})
+    if unknown:
+        raise UnknownRuleError(f"Unknown rule IDs: {', '.join(unknown)}")
+
+    selected = []
+    for spec in specs:
+        if spec.id in excluded:
+            continue
+        if ids or categories or tags:
+            category, spec_tags = spec.category, spec.tags
+            if not spec.builtin and (categories or tags) and spec.id not in ids:
+                cls = spec.load_class()
+                category, spec_tags = getattr(cls, "category", None), tuple(getattr(cls, "tags", ()))
+            if not (spec.id in ids or category in categories or set(spec_tags) & set(tags)):
+                continue
+        selected.append(spec)
+    return selected
+
+
+def load_rules(config: Dict) -> List[BaseRule]:
+    """Import and instantiate the rules selected by ``config``."""
+    return [spec.load() for spec in resolve(config)]
@@ -1,5 +1,5 @@
 import httpx
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.scanner.rules.base import BaseRule
 
 class AuthRequiredRule(BaseRule):
@@ -7,6 +7,7 @@ class AuthRequiredRule(BaseRule):
     name = "Authentication Missing Check"
     description = "Checks if sensitive endpoints are accessible without authentication."
     severity = "high"
+    endpoint_scoped = True
     
     impact = "Unauthorized access to sensitive data or functionality."
     remediation = "Implement authentication middleware (e.g., JWT, OAuth2, API Keys) for all private endpoints. Verify that the API rejects unauthenticated requests with 401 Unauthorized."
@@ -15,9 +16,10 @@ class AuthRequiredRule(BaseRule):
     integrity = "High"
     availability = "High"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
-        async with httpx.AsyncClient(verify=False) as client:
+        async with self.session(client) as client:
             for endpoint in endpoints:
                 path = endpoint['path']
                 method = endpoint['method']
@@ -30,10 +32,11 @@ class AuthRequiredRule(BaseRule):
                 
                 try:
                     # Send request without headers
+                    # Only the status and a short snippet are needed: read at most 1 KB.
                     if method.upper() == "GET":
-                        response = await client.get(full_url)
+                        response = await client.fetch("GET", full_url, max_bytes=1024)
                     elif method.upper() == "POST":
-                        response = await client.post(full_url, json={})
+                        response = await client.fetch("POST", full_url, json={}, max_bytes=1024)
                     else:
                         continue # Skip other methods for now
 
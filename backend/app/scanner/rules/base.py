@@ -1,11 +1,34 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+import httpx
+from app.scanner.body import BoundedResponse
+from app.scanner.http import RuleClient
+from app.scanner.planner import Probe, ProbeExecutor, ProbeResult
+from app.scanner.spec import SpecResolver
 
 class BaseRule(ABC):
     id: str = "BASE"
     name: str = "Base Rule"
     description: str = "Base rule description"
     severity: str = "info" # high, medium, low, info
+    # OWASP API Top 10 category ("API1".."API10") and free-form tags, used to
+    # select rules per scan (app/scanner/registry.py sets them for built-in rules).
+    category: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    # True when each endpoint is checked independently of the others, so the
+    # engine may split the endpoint list into separately checkpointed chunks.
+    endpoint_scoped: bool = False
+    # Wall-clock seconds the rule may spend on one scan (None = no limit).
+    # Overridden per scan by the `rule_budgets` / `rule_budget` config keys.
+    time_budget: Optional[float] = None
+    # Most bytes of a response body the rule reads via RuleClient.fetch (None =
+    # SCANNER_MAX_BODY_BYTES). Overridden per scan by `rule_max_body_bytes` / `max_body_bytes`.
+    max_body_bytes: Optional[int] = None
+    # True when the rule reads schemas from the spec. The engine then loads the
+    # spec (also on resume) and sets ``spec`` to the scan's SpecResolver.
+    needs_spec: bool = False
+    spec: Optional[SpecResolver] = None
     
     # Metadata for PDF Report
     impact: str = "Information only."
@@ -21,21 +44,49 @@ class BaseRule(ABC):
     availability: str = "None"
 
     @abstractmethod
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         """
         Run the rule checks.
         endpoints: List of discovered endpoints from OpenAPI.
         config: Scan configuration (auth tokens, etc).
+        client: Shared scan client injected by the engine (None when run standalone).
         Returns: List of findings.
         """
         pass
 
+    def body_limit(self, config: Dict) -> Optional[int]:
+        """Body read cap for this rule in a scan with ``config``."""
+        return (config.get('rule_max_body_bytes') or {}).get(self.id) or config.get('max_body_bytes') \
+            or self.max_body_bytes
+
+    @asynccontextmanager
+    async def session(self, client: Optional[httpx.AsyncClient] = None, headers: Optional[Dict[str, str]] = None,
+                      timeout: Any = httpx.USE_CLIENT_DEFAULT,
+                      max_body_bytes: Optional[int] = None) -> AsyncIterator[RuleClient]:
+        """
+        Yield a RuleClient over the engine's shared client, or over a private
+        client when the rule is run on its own. Only private clients are closed.
+        """
+        limit = max_body_bytes or self.max_body_bytes
+        if client is not None:
+            yield RuleClient(client, headers=headers, timeout=timeout, rule_id=self.id, max_body_bytes=limit)
+            return
+        async with httpx.AsyncClient(verify=False) as own:
+            yield RuleClient(own, headers=headers, timeout=timeout, rule_id=self.id, max_body_bytes=limit)
+
     def build_finding(self, description: str, details: Dict, endpoint: str, method: str, severity: str = None,
                       impact: str = None, remediation: str = None, proof_of_concept: str = None, cvss_vector: str = None,
                       attack_vector: str = None, attack_complexity: str = None, privileges_required: str = None,
                       user_interaction: str = None, scope: str = None, confidentiality: str = None,
-                      integrity: str = None, availability: str = None) -> Dict:
-        """Helper to construct a finding with all metadata."""
+                      integrity: str = None, availability: str = None,
+                      response: Optional[BoundedResponse] = None) -> Dict:
+        """
+        Helper to construct a finding with all metadata. Pass the ``response``
+        the evidence came from to record a truncated body in ``details``.
+        """
+        if response is not None:
+            details = response.annotate(details)
         return {
             "rule_id": self.id,
             "rule_name": self.name,
@@ -57,3 +108,31 @@ class BaseRule(ABC):
             "integrity": integrity or self.integrity,
             "availability": availability or self.availability
         }
+
+
+class ProbeRule(BaseRule):
+    """
+    A declarative rule: ``plan`` lists the requests it needs and ``analyze``
+    turns their results into findings. The engine sends the probes of all
+    rules through one executor, each distinct probe once (app/scanner/planner.py).
+    """
+
+    @abstractmethod
+    def plan(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Probe]:
+        pass
+
+    @abstractmethod
+    def analyze(self, target_url: str, endpoints: List[Dict], config: Dict,
+                results: List[ProbeResult]) -> List[Dict]:
+        """``results`` are in the order of the planned probes."""
+        pass
+
+    def auth_headers(self, config: Dict) -> Dict[str, str]:
+        return {"Authorization": config["auth_header"]} if config.get("auth_header") else {}
+
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
+        probes = self.plan(target_url, endpoints, config)
+        async with self.session(client) as rule_client:
+            results = await ProbeExecutor(rule_client.client).fetch_all(probes, self.id)
+        return self.analyze(target_url, endpoints, config, results)
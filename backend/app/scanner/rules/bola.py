@@ -1,6 +1,7 @@
 import httpx
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
+from app.scanner.classify import endpoint_tags
 from app.scanner.rules.base import BaseRule
 
 class BolaRule(BaseRule):
@@ -8,6 +9,7 @@ class BolaRule(BaseRule):
     name = "Broken Object Level Authorization (IDOR)"
     description = "Checks for Insecure Direct Object References by modifying resource IDs."
     severity = "high"
+    endpoint_scoped = True
     
     impact = "Unauthorized access to other users' data."
     remediation = "Implement proper access control checks. Ensure the authenticated user is authorized to access the requested resource ID."
@@ -16,20 +18,21 @@ class BolaRule(BaseRule):
     integrity = "High"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         
         # Pattern to find IDs in paths, e.g., /users/123 or /orders/5
         # Matches integer IDs at end of path or between slashes
         id_pattern = re.compile(r'/(\d+)(/|$)')
 
-        async with httpx.AsyncClient(verify=False) as client:
+        async with self.session(client, max_body_bytes=self.body_limit(config)) as client:
             headers = {}
             if config.get('auth_header'):
                 headers['Authorization'] = config['auth_header']
 
             for endpoint in endpoints:
-                if endpoint['method'] != 'GET':
+                if endpoint['method'] != 'GET' or "id-bearing" not in endpoint_tags(endpoint):
                     continue
                 
                 path = endpoint['path']
@@ -55,11 +58,11 @@ class BolaRule(BaseRule):
                     
                     try:
                         # 1. Request Original (should be accessible if valid)
-                        resp_orig = await client.get(original_url, headers=headers)
+                        resp_orig = await client.fetch("GET", original_url, headers=headers)
                         if resp_orig.status_code != 200:
                             continue # If original not accessible, can't test BOLA
 
-                        resp_test = await client.get(test_url, headers=headers)
+                        resp_test = await client.fetch("GET", test_url, headers=headers)
                         if resp_test.status_code == 200:
                             body_orig = resp_orig.text
                             body_test = resp_test.text
@@ -75,7 +78,8 @@ class BolaRule(BaseRule):
                                     },
                                     endpoint=path,
                                     method="GET",
-                                    severity="high"
+                                    severity="high",
+                                    response=resp_test,
                                 ))
                     except:
                         pass
@@ -1,13 +1,8 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
+from app.scanner.classify import tagged
 from app.scanner.rules.base import BaseRule
 
-
-ADMIN_PATH_KEYWORDS = [
-    "/admin", "/manage", "/internal", "/console",
-    "/config", "/settings", "/superuser", "/staff",
-]
-
 # A low-privilege token — obviously invalid to real servers, but
 # some implementations only check for *any* token rather than validating it
 LOW_PRIV_TOKEN = (
@@ -21,6 +16,7 @@ class BrokenFunctionAuthRule(BaseRule):
     id = "BFLA-001"
     name = "Broken Function Level Authorization (BFLA)"
     severity = "high"
+    endpoint_scoped = True
     impact = (
         "Unauthorised users can access administrative or privileged functions, "
         "allowing account takeover, data exfiltration, and destructive actions."
@@ -40,18 +36,16 @@ class BrokenFunctionAuthRule(BaseRule):
     integrity = "High"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
 
-        admin_endpoints = [
-            ep for ep in endpoints
-            if any(kw in ep.get("path", "").lower() for kw in ADMIN_PATH_KEYWORDS)
-        ]
+        admin_endpoints = tagged(endpoints, "admin")
 
         if not admin_endpoints:
             return findings
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0) as client:
             for ep in admin_endpoints:
                 path = ep.get("path", "/")
                 method = ep.get("method", "GET").upper()
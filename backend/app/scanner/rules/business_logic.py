@@ -1,5 +1,6 @@
 import httpx
-from typing import List, Dict
+from typing import List, Dict, Optional
+from app.scanner.classify import endpoint_tags
 from app.scanner.rules.base import BaseRule
 
 class BusinessLogicRule(BaseRule):
@@ -7,6 +8,7 @@ class BusinessLogicRule(BaseRule):
     name = "Sensitive Business Flow Checks"
     description = "Looks for unrestricted access to sensitive business flows by repeating POST operations."
     severity = "medium"
+    endpoint_scoped = True
     impact = "Critical business actions may be repeated without proper safeguards."
     remediation = "Enforce business rules such as idempotency keys, step validation, and replay protection."
     cvss_vector = "CVSS:3.1/AV:N/AC:L/PR:L/UI:N/S:U/C:L/I:H/A:L"
@@ -14,32 +16,23 @@ class BusinessLogicRule(BaseRule):
     integrity = "High"
     availability = "Low"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
-        keywords = [
-            "transfer",
-            "payment",
-            "checkout",
-            "order",
-            "purchase",
-            "withdraw",
-            "deposit",
-        ]
 
         headers = {}
         if config.get("auth_header"):
             headers["Authorization"] = config["auth_header"]
 
-        async with httpx.AsyncClient(verify=False, headers=headers) as client:
+        async with self.session(client, headers=headers) as client:
             for endpoint in endpoints:
                 method = endpoint["method"].upper()
                 path = endpoint["path"]
-                lower_path = path.lower()
 
                 if method != "POST":
                     continue
 
-                if not any(k in lower_path for k in keywords):
+                if "payment" not in endpoint_tags(endpoint):
                     continue
 
                 url = f"{target_url}{path}"
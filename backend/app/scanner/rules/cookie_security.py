@@ -1,10 +1,10 @@
-import httpx
 from typing import List, Dict, Tuple
 
-from app.scanner.rules.base import BaseRule
+from app.scanner.planner import HEADERS_ONLY, Probe, ProbeResult
+from app.scanner.rules.base import ProbeRule
 
 
-class CookieSecurityRule(BaseRule):
+class CookieSecurityRule(ProbeRule):
     id = "COOKIE-SEC"
     name = "Cookie Security Flags Check"
     description = "Checks Set-Cookie attributes for HttpOnly, Secure, and SameSite."
@@ -17,10 +17,8 @@ class CookieSecurityRule(BaseRule):
     integrity = "Low"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    def plan(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Probe]:
         base_url = target_url.rstrip("/")
-        is_https = base_url.lower().startswith("https://")
-
         candidates = []
         for ep in endpoints:
             if ep.get("method") == "GET":
@@ -28,48 +26,47 @@ class CookieSecurityRule(BaseRule):
         if not candidates:
             candidates = [{"path": "/", "method": "GET", "details": {}}]
 
-        candidates = candidates[:5]
-
-        headers = {}
-        if config.get("auth_header"):
-            headers["Authorization"] = config["auth_header"]
+        headers = self.auth_headers(config)
+        return [
+            Probe.make("GET", f"{base_url}{ep.get('path', '/')}", headers, timeout=8.0, max_body_bytes=HEADERS_ONLY)
+            for ep in candidates[:5]
+        ]
 
+    def analyze(self, target_url: str, endpoints: List[Dict], config: Dict,
+                results: List[ProbeResult]) -> List[Dict]:
+        is_https = target_url.rstrip("/").lower().startswith("https://")
         cookie_issues: List[Dict] = []
 
-        async with httpx.AsyncClient(verify=False, headers=headers, timeout=8.0, follow_redirects=False) as client:
-            for ep in candidates:
-                path = ep.get("path", "/")
-                url = f"{base_url}{path}"
-                try:
-                    resp = await client.get(url)
-                except Exception:
-                    continue
-
-                set_cookies = resp.headers.get_list("set-cookie")
-                for raw in set_cookies:
-                    name, attrs = self._parse_set_cookie(raw)
-                    issues = []
-
-                    if "httponly" not in attrs:
-                        issues.append("Missing HttpOnly")
-                    if is_https and "secure" not in attrs:
-                        issues.append("Missing Secure")
-
-                    same_site = attrs.get("samesite")
-                    if not same_site:
-                        issues.append("Missing SameSite")
-                    elif same_site.lower() == "none" and "secure" not in attrs:
-                        issues.append("SameSite=None without Secure")
-
-                    if issues:
-                        cookie_issues.append(
-                            {
-                                "url": url,
-                                "cookie": name,
-                                "issues": issues,
-                                "raw": raw,
-                            }
-                        )
+        for result in results:
+            resp = result.response
+            if resp is None:
+                continue
+
+            set_cookies = resp.headers.get_list("set-cookie")
+            for raw in set_cookies:
+                name, attrs = self._parse_set_cookie(raw)
+                issues = []
+
+                if "httponly" not in attrs:
+                    issues.append("Missing HttpOnly")
+                if is_https and "secure" not in attrs:
+                    issues.append("Missing Secure")
+
+                same_site = attrs.get("samesite")
+                if not same_site:
+                    issues.append("Missing SameSite")
+                elif same_site.lower() == "none" and "secure" not in attrs:
+                    issues.append("SameSite=None without Secure")
+
+                if issues:
+                    cookie_issues.append(
+                        {
+                            "url": result.probe.url,
+                            "cookie": name,
+                            "issues": issues,
+                            "raw": raw,
+                        }
+                    )
 
         if not cookie_issues:
             return []
@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
 from app.scanner.rules.base import BaseRule
 
@@ -31,11 +31,12 @@ class CORSCheckRule(BaseRule):
         "https://attacker.com",
     ]
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         test_endpoints = endpoints[:3]
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0) as client:
             for ep in test_endpoints:
                 path = ep.get("path", "/")
                 url = f"{target_url.rstrip('/')}{path}"
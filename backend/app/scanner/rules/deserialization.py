@@ -1,6 +1,7 @@
 import httpx
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
+from app.scanner.body import BodyMatcher
 from app.scanner.rules.base import BaseRule
 
 class DeserializationRule(BaseRule):
@@ -8,13 +9,15 @@ class DeserializationRule(BaseRule):
     name = "Unsafe Deserialization Indicators"
     description = "Looks for error messages and stack traces that indicate unsafe deserialization."
     severity = "medium"
+    endpoint_scoped = True
     impact = "Error pages and stack traces may reveal unsafe deserialization sinks."
     remediation = "Harden deserialization logic, avoid unsafe deserializers, and disable detailed error pages."
     cvss_vector = "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:L/I:L/A:N"
     confidentiality = "Low"
     integrity = "Low"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         patterns = [
             r"java\.io\.ObjectInputStream",
@@ -32,15 +35,15 @@ class DeserializationRule(BaseRule):
         if config.get("auth_header"):
             headers["Authorization"] = config["auth_header"]
 
-        async with httpx.AsyncClient(verify=False, headers=headers) as client:
+        async with self.session(client, headers=headers, max_body_bytes=self.body_limit(config)) as client:
             for endpoint in endpoints:
                 if endpoint["method"] != "GET":
                     continue
                 url = f"{target_url}{endpoint['path']}"
                 try:
-                    resp = await client.get(url)
+                    resp = await client.fetch("GET", url, matcher=BodyMatcher([combined]))
                     text = resp.text
-                    if combined.search(text):
+                    if resp.match:
                         findings.append(
                             self.build_finding(
                                 description="Potential unsafe deserialization indicators found in response content.",
@@ -52,6 +55,7 @@ class DeserializationRule(BaseRule):
                                 endpoint=endpoint["path"],
                                 method="GET",
                                 severity="medium",
+                                response=resp,
                             )
                         )
                 except:
@@ -1,11 +1,11 @@
-import httpx
 import json
 from typing import List, Dict
 
-from app.scanner.rules.base import BaseRule
+from app.scanner.planner import HEADERS_ONLY, Probe, ProbeResult
+from app.scanner.rules.base import ProbeRule
 
 
-class FingerprintHeadersRule(BaseRule):
+class FingerprintHeadersRule(ProbeRule):
     id = "FINGERPRINT"
     name = "Technology Fingerprinting Headers"
     description = "Detects response headers that may disclose server/framework information."
@@ -29,17 +29,14 @@ class FingerprintHeadersRule(BaseRule):
         "via",
     ]
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
-        base_url = target_url.rstrip("/")
+    def plan(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Probe]:
+        return [Probe.make("GET", target_url.rstrip("/"), self.auth_headers(config), timeout=8.0,
+                           max_body_bytes=HEADERS_ONLY)]
 
-        headers = {}
-        if config.get("auth_header"):
-            headers["Authorization"] = config["auth_header"]
-
-        try:
-            async with httpx.AsyncClient(verify=False, headers=headers, timeout=8.0) as client:
-                resp = await client.get(base_url)
-        except Exception:
+    def analyze(self, target_url: str, endpoints: List[Dict], config: Dict,
+                results: List[ProbeResult]) -> List[Dict]:
+        resp = results[0].response
+        if resp is None:
             return []
 
         found = {}
@@ -1,5 +1,5 @@
 import httpx
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.scanner.rules.base import BaseRule
 
 class FuzzingRule(BaseRule):
@@ -7,6 +7,7 @@ class FuzzingRule(BaseRule):
     name = "Fuzzing-based Input Robustness"
     description = "Sends fuzzed query parameters and bodies to detect crashes and 5xx errors."
     severity = "medium"
+    endpoint_scoped = True
     impact = "Unvalidated input may cause crashes or expose internal error details."
     remediation = "Validate and sanitize all inputs. Handle unexpected input types gracefully."
     cvss_vector = "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:L/I:L/A:L"
@@ -14,7 +15,8 @@ class FuzzingRule(BaseRule):
     integrity = "Low"
     availability = "Low"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         fuzz_values = [
             "A" * 512,
@@ -29,7 +31,7 @@ class FuzzingRule(BaseRule):
         if config.get("auth_header"):
             headers["Authorization"] = config["auth_header"]
 
-        async with httpx.AsyncClient(verify=False, headers=headers) as client:
+        async with self.session(client, headers=headers) as client:
             for endpoint in endpoints:
                 path = endpoint["path"]
                 method = endpoint["method"].upper()
@@ -1,5 +1,6 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
+from app.scanner.body import BodyMatcher
 from app.scanner.rules.base import BaseRule
 
 
@@ -35,11 +36,12 @@ class HTMLInjectionRule(BaseRule):
     # Markers we look for in the response body (raw tags reflected back)
     REFLECTION_MARKERS = ["<h1>", "<script>", "<img ", "<svg"]
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         test_endpoints = endpoints[:5]
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0, max_body_bytes=self.body_limit(config)) as client:
             for ep in test_endpoints:
                 path = ep.get("path", "/")
                 method = ep.get("method", "GET").upper()
@@ -49,25 +51,27 @@ class HTMLInjectionRule(BaseRule):
                     # Test via query parameters
                     for param in self.PARAM_NAMES:
                         try:
-                            resp = await client.get(url, params={param: payload})
-                            body = resp.text
-                            for marker in self.REFLECTION_MARKERS:
-                                if marker.lower() in body.lower():
-                                    findings.append(self.build_finding(
-                                        description="HTML injection payload reflected in response.",
-                                        details=(
-                                            f"The payload '{payload}' sent as query parameter "
-                                            f"'{param}' was reflected in the response body "
-                                            f"without encoding. URL: {url}"
-                                        ),
-                                        endpoint=path,
-                                        method="GET",
-                                        proof_of_concept=(
-                                            f"GET {url}?{param}={payload}\n"
-                                            f"Response contained: {marker}"
-                                        ),
-                                    ))
-                                    break  # one finding per param/payload combo
+                            resp = await client.fetch(
+                                "GET", url, matcher=BodyMatcher(self.REFLECTION_MARKERS, ignore_case=True),
+                                params={param: payload},
+                            )
+                            marker = resp.match
+                            if marker:  # one finding per param/payload combo
+                                findings.append(self.build_finding(
+                                    description="HTML injection payload reflected in response.",
+                                    details=(
+                                        f"The payload '{payload}' sent as query parameter "
+                                        f"'{param}' was reflected in the response body "
+                                        f"without encoding. URL: {url}"
+                                    ),
+                                    endpoint=path,
+                                    method="GET",
+                                    proof_of_concept=(
+                                        f"GET {url}?{param}={payload}\n"
+                                        f"Response contained: {marker}"
+                                    ),
+                                    response=resp,
+                                ))
                         except Exception:
                             pass
 
@@ -75,30 +79,30 @@ class HTMLInjectionRule(BaseRule):
                     if method in ("POST", "PUT", "PATCH"):
                         for param in self.PARAM_NAMES:
                             try:
-                                resp = await client.request(
+                                resp = await client.fetch(
                                     method,
                                     url,
+                                    matcher=BodyMatcher(self.REFLECTION_MARKERS, ignore_case=True),
                                     json={param: payload},
                                 )
-                                body = resp.text
-                                for marker in self.REFLECTION_MARKERS:
-                                    if marker.lower() in body.lower():
-                                        findings.append(self.build_finding(
-                                            description="HTML injection payload reflected in response body.",
-                                            details=(
-                                                f"The payload '{payload}' sent in the request body "
-                                                f"field '{param}' was reflected in the response "
-                                                f"without encoding. URL: {url}, Method: {method}"
-                                            ),
-                                            endpoint=path,
-                                            method=method,
-                                            proof_of_concept=(
-                                                f"{method} {url}\n"
-                                                f"Body: {{\"{param}\": \"{payload}\"}}\n"
-                                                f"Response contained: {marker}"
-                                            ),
-                                        ))
-                                        break
+                                marker = resp.match
+                                if marker:
+                                    findings.append(self.build_finding(
+                                        description="HTML injection payload reflected in response body.",
+                                        details=(
+                                            f"The payload '{payload}' sent in the request body "
+                                            f"field '{param}' was reflected in the response "
+                                            f"without encoding. URL: {url}, Method: {method}"
+                                        ),
+                                        endpoint=path,
+                                        method=method,
+                                        proof_of_concept=(
+                                            f"{method} {url}\n"
+                                            f"Body: {{\"{param}\": \"{payload}\"}}\n"
+                                            f"Response contained: {marker}"
+                                        ),
+                                        response=resp,
+                                    ))
                             except Exception:
                                 pass
 
@@ -1,5 +1,6 @@
 import httpx
-from typing import List, Dict
+from typing import List, Dict, Optional
+from app.scanner.body import BodyMatcher
 from app.scanner.rules.base import BaseRule
 import urllib.parse
 
@@ -8,6 +9,7 @@ class InjectionRule(BaseRule):
     name = "Basic Injection Check (SQLi/XSS)"
     description = "Checks for basic SQL injection and XSS vulnerabilities in query parameters."
     severity = "high"
+    endpoint_scoped = True
     
     impact = "Attackers may read/modify sensitive data (SQLi) or execute malicious scripts in user browsers (XSS)."
     remediation = "Use parameterized queries (Prepared Statements) for SQL. Use output encoding/escaping for XSS prevention. Validate all input."
@@ -16,14 +18,15 @@ class InjectionRule(BaseRule):
     integrity = "High"
     availability = "High"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         payloads = {
             "SQLi": ["'", "\"", " OR 1=1", "' OR '1'='1"],
             "XSS": ["<script>alert(1)</script>", "\"><script>alert(1)</script>"]
         }
 
-        async with httpx.AsyncClient(verify=False) as client:
+        async with self.session(client, max_body_bytes=self.body_limit(config)) as client:
             headers = {}
             if config.get('auth_header'):
                 headers['Authorization'] = config['auth_header']
@@ -58,11 +61,11 @@ class InjectionRule(BaseRule):
                             # test_url_path = f"{base_url}/{urllib.parse.quote(payload)}" 
                         
                         try:
-                            response = await client.get(test_url, headers=headers)
-                            
                             if p_type == "SQLi":
                                 errors = ["syntax error", "mysql", "postgres", "sqlite", "oracle"]
-                                if any(e in response.text.lower() for e in errors):
+                                response = await client.fetch("GET", test_url, headers=headers,
+                                                              matcher=BodyMatcher(errors, ignore_case=True))
+                                if response.match:
                                     findings.append(self.build_finding(
                                         description=f"Possible SQL Injection detected with payload: {payload}",
                                         details={
@@ -72,11 +75,14 @@ class InjectionRule(BaseRule):
                                         },
                                         endpoint=endpoint['path'],
                                         method="GET",
-                                        severity="high"
+                                        severity="high",
+                                        response=response,
                                     ))
                             
                             elif p_type == "XSS":
-                                if payload in response.text:
+                                response = await client.fetch("GET", test_url, headers=headers,
+                                                              matcher=BodyMatcher([payload]))
+                                if response.match:
                                     findings.append(self.build_finding(
                                         description=f"Reflected XSS detected with payload: {payload}",
                                         details={
@@ -85,7 +91,8 @@ class InjectionRule(BaseRule):
                                         },
                                         endpoint=endpoint['path'],
                                         method="GET",
-                                        severity="high"
+                                        severity="high",
+                                        response=response,
                                     ))
                         except:
                             pass
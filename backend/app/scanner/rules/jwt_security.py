@@ -1,9 +1,10 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import base64
 import json
 import hmac
 import hashlib
 import httpx
+from app.scanner.classify import tagged
 from app.scanner.rules.base import BaseRule
 
 
@@ -45,8 +46,6 @@ ADMIN_PAYLOAD = {
 
 WEAK_SECRETS = ["secret", "password", "123456", "changeme", "jwt_secret"]
 
-AUTH_PATH_KEYWORDS = ["/login", "/auth", "/token", "/signin", "/oauth"]
-
 
 class JWTSecurityRule(BaseRule):
     id = "JWT-001"
@@ -70,14 +69,12 @@ class JWTSecurityRule(BaseRule):
     integrity = "High"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
 
         # Identify auth-looking endpoints; fall back to all endpoints
-        auth_endpoints = [
-            ep for ep in endpoints
-            if any(kw in ep.get("path", "").lower() for kw in AUTH_PATH_KEYWORDS)
-        ]
+        auth_endpoints = tagged(endpoints, "auth")
         if not auth_endpoints:
             auth_endpoints = endpoints
 
@@ -85,7 +82,7 @@ class JWTSecurityRule(BaseRule):
         expired_jwt = _build_expired_jwt(ADMIN_PAYLOAD)
         weak_jwts = {secret: _build_hs256_jwt(ADMIN_PAYLOAD, secret) for secret in WEAK_SECRETS}
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0) as client:
             for ep in auth_endpoints:
                 path = ep.get("path", "/")
                 method = ep.get("method", "GET").upper()
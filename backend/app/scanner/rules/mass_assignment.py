@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
 from app.scanner.rules.base import BaseRule
 
@@ -24,6 +24,7 @@ class MassAssignmentRule(BaseRule):
     id = "MASS-ASSIGN-001"
     name = "Mass Assignment / Over-Posting"
     severity = "high"
+    endpoint_scoped = True
     impact = (
         "An attacker can set privileged fields (e.g., role, is_admin, balance) "
         "that should never be modifiable by end users, leading to privilege escalation "
@@ -44,7 +45,8 @@ class MassAssignmentRule(BaseRule):
     integrity = "High"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
 
         write_endpoints = [
@@ -52,7 +54,7 @@ class MassAssignmentRule(BaseRule):
             if ep.get("method", "GET").upper() in WRITE_METHODS
         ]
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0, max_body_bytes=self.body_limit(config)) as client:
             for ep in write_endpoints:
                 path = ep.get("path", "/")
                 method = ep.get("method", "POST").upper()
@@ -72,7 +74,7 @@ class MassAssignmentRule(BaseRule):
                 injected_body.update(SENSITIVE_FIELDS)
 
                 try:
-                    resp = await client.request(method, url, json=injected_body)
+                    resp = await client.fetch(method, url, json=injected_body)
                     status = resp.status_code
 
                     # Flag if the server returns success (2xx) — it accepted the payload
@@ -106,6 +108,7 @@ class MassAssignmentRule(BaseRule):
                                 f"Body included: {list(SENSITIVE_FIELDS.keys())}\n"
                                 f"Response: HTTP {status}"
                             ),
+                            response=resp,
                         ))
                 except Exception:
                     pass
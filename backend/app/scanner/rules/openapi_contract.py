@@ -1,19 +1,26 @@
 import json
-from typing import List, Dict
+import httpx
+from typing import List, Dict, Optional
 from app.scanner.rules.base import BaseRule
+from app.scanner.spec import SpecResolver
 
 class OpenAPIContractRule(BaseRule):
     id = "OPENAPI-CONTRACT"
     name = "OpenAPI Contract Security Review"
     description = "Static analysis of OpenAPI definition for security gaps (Auth, PII, File Uploads)."
     severity = "high"
+    endpoint_scoped = True
+    needs_spec = True
     
     # Default metadata (will be overridden per finding)
     impact = "Varies by issue."
     remediation = "Update OpenAPI definition and implementation."
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
+        # Without the engine's resolver (rule run on its own) refs stay unresolved.
+        spec = self.spec or SpecResolver({})
 
         for endpoint in endpoints:
             path = endpoint['path']
@@ -55,14 +62,13 @@ class OpenAPIContractRule(BaseRule):
                     ))
 
             # Check 2: Unrestricted File Upload (API8/API3)
-            request_body = details.get('requestBody', {})
-            content = request_body.get('content', {})
+            request_body = spec.resolve(details.get('requestBody')) or {}
+            content = request_body.get('content') or {}
             if 'multipart/form-data' in content:
                 schema = content['multipart/form-data'].get('schema', {})
-                properties = schema.get('properties', {})
-                
+
                 # Check for binary/file fields without strict constraints
-                for prop_name, prop_def in properties.items():
+                for prop_name, prop_def in spec.properties(schema):
                     if prop_def.get('type') == 'string' and prop_def.get('format') in ['binary', 'byte']:
                         # Generate Proof of Concept (Schema snippet)
                         poc_data = {
@@ -97,24 +103,23 @@ class OpenAPIContractRule(BaseRule):
             pii_keywords = ['ssn', 'socialsecurity', 'passport', 'idnumber', 'citizenship', 'dob', 'birthdate', 'phone', 'mobile', 'creditcard', 'cardnumber']
             
             # Check Request Body properties
-            if 'content' in request_body:
-                for content_type, media in request_body['content'].items():
-                    schema = media.get('schema', {})
-                    self._check_schema_for_pii(schema, pii_keywords, path, method, findings, "Request Body")
+            for content_type, media in content.items():
+                schema = media.get('schema', {})
+                self._check_schema_for_pii(spec, schema, pii_keywords, path, method, findings, "Request Body")
 
             responses = details.get('responses', {})
             for status_code, response_def in responses.items():
-                response_content = response_def.get('content', {})
+                response_content = (spec.resolve(response_def) or {}).get('content') or {}
                 for content_type, media in response_content.items():
                     schema = media.get('schema', {})
-                    self._check_schema_for_pii(schema, pii_keywords, path, method, findings, f"Response {status_code}")
+                    self._check_schema_for_pii(spec, schema, pii_keywords, path, method, findings,
+                                               f"Response {status_code}")
 
         return findings
 
-    def _check_schema_for_pii(self, schema, keywords, path, method, findings, location):
-        properties = schema.get('properties', {})
-        for prop_name, prop_def in properties.items():
-            lower_name = prop_name.lower()
+    def _check_schema_for_pii(self, spec, schema, keywords, path, method, findings, location):
+        for prop_name, prop_def in spec.properties(schema):
+            lower_name = prop_name.rsplit('.', 1)[-1].lower()
             if any(k in lower_name for k in keywords):
                 # Generate Proof of Concept
                 poc_data = {
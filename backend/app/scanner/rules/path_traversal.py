@@ -1,5 +1,7 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
+from app.scanner.body import BodyMatcher
+from app.scanner.classify import tagged
 from app.scanner.rules.base import BaseRule
 
 
@@ -22,18 +24,12 @@ FILE_PARAM_NAMES = [
     "resource", "load", "include",
 ]
 
-# Endpoint path keywords that suggest file-serving behaviour
-FILE_PATH_KEYWORDS = [
-    "/file", "/download", "/static", "/media", "/resource",
-    "/template", "/load", "/include", "/view", "/read",
-    "/export", "/report", "/attachment",
-]
-
 
 class PathTraversalRule(BaseRule):
     id = "PATH-TRAV-001"
     name = "Path Traversal"
     severity = "high"
+    time_budget = 900.0  # one 8s-timeout probe per payload and parameter adds up on slow targets
     impact = (
         "An attacker can read arbitrary files from the server filesystem, including "
         "credentials, private keys, application source code, and sensitive configuration."
@@ -53,18 +49,16 @@ class PathTraversalRule(BaseRule):
     integrity = "None"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
 
         # Prioritise endpoints that look like they serve files
-        file_endpoints = [
-            ep for ep in endpoints
-            if any(kw in ep.get("path", "").lower() for kw in FILE_PATH_KEYWORDS)
-        ]
+        file_endpoints = tagged(endpoints, "file-serving")
         if not file_endpoints:
             file_endpoints = endpoints
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0, max_body_bytes=self.body_limit(config)) as client:
             for ep in file_endpoints:
                 path = ep.get("path", "/")
                 method = ep.get("method", "GET").upper()
@@ -74,54 +68,52 @@ class PathTraversalRule(BaseRule):
                     # --- Via query parameters ---
                     for param in FILE_PARAM_NAMES:
                         try:
-                            resp = await client.get(url, params={param: payload})
-                            body = resp.text
-
-                            for marker in UNIX_PASSWD_MARKERS:
-                                if marker in body:
-                                    findings.append(self.build_finding(
-                                        description="Path traversal vulnerability confirmed — /etc/passwd read.",
-                                        details=(
-                                            f"The payload '{payload}' supplied via the '{param}' "
-                                            f"query parameter caused the server to return contents "
-                                            f"that include the marker '{marker}', indicating "
-                                            f"/etc/passwd was read. "
-                                            f"URL: {url}, HTTP status: {resp.status_code}"
-                                        ),
-                                        endpoint=path,
-                                        method="GET",
-                                        proof_of_concept=(
-                                            f"GET {url}?{param}={payload}\n"
-                                            f"Response contained: '{marker}'"
-                                        ),
-                                    ))
-                                    break  # one finding per param/payload
-                        except Exception:
-                            pass
-
-                    # --- Via URL path suffix (append payload to path) ---
-                    try:
-                        traversal_url = f"{url}/{payload}"
-                        resp = await client.get(traversal_url)
-                        body = resp.text
-                        for marker in UNIX_PASSWD_MARKERS:
-                            if marker in body:
+                            resp = await client.fetch("GET", url, matcher=BodyMatcher(UNIX_PASSWD_MARKERS),
+                                                      params={param: payload})
+                            marker = resp.match
+                            if marker:  # one finding per param/payload
                                 findings.append(self.build_finding(
-                                    description="Path traversal vulnerability confirmed via URL path.",
+                                    description="Path traversal vulnerability confirmed — /etc/passwd read.",
                                     details=(
-                                        f"Appending the traversal payload '{payload}' to the "
-                                        f"endpoint path caused the server to return contents "
-                                        f"containing '{marker}', indicating /etc/passwd was read. "
-                                        f"URL: {traversal_url}, HTTP status: {resp.status_code}"
+                                        f"The payload '{payload}' supplied via the '{param}' "
+                                        f"query parameter caused the server to return contents "
+                                        f"that include the marker '{marker}', indicating "
+                                        f"/etc/passwd was read. "
+                                        f"URL: {url}, HTTP status: {resp.status_code}"
                                     ),
-                                    endpoint=f"{path}/{payload}",
+                                    endpoint=path,
                                     method="GET",
                                     proof_of_concept=(
-                                        f"GET {traversal_url}\n"
+                                        f"GET {url}?{param}={payload}\n"
                                         f"Response contained: '{marker}'"
                                     ),
+                                    response=resp,
                                 ))
-                                break
+                        except Exception:
+                            pass
+
+                    # --- Via URL path suffix (append payload to path) ---
+                    try:
+                        traversal_url = f"{url}/{payload}"
+                        resp = await client.fetch("GET", traversal_url, matcher=BodyMatcher(UNIX_PASSWD_MARKERS))
+                        marker = resp.match
+                        if marker:
+                            findings.append(self.build_finding(
+                                description="Path traversal vulnerability confirmed via URL path.",
+                                details=(
+                                    f"Appending the traversal payload '{payload}' to the "
+                                    f"endpoint path caused the server to return contents "
+                                    f"containing '{marker}', indicating /etc/passwd was read. "
+                                    f"URL: {traversal_url}, HTTP status: {resp.status_code}"
+                                ),
+                                endpoint=f"{path}/{payload}",
+                                method="GET",
+                                proof_of_concept=(
+                                    f"GET {traversal_url}\n"
+                                    f"Response contained: '{marker}'"
+                                ),
+                                response=resp,
+                            ))
                     except Exception:
                         pass
 
@@ -129,30 +121,30 @@ class PathTraversalRule(BaseRule):
                     if method in ("POST", "PUT", "PATCH"):
                         for param in FILE_PARAM_NAMES:
                             try:
-                                resp = await client.request(
-                                    method, url, json={param: payload}
+                                resp = await client.fetch(
+                                    method, url, matcher=BodyMatcher(UNIX_PASSWD_MARKERS),
+                                    json={param: payload},
                                 )
-                                body = resp.text
-                                for marker in UNIX_PASSWD_MARKERS:
-                                    if marker in body:
-                                        findings.append(self.build_finding(
-                                            description="Path traversal vulnerability confirmed via request body.",
-                                            details=(
-                                                f"The payload '{payload}' in the '{param}' body "
-                                                f"field caused the server to return '{marker}', "
-                                                f"indicating /etc/passwd was read. "
-                                                f"URL: {url}, Method: {method}, "
-                                                f"HTTP status: {resp.status_code}"
-                                            ),
-                                            endpoint=path,
-                                            method=method,
-                                            proof_of_concept=(
-                                                f"{method} {url}\n"
-                                                f"Body: {{\"{param}\": \"{payload}\"}}\n"
-                                                f"Response contained: '{marker}'"
-                                            ),
-                                        ))
-                                        break
+                                marker = resp.match
+                                if marker:
+                                    findings.append(self.build_finding(
+                                        description="Path traversal vulnerability confirmed via request body.",
+                                        details=(
+                                            f"The payload '{payload}' in the '{param}' body "
+                                            f"field caused the server to return '{marker}', "
+                                            f"indicating /etc/passwd was read. "
+                                            f"URL: {url}, Method: {method}, "
+                                            f"HTTP status: {resp.status_code}"
+                                        ),
+                                        endpoint=path,
+                                        method=method,
+                                        proof_of_concept=(
+                                            f"{method} {url}\n"
+                                            f"Body: {{\"{param}\": \"{payload}\"}}\n"
+                                            f"Response contained: '{marker}'"
+                                        ),
+                                        response=resp,
+                                    ))
                             except Exception:
                                 pass
 
@@ -1,7 +1,7 @@
 import httpx
 import asyncio
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.scanner.rules.base import BaseRule
 
 class RateLimitRule(BaseRule):
@@ -15,7 +15,8 @@ class RateLimitRule(BaseRule):
     cvss_vector = "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:N/I:N/A:H"
     availability = "High"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
         if not endpoints:
             return findings
@@ -38,10 +39,12 @@ class RateLimitRule(BaseRule):
         if config.get('auth_header'):
             headers['Authorization'] = config['auth_header']
 
-        async with httpx.AsyncClient(verify=False, headers=headers) as client:
+        async with self.session(client, headers=headers) as client:
             tasks = []
             for _ in range(request_count):
-                tasks.append(client.get(url))
+                # Every request must reach the target (no scan cache). The burst stays under the scan's
+                # per-host and rate limits, but the 429s it provokes must not slow down the other rules.
+                tasks.append(client.get(url, extensions={"scan_cache": False, "scan_adaptive": False}))
             
             responses = await asyncio.gather(*tasks, return_exceptions=True)
             
@@ -57,17 +60,17 @@ class RateLimitRule(BaseRule):
                 # Rate limiting is present, which is good.
                 pass 
             elif status_codes.count(200) == request_count:
-                # All requests succeeded instantly - potential lack of rate limiting
+                # Every request succeeded without a single 429 - potential lack of rate limiting.
+                # The burst is paced by the scan's own limits, so its duration says little about the target.
                 duration = time.time() - start_time
-                if duration < 2: # 50 requests in under 2 seconds is quite fast/unrestricted
-                    findings.append(self.build_finding(
-                        description=f"Potential lack of rate limiting. Sent {request_count} requests in {duration:.2f}s without 429 response.",
-                        details={
-                            "status_codes": dict((i, status_codes.count(i)) for i in set(status_codes)),
-                            "owasp": "API4: Unrestricted Resource Consumption"
-                        },
-                        endpoint=test_endpoint['path'],
-                        method="GET"
-                    ))
+                findings.append(self.build_finding(
+                    description=f"Potential lack of rate limiting. Sent {request_count} requests in {duration:.2f}s without 429 response.",
+                    details={
+                        "status_codes": dict((i, status_codes.count(i)) for i in set(status_codes)),
+                        "owasp": "API4: Unrestricted Resource Consumption"
+                    },
+                    endpoint=test_endpoint['path'],
+                    method="GET"
+                ))
 
         return findings
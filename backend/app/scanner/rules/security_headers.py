@@ -1,9 +1,9 @@
-import httpx
 import json
 from typing import List, Dict
-from app.scanner.rules.base import BaseRule
+from app.scanner.planner import HEADERS_ONLY, Probe, ProbeResult
+from app.scanner.rules.base import ProbeRule
 
-class SecurityHeadersRule(BaseRule):
+class SecurityHeadersRule(ProbeRule):
     id = "SEC-HEADERS"
     name = "Security Headers Check"
     description = "Checks for missing security headers and CORS misconfigurations."
@@ -16,52 +16,54 @@ class SecurityHeadersRule(BaseRule):
     integrity = "Low"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    def plan(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Probe]:
+        return [Probe.make("GET", target_url, max_body_bytes=HEADERS_ONLY)]
+
+    def analyze(self, target_url: str, endpoints: List[Dict], config: Dict,
+                results: List[ProbeResult]) -> List[Dict]:
         findings = []
-        try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.get(target_url)
-                headers = response.headers
+        response = results[0].response
+        if response is None:
+            return findings
+
+        headers = response.headers
 
-                missing_headers = []
-                required_headers = [
-                    "X-Content-Type-Options",
-                    "X-Frame-Options",
-                    "Content-Security-Policy"
-                ]
+        missing_headers = []
+        required_headers = [
+            "X-Content-Type-Options",
+            "X-Frame-Options",
+            "Content-Security-Policy"
+        ]
 
-                for h in required_headers:
-                    if h not in headers:
-                        missing_headers.append(h)
+        for h in required_headers:
+            if h not in headers:
+                missing_headers.append(h)
 
-                if missing_headers:
-                    findings.append(self.build_finding(
-                        description=f"Missing security headers: {', '.join(missing_headers)}",
-                        details={
-                            "explanation": f"The application is missing the following security headers: {', '.join(missing_headers)}. This can leave it vulnerable to various attacks.",
-                            "owasp": "API8: Security Misconfiguration"
-                        },
-                        proof_of_concept=f"Response Headers:\n{json.dumps(dict(headers), indent=2)}",
-                        endpoint="/",
-                        method="GET",
-                        severity="low"
-                    ))
+        if missing_headers:
+            findings.append(self.build_finding(
+                description=f"Missing security headers: {', '.join(missing_headers)}",
+                details={
+                    "explanation": f"The application is missing the following security headers: {', '.join(missing_headers)}. This can leave it vulnerable to various attacks.",
+                    "owasp": "API8: Security Misconfiguration"
+                },
+                proof_of_concept=f"Response Headers:\n{json.dumps(dict(headers), indent=2)}",
+                endpoint="/",
+                method="GET",
+                severity="low"
+            ))
 
-                if "Access-Control-Allow-Origin" in headers:
-                    if headers["Access-Control-Allow-Origin"] == "*":
-                         findings.append(self.build_finding(
-                            description="CORS Access-Control-Allow-Origin is set to wildcard (*)",
-                            details={
-                                "explanation": "The Access-Control-Allow-Origin header is set to *, allowing any domain to access resources.",
-                                "owasp": "API8: Security Misconfiguration"
-                            },
-                            proof_of_concept=f"Response Headers:\n{json.dumps(dict(headers), indent=2)}",
-                            endpoint="/",
-                            method="GET",
-                            severity="medium"
-                        ))
+        if "Access-Control-Allow-Origin" in headers:
+            if headers["Access-Control-Allow-Origin"] == "*":
+                 findings.append(self.build_finding(
+                    description="CORS Access-Control-Allow-Origin is set to wildcard (*)",
+                    details={
+                        "explanation": "The Access-Control-Allow-Origin header is set to *, allowing any domain to access resources.",
+                        "owasp": "API8: Security Misconfiguration"
+                    },
+                    proof_of_concept=f"Response Headers:\n{json.dumps(dict(headers), indent=2)}",
+                    endpoint="/",
+                    method="GET",
+                    severity="medium"
+                ))
 
-        except Exception as e:
-            pass # Handle errors gracefully
-            
         return findings
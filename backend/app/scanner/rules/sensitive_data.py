@@ -1,61 +1,61 @@
-import httpx
 import re
 from typing import List, Dict
-from app.scanner.rules.base import BaseRule
+from app.scanner.planner import Probe, ProbeResult
+from app.scanner.rules.base import ProbeRule
 
-class SensitiveDataRule(BaseRule):
+class SensitiveDataRule(ProbeRule):
     id = "SENSITIVE-DATA"
     name = "Sensitive Data Exposure"
     description = "Checks for sensitive information (PII, secrets) in API responses."
     severity = "high"
+    endpoint_scoped = True
     
     impact = "Loss of confidentiality, identity theft, or compromise of backend systems (if keys leaked)."
     remediation = "Ensure sensitive data is not returned in API responses. Use PII masking. Store secrets securely."
     cvss_vector = "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:N/A:N"
     confidentiality = "High"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
-        findings = []
-        
-        # Regex patterns for sensitive data
-        patterns = {
-            "Email": r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+',
-            "SSN (US)": r'\b\d{3}-\d{2}-\d{4}\b',
-            "API Key": r'(?i)(api_key|apikey|secret|token)["\']?\s*[:=]\s*["\']?[a-zA-Z0-9]{16,}["\']?',
-            # "Credit Card": r'\b(?:\d[ -]*?){13,16}\b' # Too many false positives often
-        }
+    # Regex patterns for sensitive data
+    patterns = {
+        "Email": r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+',
+        "SSN (US)": r'\b\d{3}-\d{2}-\d{4}\b',
+        "API Key": r'(?i)(api_key|apikey|secret|token)["\']?\s*[:=]\s*["\']?[a-zA-Z0-9]{16,}["\']?',
+        # "Credit Card": r'\b(?:\d[ -]*?){13,16}\b' # Too many false positives often
+    }
+
+    def plan(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Probe]:
+        headers = self.auth_headers(config)
+        return [
+            Probe.make("GET", f"{target_url}{endpoint['path']}", headers, max_body_bytes=self.body_limit(config))
+            for endpoint in endpoints if endpoint['method'] == 'GET'
+        ]
 
-        async with httpx.AsyncClient(verify=False) as client:
-            headers = {}
-            if config.get('auth_header'):
-                headers['Authorization'] = config['auth_header']
+    def analyze(self, target_url: str, endpoints: List[Dict], config: Dict,
+                results: List[ProbeResult]) -> List[Dict]:
+        findings = []
+        gets = [endpoint for endpoint in endpoints if endpoint['method'] == 'GET']
+        for endpoint, result in zip(gets, results):
+            response = result.response
+            if response is None:
+                continue
+            text = response.text
 
-            for endpoint in endpoints:
-                if endpoint['method'] != 'GET':
-                    continue
-                
-                url = f"{target_url}{endpoint['path']}"
-                try:
-                    response = await client.get(url, headers=headers)
-                    text = response.text
-                    
-                    for p_name, p_regex in patterns.items():
-                        matches = re.findall(p_regex, text)
-                        if matches:
-                            # Filter out own user email if known?
-                            # For now just report any finding
-                            findings.append(self.build_finding(
-                                description=f"Potential {p_name} exposure in response.",
-                                details={
-                                    "count": len(matches),
-                                    "snippet": str(matches[:3]),
-                                    "owasp": "API3: Broken Object Property Level Authorization"
-                                },
-                                endpoint=endpoint['path'],
-                                method="GET",
-                                severity="medium"
-                            ))
-                except:
-                    pass
+            for p_name, p_regex in self.patterns.items():
+                matches = re.findall(p_regex, text)
+                if matches:
+                    # Filter out own user email if known?
+                    # For now just report any finding
+                    findings.append(self.build_finding(
+                        description=f"Potential {p_name} exposure in response.",
+                        details={
+                            "count": len(matches),
+                            "snippet": str(matches[:3]),
+                            "owasp": "API3: Broken Object Property Level Authorization"
+                        },
+                        endpoint=endpoint['path'],
+                        method="GET",
+                        severity="medium",
+                        response=response,
+                    ))
 
         return findings
@@ -1,13 +1,10 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import httpx
+from app.scanner.body import BodyMatcher
+from app.scanner.classify import tagged
 from app.scanner.rules.base import BaseRule
 
 
-SSRF_PATH_KEYWORDS = [
-    "/fetch", "/proxy", "/redirect", "/url", "/webhook",
-    "/callback", "/load", "/download", "/import", "/request",
-]
-
 SSRF_PAYLOADS = [
     "http://127.0.0.1",
     "http://localhost:80",
@@ -38,6 +35,7 @@ class SSRFCheckRule(BaseRule):
     id = "SSRF-001"
     name = "Server-Side Request Forgery (SSRF)"
     severity = "high"
+    time_budget = 900.0  # one 8s-timeout probe per payload and parameter adds up on slow targets
     impact = (
         "An attacker can make the server issue requests to internal services, "
         "cloud metadata endpoints, or other hosts not accessible from the internet, "
@@ -58,19 +56,17 @@ class SSRFCheckRule(BaseRule):
     integrity = "None"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    async def run(self, target_url: str, endpoints: List[Dict], config: Dict,
+                  client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
         findings = []
 
         # Prioritise endpoints whose paths suggest URL-handling behaviour
-        ssrf_candidates = [
-            ep for ep in endpoints
-            if any(kw in ep.get("path", "").lower() for kw in SSRF_PATH_KEYWORDS)
-        ]
+        ssrf_candidates = tagged(endpoints, "url-accepting")
         # Fall back to all endpoints if no obvious candidates
         if not ssrf_candidates:
             ssrf_candidates = endpoints
 
-        async with httpx.AsyncClient(verify=False, timeout=8.0) as client:
+        async with self.session(client, timeout=8.0, max_body_bytes=self.body_limit(config)) as client:
             for ep in ssrf_candidates:
                 path = ep.get("path", "/")
                 method = ep.get("method", "GET").upper()
@@ -80,20 +76,16 @@ class SSRFCheckRule(BaseRule):
                     # --- Via query parameters ---
                     for param in QUERY_PARAM_NAMES:
                         try:
-                            resp = await client.get(url, params={param: payload})
-                            body = resp.text.lower()
-
-                            triggered = False
-                            matched_indicator = None
-                            # A 200 with substantial body from an internal URL is suspicious
-                            if resp.status_code == 200 and len(resp.content) > 50:
-                                triggered = True
+                            resp = await client.fetch(
+                                "GET", url, matcher=BodyMatcher(SSRF_INDICATORS, ignore_case=True),
+                                params={param: payload},
+                            )
                             # Error messages that indicate an outbound connection was attempted
-                            for indicator in SSRF_INDICATORS:
-                                if indicator in body:
-                                    triggered = True
-                                    matched_indicator = indicator
-                                    break
+                            matched_indicator = resp.match.lower() if resp.match else None
+                            # A 200 with substantial body from an internal URL is suspicious
+                            triggered = matched_indicator is not None or (
+                                resp.status_code == 200 and len(resp.content) > 50
+                            )
 
                             if triggered:
                                 findings.append(self.build_finding(
@@ -115,6 +107,7 @@ class SSRFCheckRule(BaseRule):
                                         f"Response: HTTP {resp.status_code} "
                                         f"({len(resp.content)} bytes)"
                                     ),
+                                    response=resp,
                                 ))
                                 break  # one finding per payload per endpoint
                         except Exception:
@@ -124,22 +117,17 @@ class SSRFCheckRule(BaseRule):
                     if method in ("POST", "PUT", "PATCH"):
                         for param in QUERY_PARAM_NAMES:
                             try:
-                                resp = await client.request(
+                                resp = await client.fetch(
                                     method,
                                     url,
+                                    matcher=BodyMatcher(SSRF_INDICATORS, ignore_case=True),
                                     json={param: payload},
                                 )
-                                body = resp.text.lower()
 
-                                triggered = False
-                                matched_indicator = None
-                                if resp.status_code == 200 and len(resp.content) > 50:
-                                    triggered = True
-                                for indicator in SSRF_INDICATORS:
-                                    if indicator in body:
-                                        triggered = True
-                                        matched_indicator = indicator
-                                        break
+                                matched_indicator = resp.match.lower() if resp.match else None
+                                triggered = matched_indicator is not None or (
+                                    resp.status_code == 200 and len(resp.content) > 50
+                                )
 
                                 if triggered:
                                     findings.append(self.build_finding(
@@ -162,6 +150,7 @@ class SSRFCheckRule(BaseRule):
                                             f"Response: HTTP {resp.status_code} "
                                             f"({len(resp.content)} bytes)"
                                         ),
+                                        response=resp,
                                     ))
                                     break
                             except Exception:
@@ -1,10 +1,10 @@
-import httpx
 from typing import List, Dict
 
-from app.scanner.rules.base import BaseRule
+from app.scanner.planner import HEADERS_ONLY, Probe, ProbeResult
+from app.scanner.rules.base import ProbeRule
 
 
-class TLSEnforcementRule(BaseRule):
+class TLSEnforcementRule(ProbeRule):
     id = "TLS-ENFORCE"
     name = "TLS Enforcement Check"
     description = "Checks whether the API is served over HTTPS or redirects HTTP to HTTPS."
@@ -17,25 +17,18 @@ class TLSEnforcementRule(BaseRule):
     integrity = "High"
     availability = "None"
 
-    async def run(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Dict]:
+    def plan(self, target_url: str, endpoints: List[Dict], config: Dict) -> List[Probe]:
         base_url = target_url.rstrip("/")
-        lower = base_url.lower()
+        if not base_url.lower().startswith("http://"):
+            return []  # already HTTPS, or not an HTTP URL
+        return [Probe.make("GET", base_url, self.auth_headers(config), timeout=8.0, max_body_bytes=HEADERS_ONLY)]
 
-        if lower.startswith("https://"):
-            return []
-
-        if not lower.startswith("http://"):
-            return []
-
-        headers = {}
-        if config.get("auth_header"):
-            headers["Authorization"] = config["auth_header"]
-
-        try:
-            async with httpx.AsyncClient(verify=False, timeout=8.0, follow_redirects=False, headers=headers) as client:
-                resp = await client.get(base_url)
-        except Exception:
+    def analyze(self, target_url: str, endpoints: List[Dict], config: Dict,
+                results: List[ProbeResult]) -> List[Dict]:
+        if not results or results[0].response is None:
             return []
+        base_url = target_url.rstrip("/")
+        resp = results[0].response
 
         location = resp.headers.get("location", "")
         redirects_to_https = location.lower().startswith("https://")
@@ -0,0 +1,375 @@
+"""
+Request scheduler for scan traffic.
+
+Every request a rule sends goes through ``SchedulingTransport``, which enforces:
+  * a global cap on in-flight requests for the scan,
+  * a per-host cap on in-flight requests,
+  * an optional per-host token-bucket requests/second limit,
+  * round-robin queuing across rules, so a rule firing a burst of requests
+    cannot starve the others waiting on the same host,
+  * optionally, an adaptive per-host limit (``AIMDController``) that follows
+    the target's latency and 429/503 responses instead of a fixed cap.
+
+Rules are identified by the ``scan_rule`` request extension set by RuleClient.
+A request sent with ``extensions={"scan_adaptive": False}`` (the rate-limit
+burst, which sets out to provoke 429s) is capped and queued like any other,
+but its response is not fed to the adaptive limit: the 429s and
+``Retry-After`` it provokes neither cut the limit nor pause other rules.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional
+
+import httpx
+
+from app.core.metrics import SCAN_REQUEST_DURATION, SCAN_REQUEST_ERRORS, SCAN_REQUESTS
+
+# Responses that mean "slow down": the target is rate limiting or overloaded.
+THROTTLE_STATUSES = {429, 503}
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, holding at most ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FairGate:
+    """
+    Counting gate with ``limit`` slots. Waiters are queued per rule and
+    released round-robin across rules rather than in global FIFO order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.in_flight = 0
+        self.waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self.waiters.values())
+
+    async def acquire(self, rule: str) -> None:
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(rule, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as we were cancelled.
+                self.release()
+            else:
+                self._discard(rule, fut)
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self._wake()
+
+    def _discard(self, rule: str, fut: asyncio.Future) -> None:
+        queue = self.waiters.get(rule)
+        if queue is None:
+            return
+        try:
+            queue.remove(fut)
+        except ValueError:
+            pass
+        if not queue:
+            del self.waiters[rule]
+
+    def _wake(self) -> None:
+        while self.in_flight < self.limit and self.waiters:
+            rule, queue = next(iter(self.waiters.items()))
+            fut = queue.popleft()
+            if queue:
+                self.waiters.move_to_end(rule)
+            else:
+                del self.waiters[rule]
+            if fut.done():
+                continue
+            self.in_flight += 1
+            fut.set_result(None)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease limit for one host's gate.
+
+    Responses are judged in windows of roughly one limit's worth of requests.
+    A window containing a 429/503 or a timeout, or whose p95 latency exceeds
+    ``latency_tolerance`` times the best p95 seen so far, is congested: the
+    limit is multiplied by ``decrease_factor``. Otherwise it grows by one
+    (doubling until the first congestion, like TCP slow start), up to
+    ``max_limit``. ``Retry-After`` pauses new requests to the host.
+
+    The limit is cut at most once per window: throttles from requests sent
+    before the last cut were already answered by it and are ignored, so a
+    burst of concurrent 429s halves the limit once. When the send time is
+    unknown, throttles are ignored until ``max(8, limit)`` more responses
+    have arrived since the cut.
+    """
+
+    def __init__(self, gate: FairGate, initial_limit: int, max_limit: int, min_limit: int = 1,
+                 latency_tolerance: float = 2.0, decrease_factor: float = 0.5, max_backoff: float = 60.0):
+        self.gate = gate
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.max_backoff = max_backoff
+        self.slow_start = True
+        self.baseline_p95: Optional[float] = None
+        self.paused_until = 0.0
+        self.latencies: List[float] = []
+        self.throttled = 0
+        self.increases = 0
+        self.decreases = 0
+        self.throttled_total = 0
+        self.last_p50: Optional[float] = None
+        self.last_p95: Optional[float] = None
+        self.cut_at: Optional[float] = None
+        self.since_cut = 0
+        gate.set_limit(max(self.min_limit, min(initial_limit, self.max_limit)))
+
+    @property
+    def limit(self) -> int:
+        return self.gate.limit
+
+    async def wait(self) -> None:
+        """Hold new requests while the host has asked us to back off."""
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def record(self, latency: Optional[float], status: Optional[int] = None,
+               retry_after: Optional[str] = None, sent_at: Optional[float] = None) -> None:
+        """Record one response (``latency=None`` for a timed-out request) to a request sent at ``sent_at``."""
+        self.since_cut += 1
+        if latency is None or status in THROTTLE_STATUSES:
+            self.throttled_total += 1
+            if self._after_cut(sent_at):
+                self.throttled += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        delay = parse_retry_after(retry_after) if status in THROTTLE_STATUSES else None
+        if delay:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(delay, self.max_backoff))
+        if self.throttled or len(self.latencies) >= max(8, self.limit):
+            self._adjust()
+
+    def _after_cut(self, sent_at: Optional[float]) -> bool:
+        if self.cut_at is None:
+            return True
+        if sent_at is not None:
+            return sent_at >= self.cut_at
+        return self.since_cut > max(8, self.limit)
+
+    def _adjust(self) -> None:
+        congested = self.throttled > 0
+        if len(self.latencies) >= 4:
+            ordered = sorted(self.latencies)
+            self.last_p50 = _percentile(ordered, 50)
+            self.last_p95 = _percentile(ordered, 95)
+            if self.baseline_p95 is None or self.last_p95 < self.baseline_p95:
+                self.baseline_p95 = self.last_p95
+            elif self.last_p95 > self.baseline_p95 * self.latency_tolerance:
+                congested = True
+        self.latencies.clear()
+        self.throttled = 0
+
+        if congested:
+            self.slow_start = False
+            new_limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+            if new_limit < self.limit:
+                self.decreases += 1
+            self.cut_at = time.monotonic()
+            self.since_cut = 0
+        else:
+            new_limit = min(self.max_limit, self.limit * 2 if self.slow_start else self.limit + 1)
+            if new_limit > self.limit:
+                self.increases += 1
+        self.gate.set_limit(new_limit)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "throttled": self.throttled_total,
+            "p50": self.last_p50,
+            "p95": self.last_p95,
+        }
+
+
+class RequestScheduler:
+    """Scan-wide admission control shared by all rules."""
+
+    def __init__(self, max_in_flight: int, max_in_flight_per_host: int, requests_per_second: float = 0,
+                 adaptive: bool = False, adaptive_initial_limit: int = 4):
+        self.max_in_flight_per_host = max_in_flight_per_host
+        self.requests_per_second = requests_per_second
+        self.adaptive = adaptive
+        self.adaptive_initial_limit = adaptive_initial_limit
+        self.global_gate = FairGate(max_in_flight)
+        self.hosts: Dict[str, FairGate] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.controllers: Dict[str, AIMDController] = {}
+
+    def _host_gate(self, host: str) -> FairGate:
+        gate = self.hosts.get(host)
+        if gate is None:
+            gate = self.hosts[host] = FairGate(self.max_in_flight_per_host)
+            if self.adaptive:
+                self.controllers[host] = AIMDController(
+                    gate, self.adaptive_initial_limit, self.max_in_flight_per_host
+                )
+        return gate
+
+    def record(self, host: str, latency: Optional[float], status: Optional[int] = None,
+               retry_after: Optional[str] = None, sent_at: Optional[float] = None) -> None:
+        """Feed a response (or a timeout, ``latency=None``) to the host's controller."""
+        controller = self.controllers.get(host)
+        if controller is not None:
+            controller.record(latency, status, retry_after, sent_at)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {host: controller.stats() for host, controller in self.controllers.items()}
+
+    async def acquire(self, host: str, rule: str) -> None:
+        host_gate = self._host_gate(host)
+        controller = self.controllers.get(host)
+        if controller is not None:
+            await controller.wait()
+        await host_gate.acquire(rule)
+        try:
+            await self.global_gate.acquire(rule)
+        except BaseException:
+            host_gate.release()
+            raise
+        try:
+            if self.requests_per_second > 0:
+                bucket = self.buckets.get(host)
+                if bucket is None:
+                    bucket = self.buckets[host] = TokenBucket(self.requests_per_second)
+                await bucket.acquire()
+        except BaseException:
+            self.release(host)
+            raise
+
+    def release(self, host: str) -> None:
+        self.global_gate.release()
+        self.hosts[host].release()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees the scheduler slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                release, self._release = self._release, None
+                release()
+
+
+class SchedulingTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that admits each request through a RequestScheduler."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, scheduler: RequestScheduler):
+        self._transport = transport
+        self.scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = f"{request.url.host}:{request.url.port or request.url.scheme}"
+        rule = request.extensions.get("scan_rule", "-")
+        adaptive = request.extensions.get("scan_adaptive") is not False
+        await self.scheduler.acquire(host, rule)
+        started = time.monotonic()
+        request.extensions["scan_sent_at"] = started  # queue wait vs target latency, see perf.py
+        SCAN_REQUESTS.inc(rule)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            SCAN_REQUEST_ERRORS.inc(rule)
+            if adaptive:
+                self.scheduler.record(host, None, sent_at=started)
+            self.scheduler.release(host)
+            raise
+        except BaseException as exc:
+            if isinstance(exc, httpx.TransportError):
+                SCAN_REQUEST_ERRORS.inc(rule)
+            self.scheduler.release(host)
+            raise
+        elapsed = time.monotonic() - started
+        SCAN_REQUEST_DURATION.observe(elapsed, rule)
+        if adaptive:
+            self.scheduler.record(host, elapsed, response.status_code,
+                                  response.headers.get("retry-after"), started)
+        if response.is_closed:
+            # Body was supplied up front (mock/replayed responses); nothing left in flight.
+            self.scheduler.release(host)
+            return response
+        response.stream = _ReleasingStream(response.stream, lambda: self.scheduler.release(host))
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -0,0 +1,109 @@
+"""
+Sharding of large scans across queue workers.
+
+In queue mode, a scan whose endpoint list is larger than
+``SCANNER_SHARD_ENDPOINTS`` is not run by the worker that claims it. That
+worker plans the work units, freezes the endpoint list and creates one
+ScanShard row per shard. Shards are then claimed and run like scans, by any
+worker sharing the database, and write their findings and checkpoints into the
+same ScanJob (work-unit positions and checkpoint keys are already unique per
+scan). The worker that finishes the last shard runs the reduce step,
+``finish_sharded_scan``, which completes the scan.
+"""
+import logging
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.scanner.accounting import TrafficAccount
+from app.scanner.perf import ScanPerf
+from app.models.scan import ScanJob, ScanShard
+
+logger = logging.getLogger(__name__)
+
+
+def shard_count_for(scan: ScanJob, endpoint_count: int, config: Dict) -> int:
+    """How many shards a scan is split into; 1 means the scan runs unsharded."""
+    if settings.SCAN_EXECUTION_MODE != "queue":
+        return 1
+    if scan.shard_count:
+        return scan.shard_count
+    per_shard = config.get('shard_endpoints', settings.SCANNER_SHARD_ENDPOINTS)
+    if not per_shard:
+        return 1
+    return max(1, min(settings.SCANNER_MAX_SHARDS, math.ceil(endpoint_count / int(per_shard))))
+
+
+def shard_of(unit, shard_count: int) -> int:
+    """
+    Shard a work unit belongs to. Endpoint chunks of a rule are spread
+    round-robin, offset by rule so unchunked rules don't all land on shard 0.
+    """
+    return (unit.rule_index + unit.chunk_index) % shard_count
+
+
+def ensure_shards(db: Session, scan: ScanJob, shard_count: int, units: List) -> None:
+    """
+    Create the shards of a scan, or put unfinished shards of a resumed scan
+    back in the queue. The caller's lease on the scan is dropped: from here on
+    the scan is driven by its shards.
+    """
+    if not scan.shards:
+        totals = [0] * shard_count
+        for unit in units:
+            totals[shard_of(unit, shard_count)] += 1
+        for index, total in enumerate(totals):
+            db.add(ScanShard(job_id=scan.id, index=index, status="pending", units_total=total))
+    else:
+        for shard in scan.shards:
+            if shard.status in ("failed", "cancelled", "timed_out"):
+                shard.status = "pending"
+                shard.attempts = 0
+                shard.completed_at = None
+    scan.shard_count = shard_count
+    scan.lease_owner = None
+    scan.heartbeat_at = None
+    db.commit()
+
+
+def finish_sharded_scan(db: Session, job_id: int) -> Optional[str]:
+    """
+    Reduce step: once no shard is pending or running, finish the scan:
+    ``cancelled`` if a cancel was requested, ``timed_out`` if a shard hit the
+    deadline, ``failed`` if one failed, else ``completed``. The shards'
+    traffic counters and latency histograms are merged into the scan's. Returns the new status, or
+    None while shards are outstanding or the scan already finished.
+    """
+    rows = db.query(ScanShard.status, ScanShard.traffic, ScanShard.perf).filter(ScanShard.job_id == job_id).all()
+    statuses = [status for status, _, _ in rows]
+    if not statuses or any(status in ("pending", "running") for status in statuses):
+        return None
+    cancelled = db.query(ScanJob.cancel_requested_at).filter(ScanJob.id == job_id).scalar() is not None
+    traffic = TrafficAccount.merge(traffic for _, traffic, _ in rows)
+    perf = ScanPerf.merge(perf for _, _, perf in rows)
+    values = {"completed_at": datetime.utcnow(), "traffic": traffic, "perf": perf}
+    if cancelled:
+        values.update(status="cancelled", status_reason="Cancelled by request")
+    elif "timed_out" in statuses:
+        values.update(status="timed_out", status_reason="Scan deadline reached")
+    elif "failed" in statuses:
+        values.update(status="failed")
+    elif traffic["budget_exhausted"]:
+        values.update(status="completed",
+                      status_reason=f"Request budget of {traffic['max_requests']} requests exhausted")
+    else:
+        values.update(status="completed")
+    finished = db.execute(
+        update(ScanJob)
+        .where(ScanJob.id == job_id, ScanJob.status == "running")
+        .values(**values)
+    ).rowcount
+    db.commit()
+    if not finished:
+        return None
+    logger.info(f"Scan {job_id} {values['status']} after {len(statuses)} shards")
+    return values["status"]
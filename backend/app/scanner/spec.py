@@ -0,0 +1,333 @@
+"""
+Lazy, memoized ``$ref`` resolution for OpenAPI specs.
+
+A SpecResolver resolves references only when a rule asks for them:
+
+- local refs (``#/components/schemas/User``);
+- refs into other documents relative to the spec's location
+  (``common.yaml#/User``, ``../shared/errors.json``).
+
+Refs from a spec fetched by URL always resolve against that URL, and files
+are only read for a spec that was itself read from a local file. Refs to
+other files from an inline spec stay unresolved.
+
+Each target is looked up once and then served from a memo.
+
+Local files are read on first use. Documents behind HTTP(S) URLs cannot be
+read synchronously while a scan runs. The engine fetches them first, with
+``prefetch``: at most MAX_REF_DOCUMENTS, and only from the spec's own host
+when the spec was fetched by URL. A ref that cannot be resolved is left as the ``$ref`` node.
+
+``properties`` flattens a schema into ``(dotted.name, definition)`` pairs.
+It looks through refs, ``allOf``/``anyOf``/``oneOf``, nested objects and
+array items. The result is memoized per schema node, so a component shared
+by hundreds of operations is walked once. Recursive schemas stop at the
+back-reference. Parts of a cycle are memoized only per starting schema,
+so the answer does not depend on which schema was asked about first.
+
+Spec documents are parsed once, with the parser ``spec_format`` picks:
+JSON when the content starts with ``{`` or ``[``, unless it is declared as
+YAML; YAML otherwise. YAML goes through libyaml (``CSafeLoader``) when
+PyYAML was built with it, which is many times faster than the pure-Python
+loader.
+
+``parse_document_async`` keeps parsing off the event loop. YAML specs of
+SCANNER_SPEC_PARSE_PROCESS_BYTES or more go to a worker process, because
+the YAML loader holds the GIL for long stretches, and a thread would still
+stall the loop for seconds on a multi-megabyte spec. JSON and smaller YAML
+are parsed in a thread. For JSON a process does not help: unpickling its
+result costs about as much as ``json.loads``.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urljoin, urlsplit
+
+import yaml
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_REF_CHAIN = 32
+MAX_REF_DOCUMENTS = 50  # remote documents ``prefetch`` loads per spec
+
+Location = Optional[str]  # URL or file path of the document a node lives in; None = the root spec
+
+
+def _is_url(location: Location) -> bool:
+    return bool(location) and location.split(":", 1)[0].lower() in ("http", "https")
+
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml when PyYAML was built with it
+
+_YAML_NAMES = (".yaml", ".yml")
+_BLANK = b" \t\r\n\xef\xbb\xbf"  # whitespace and the UTF-8 BOM
+
+
+def spec_format(content: bytes, content_type: Optional[str] = None, name: Optional[str] = None) -> str:
+    """``"json"`` or ``"yaml"``: the one parser to use for ``content``."""
+    declared = (content_type or "").lower()
+    if "yaml" in declared or (name or "").lower().split("?")[0].endswith(_YAML_NAMES):
+        return "yaml"
+    return "json" if content[:256].lstrip(_BLANK)[:1] in (b"{", b"[") else "yaml"
+
+
+def parse_document(content: bytes, content_type: Optional[str] = None, name: Optional[str] = None) -> Any:
+    """Parse a JSON or YAML document. Raises ValueError or yaml.YAMLError."""
+    if spec_format(content, content_type, name) == "json":
+        return json.loads(content)
+    return yaml.load(content, Loader=YAML_LOADER)
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _parse_pool = ProcessPoolExecutor(max_workers=settings.SCANNER_SPEC_PARSE_WORKERS,
+                                          mp_context=multiprocessing.get_context("spawn"))
+    return _parse_pool
+
+
+def parses_in_process(content: bytes, content_type: Optional[str] = None, name: Optional[str] = None) -> bool:
+    return (settings.SCANNER_SPEC_PARSE_WORKERS > 0 and len(content) >= settings.SCANNER_SPEC_PARSE_PROCESS_BYTES
+            and spec_format(content, content_type, name) == "yaml")
+
+
+async def parse_document_async(content: bytes, content_type: Optional[str] = None,
+                               name: Optional[str] = None) -> Any:
+    """``parse_document`` in a worker process (large YAML) or a thread, never on the event loop."""
+    global _parse_pool
+    if parses_in_process(content, content_type, name):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_pool(), parse_document, content,
+                                                                    content_type, name)
+        except BrokenProcessPool as e:
+            logger.warning(f"Spec parser process failed ({e}); parsing in a thread")
+            _parse_pool = None
+    return await asyncio.to_thread(parse_document, content, content_type, name)
+
+
+def _load_file(location: str) -> Any:
+    with open(location, "rb") as f:
+        return parse_document(f.read(), name=location)
+
+
+def _walk_refs(node: Any):
+    """Yield every ``$ref`` string in a document (iteratively, so deep specs are fine)."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                yield ref
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+class SpecResolver:
+    def __init__(self, spec: Dict, location: Location = None,
+                 loader: Callable[[str], Any] = _load_file):
+        self.spec = spec
+        self.location = location
+        self.loader = loader
+        self.documents: Dict[Location, Any] = {None: spec}
+        if location:
+            self.documents[location] = spec
+        self._targets: Dict[Tuple[Location, str], Tuple[Any, Location]] = {}
+        self._properties: Dict[int, Tuple[Dict, List[Tuple[str, Dict]]]] = {}  # subtrees that close no cycle
+        self._roots: Dict[int, Tuple[Dict, List[Tuple[str, Dict]]]] = {}  # per schema ``properties`` started at
+        self.unresolved: Set[str] = set()
+
+    # ── Documents ──
+
+    def _document_location(self, ref_document: str, base: Location) -> Location:
+        """Where ``ref_document`` lives; KeyError for a file ref outside a spec read from a local file."""
+        base = base or self.location
+        if _is_url(base):
+            return urljoin(base, ref_document)  # "/etc/passwd" stays on the spec's host
+        if _is_url(ref_document):
+            return ref_document
+        if base is None:
+            raise KeyError(ref_document)  # inline spec: no directory to resolve against
+        if os.path.isabs(ref_document):
+            return ref_document
+        return os.path.normpath(os.path.join(os.path.dirname(base), unquote(ref_document)))
+
+    def _document(self, location: Location) -> Any:
+        if location in self.documents:
+            return self.documents[location]
+        document = None
+        if not _is_url(location):
+            try:
+                document = self.loader(location)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                logger.warning(f"Cannot load referenced document {location}: {e}")
+        self.documents[location] = document
+        return document
+
+    async def prefetch(self, fetch: Callable[[str], Awaitable[Any]]) -> None:
+        """
+        Load the HTTP(S) documents reachable from the spec through ``fetch``:
+        at most MAX_REF_DOCUMENTS, and for a spec fetched by URL only those on
+        its own scheme and host. Refs into any others stay unresolved.
+        """
+        origin = urlsplit(self.location)[:2] if _is_url(self.location) else None
+        fetched = 0
+        pending = [None]
+        seen: Set[Location] = {None}
+        while pending:
+            base = pending.pop()
+            document = self.documents.get(base)
+            for ref in set(_walk_refs(document)):
+                ref_document = ref.partition("#")[0]
+                if not ref_document:
+                    continue
+                try:
+                    location = self._document_location(ref_document, base)
+                except KeyError:
+                    continue
+                if location in seen:
+                    continue
+                seen.add(location)
+                if not _is_url(location):
+                    continue
+                if location not in self.documents:
+                    if origin is not None and urlsplit(location)[:2] != origin:
+                        logger.warning(f"Not following $ref to {location}: not on the spec's host")
+                        continue
+                    if fetched >= MAX_REF_DOCUMENTS:
+                        logger.warning(f"Not following $ref to {location}: {MAX_REF_DOCUMENTS} documents loaded")
+                        continue
+                    fetched += 1
+                    self.documents[location] = await fetch(location)
+                pending.append(location)
+
+    # ── References ──
+
+    def _pointer(self, document: Any, pointer: str) -> Any:
+        node = document
+        for token in pointer.lstrip("/").split("/") if pointer.strip("/") else []:
+            token = unquote(token).replace("~1", "/").replace("~0", "~")
+            if isinstance(node, dict):
+                node = node[token]
+            elif isinstance(node, list):
+                node = node[int(token)]
+            else:
+                raise KeyError(token)
+        return node
+
+    def _target(self, ref: str, base: Location) -> Tuple[Any, Location]:
+        ref_document, _, pointer = ref.partition("#")
+        location = self._document_location(ref_document, base) if ref_document else base
+        key = (location, pointer)
+        cached = self._targets.get(key)
+        if cached is not None:
+            return cached
+        document = self._document(location)
+        if document is None:
+            raise KeyError(ref)
+        target = self._targets[key] = (self._pointer(document, pointer), location)
+        return target
+
+    def resolve_in(self, node: Any, base: Location = None) -> Tuple[Any, Location]:
+        """Follow ``node``'s ``$ref`` chain; returns the target and the document it lives in."""
+        seen = 0
+        while isinstance(node, dict) and isinstance(node.get("$ref"), str):
+            ref = node["$ref"]
+            seen += 1
+            if seen > MAX_REF_CHAIN:
+                break
+            try:
+                node, base = self._target(ref, base)
+            except (KeyError, IndexError, ValueError):
+                self.unresolved.add(ref)
+                break
+        return node, base
+
+    def resolve(self, node: Any, base: Location = None) -> Any:
+        return self.resolve_in(node, base)[0]
+
+    def referenced(self, node: Any, base: Location = None) -> List[Tuple[str, Any]]:
+        """Every ``(ref, target)`` reachable from ``node`` through ``$ref``s, transitively, once each."""
+        found: List[Tuple[str, Any]] = []
+        seen: Set[Tuple[Location, str]] = set()
+        pending = [(node, base)]
+        while pending:
+            node, base = pending.pop()
+            for ref in _walk_refs(node):
+                if (base, ref) in seen:
+                    continue
+                seen.add((base, ref))
+                try:
+                    target, location = self._target(ref, base)
+                except (KeyError, IndexError, ValueError):
+                    self.unresolved.add(ref)
+                    continue
+                found.append((ref, target))
+                pending.append((target, location))
+        return found
+
+    # ── Schemas ──
+
+    def properties(self, schema: Any, base: Location = None) -> List[Tuple[str, Dict]]:
+        """All properties of ``schema``, nested ones as ``parent.child``; array items are looked through."""
+        schema, base = self.resolve_in(schema, base)
+        if not isinstance(schema, dict):
+            return []
+        cached = self._roots.get(id(schema))
+        if cached is None:
+            cached = self._roots[id(schema)] = (schema, self._flatten(schema, base, set())[0])
+        return cached[1]
+
+    def _flatten(self, schema: Any, base: Location, active: Set[int]) -> Tuple[List[Tuple[str, Dict]], bool]:
+        """
+        ``schema``'s properties, and whether the walk stopped at a back-reference.
+        Where a walk through a cycle stops depends on where it started, so only
+        walks that closed no cycle are memoized here; ``properties`` memoizes
+        each starting schema.
+        """
+        schema, base = self.resolve_in(schema, base)
+        if not isinstance(schema, dict):
+            return [], False
+        key = id(schema)
+        cached = self._properties.get(key)
+        if cached is not None:
+            return cached[1], False
+        if key in active:
+            return [], True  # recursive schema: the outer walk already lists these properties
+        active.add(key)
+        found: List[Tuple[str, Dict]] = []
+        cyclic = False
+
+        def walk(node: Any, node_base: Location) -> List[Tuple[str, Dict]]:
+            nonlocal cyclic
+            nested, nested_cyclic = self._flatten(node, node_base, active)
+            cyclic = cyclic or nested_cyclic
+            return nested
+
+        for combined in ("allOf", "anyOf", "oneOf"):
+            for part in schema.get(combined) or []:
+                found.extend(walk(part, base))
+        properties = schema.get("properties")
+        if isinstance(properties, dict):
+            for name, definition in properties.items():
+                resolved, child_base = self.resolve_in(definition, base)
+                found.append((name, resolved if isinstance(resolved, dict) else {}))
+                found.extend((f"{name}.{child}", d) for child, d in walk(resolved, child_base))
+        if "items" in schema:
+            found.extend(walk(schema["items"], base))
+        active.discard(key)
+        if not cyclic:
+            self._properties[key] = (schema, found)  # keeps ``schema`` alive, so its id is not reused
+        return found, cyclic
@@ -0,0 +1,161 @@
+"""
+On-disk cache of parsed specs, addressed by content hash.
+
+A spec's raw bytes are hashed (SHA-256) and its parsed form is stored as
+JSON in ``<dir>/specs/<hash>.json``. The same content is therefore parsed
+once, whatever URL or file it came from. JSON, not pickle, because the
+directory may be shared: a planted entry can at worst be a wrong spec,
+never code. YAML dates and non-string keys come back as strings, as they
+would from a JSON spec. An entry that cannot be read or decoded is
+deleted and counts as a miss. For ``spec_url`` the cache also keeps the
+response's ``ETag`` and ``Last-Modified`` in ``<dir>/urls/<hash of URL>.json``.
+The next fetch is then a conditional GET, and a 304 skips both the download
+and the parse.
+
+The store is bounded by ``max_bytes``. A hit refreshes the entry's mtime, and
+the least recently used entries are deleted once the total goes over the
+bound. All state lives in files written with ``os.replace``, so several
+worker processes can share one directory. Their worst race is a duplicate
+parse.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            os.unlink(partial)
+        except OSError:
+            pass
+        raise
+
+
+class SpecCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._specs = os.path.join(directory, "specs")
+        self._urls = os.path.join(directory, "urls")
+        os.makedirs(self._specs, exist_ok=True)
+        os.makedirs(self._urls, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _spec_path(self, digest: str) -> str:
+        return os.path.join(self._specs, f"{digest}.json")
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self._urls, f"{content_digest(url.encode())}.json")
+
+    # ── Parsed specs ──
+
+    def get(self, digest: str) -> Optional[Any]:
+        path = self._spec_path(digest)
+        try:
+            with open(path, "rb") as f:
+                spec = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:  # a damaged entry is a miss, never a failed spec load
+            logger.warning(f"Dropping unreadable spec cache entry {path}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return spec
+
+    def put(self, digest: str, spec: Any) -> None:
+        try:
+            data = json.dumps(spec, separators=(",", ":"), default=str).encode()
+        except (TypeError, ValueError) as e:  # e.g. a recursive YAML anchor
+            logger.warning(f"Not caching spec {digest}: {e}")
+            return
+        if len(data) > self.max_bytes:
+            return
+        try:
+            _write_atomic(self._spec_path(digest), data)
+        except OSError as e:
+            logger.warning(f"Cannot write spec cache entry {digest}: {e}")
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used specs until the store fits in ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self._specs):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    # ── Validators for spec_url ──
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Validators saved for ``url`` (``etag``, ``last_modified``, ``digest``), if its spec is still cached."""
+        try:
+            with open(self._url_path(url)) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not os.path.exists(self._spec_path(saved.get("digest", ""))):
+            return {}
+        return saved
+
+    def remember(self, url: str, digest: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        saved = {"digest": digest, "etag": etag, "last_modified": last_modified}
+        _write_atomic(self._url_path(url), json.dumps(saved).encode())
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        saved = self.validators(url)
+        headers = {}
+        if saved.get("etag"):
+            headers["If-None-Match"] = saved["etag"]
+        if saved.get("last_modified"):
+            headers["If-Modified-Since"] = saved["last_modified"]
+        return headers
+
+
+def build_spec_cache() -> Optional[SpecCache]:
+    """The spec cache under SCANNER_SPEC_CACHE_DIR, or None when disabled."""
+    if not settings.SCANNER_SPEC_CACHE_MAX_BYTES:
+        return None
+    try:
+        return SpecCache(settings.SCANNER_SPEC_CACHE_DIR, settings.SCANNER_SPEC_CACHE_MAX_BYTES)
+    except OSError as e:
+        logger.warning(f"Spec cache disabled: {e}")
+        return None
@@ -43,6 +43,7 @@ class ScanResultUpdate(BaseModel):
 class ScanResult(ScanResultBase):
     id: int
     job_id: int
+    carried_from_scan_id: Optional[int] = None  # set when an incremental rescan carried the finding forward
 
     class Config:
         from_attributes = True
@@ -60,16 +61,84 @@ class ScanJobSummary(BaseModel):
     class Config:
         from_attributes = True
 
+class ScanShard(BaseModel):
+    index: int
+    status: str
+    units_total: int = 0
+    units_done: int = 0
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class RulePlan(BaseModel):
+    units: int
+    probes: Optional[int] = None  # None: the rule sends its own requests, so they are not known in advance
+
+class ScanPlan(BaseModel):
+    """Size of a scan before it runs (app/scanner/planner.py)."""
+    endpoints: int
+    units: int
+    rules: Dict[str, RulePlan]
+    probes: int  # planned requests of declarative rules
+    unique_probes: int  # requests actually sent for them, after deduplication
+    unplanned_rules: List[str] = []
+    rule_order: List[str] = []  # rule slots of finding positions, reused on resume
+
+class ScanDiff(BaseModel):
+    """Endpoint diff of an incremental rescan against its baseline (app/scanner/incremental.py)."""
+    baseline_scan_id: int
+    added: int
+    changed: int
+    removed: int
+    unchanged: int
+    carried_rules: List[str] = []  # rules that skipped unchanged endpoints
+    carried_findings: int = 0
+
 class ScanJob(ScanJobBase):
     id: int
     status: str
+    status_reason: Optional[str] = None
+    deadline_at: Optional[datetime] = None
+    cancel_requested_at: Optional[datetime] = None
     created_at: datetime
     completed_at: Optional[datetime] = None
+    units_total: Optional[int] = None
+    units_done: int = 0
+    shard_count: Optional[int] = None
+    shards: List[ScanShard] = []
+    traffic: Optional[Dict[str, Any]] = None
+    plan: Optional[ScanPlan] = None
+    baseline_scan_id: Optional[int] = None
+    diff: Optional[ScanDiff] = None
     results: List[ScanResult] = []
 
     class Config:
         from_attributes = True
 
+class LatencySummary(BaseModel):
+    """Percentiles in seconds (within 10%, see app/scanner/perf.py); None when nothing was recorded."""
+    count: int = 0
+    timeouts: int = 0
+    mean: Optional[float] = None
+    max: Optional[float] = None
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+class RuleLatency(LatencySummary):
+    queue_p95: Optional[float] = None
+
+class ScanPerf(BaseModel):
+    scan_id: int
+    status: str
+    cache_hits: int = 0
+    latency: LatencySummary
+    queue: LatencySummary
+    rules: Dict[str, RuleLatency] = {}
+    endpoints: Dict[str, LatencySummary] = {}
+
 class DashboardStats(BaseModel):
     total_scans: int
     completed_scans: int
@@ -0,0 +1,212 @@
+"""
+Scan worker — runs queued scans outside the API process.
+
+Usage (from the backend directory):
+  python -m app.worker [--concurrency N] [--worker-id NAME]
+
+Start any number of these processes (on any machine sharing the database)
+with SCAN_EXECUTION_MODE=queue set for the API. Each worker claims pending
+scans (and shards of large scans, see app/scanner/shards.py) from the
+database queue, keeps a heartbeat on the ones it is running and requeues
+work abandoned by dead workers. Scans released on shutdown or
+requeued after a crash resume from their checkpoints.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE, REGISTRY
+from app.db.session import SessionLocal, engine
+from app.models import user as user_model, scan as scan_model
+from app.scanner import queue
+from app.scanner.engine import ScannerEngine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ScanWorker:
+    def __init__(self, worker_id: str, concurrency: int):
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self.stopping = asyncio.Event()
+
+    async def run_leased(self, kind: str, row_id: int, run, heartbeat, release) -> None:
+        """
+        Run ``run()`` while refreshing the lease on the claimed row. The run is
+        cancelled if the lease is lost or the worker stops; on stop the row is
+        released back to the queue.
+        """
+        task = asyncio.create_task(run())
+        lease_lost = False
+        while not task.done():
+            done, _ = await asyncio.wait({task}, timeout=settings.SCANNER_WORKER_HEARTBEAT_INTERVAL)
+            if done:
+                break
+            if self.stopping.is_set():
+                task.cancel()
+                break
+            db = SessionLocal()
+            try:
+                lease_lost = not heartbeat(db, row_id, self.worker_id)
+            finally:
+                db.close()
+            if lease_lost:
+                logger.warning(f"Lost lease on {kind} {row_id}; abandoning it")
+                task.cancel()
+                break
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not lease_lost:
+                db = SessionLocal()
+                try:
+                    release(db, row_id, self.worker_id)
+                finally:
+                    db.close()
+                logger.info(f"Released {kind} {row_id} back to the queue")
+
+    async def run_scan(self, scan_id: int) -> None:
+        db = SessionLocal()
+        try:
+            scan = db.query(scan_model.ScanJob).filter(scan_model.ScanJob.id == scan_id).first()
+            # A scan that already froze its endpoint list was started before: resume it.
+            resume = bool(scan and scan.endpoints)
+            await self.run_leased(
+                "scan", scan_id, lambda: ScannerEngine(db, scan_id).run(resume=resume),
+                queue.heartbeat, queue.release_scan,
+            )
+        finally:
+            db.close()
+
+    async def run_shard(self, shard_id: int) -> None:
+        db = SessionLocal()
+        try:
+            shard = db.query(scan_model.ScanShard).filter(scan_model.ScanShard.id == shard_id).first()
+            if shard is None:
+                # Deleted since it was claimed (e.g. its scan was cancelled or removed); no lease left to release.
+                logger.warning(f"Shard {shard_id} no longer exists; skipping it")
+                return
+            engine = ScannerEngine(db, shard.job_id)
+            await self.run_leased(
+                "shard", shard_id, lambda: engine.run_shard(shard_id),
+                queue.heartbeat_shard, queue.release_shard,
+            )
+        finally:
+            db.close()
+
+    def claim(self):
+        """Claim a new scan, or else a shard of a running one."""
+        db = SessionLocal()
+        try:
+            scan_id = queue.claim_next_scan(db, self.worker_id)
+            if scan_id is not None:
+                return "scan", scan_id
+            shard_id = queue.claim_next_shard(db, self.worker_id)
+            if shard_id is not None:
+                return "shard", shard_id
+        except Exception as e:
+            logger.error(f"Queue poll failed: {e}", exc_info=True)
+        finally:
+            db.close()
+        return None, None
+
+    async def slot(self, index: int) -> None:
+        while not self.stopping.is_set():
+            kind, row_id = self.claim()
+            if row_id is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), settings.SCANNER_WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(f"[{self.worker_id}/{index}] Running {kind} {row_id}")
+            if kind == "scan":
+                await self.run_scan(row_id)
+            else:
+                await self.run_shard(row_id)
+
+    async def reaper(self) -> None:
+        while not self.stopping.is_set():
+            db = SessionLocal()
+            try:
+                requeued = queue.requeue_stale_scans(
+                    db, settings.SCANNER_WORKER_LEASE_TIMEOUT, settings.SCANNER_WORKER_MAX_ATTEMPTS
+                )
+                if requeued:
+                    logger.warning(f"Requeued scans with stale leases: {requeued}")
+                requeued = queue.requeue_stale_shards(
+                    db, settings.SCANNER_WORKER_LEASE_TIMEOUT, settings.SCANNER_WORKER_MAX_ATTEMPTS
+                )
+                if requeued:
+                    logger.warning(f"Requeued scan shards with stale leases: {requeued}")
+            except Exception as e:
+                logger.error(f"Stale lease recovery failed: {e}", exc_info=True)
+            finally:
+                db.close()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), settings.SCANNER_WORKER_LEASE_TIMEOUT / 2)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _metrics_response(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer any request with this worker's metrics (one request per connection)."""
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = REGISTRY.render().encode()
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stopping.set)
+            except NotImplementedError:  # Windows
+                pass
+        metrics_server = None
+        if settings.METRICS_ENABLED and settings.SCANNER_WORKER_METRICS_PORT:
+            metrics_server = await asyncio.start_server(
+                self._metrics_response, "0.0.0.0", settings.SCANNER_WORKER_METRICS_PORT
+            )
+            logger.info(f"Serving worker metrics on port {settings.SCANNER_WORKER_METRICS_PORT}")
+        logger.info(f"Scan worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            await asyncio.gather(self.reaper(), *[self.slot(i) for i in range(self.concurrency)])
+        finally:
+            if metrics_server is not None:
+                metrics_server.close()
+                await metrics_server.wait_closed()
+        logger.info(f"Scan worker {self.worker_id} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued API security scans.")
+    parser.add_argument("--concurrency", type=int, default=settings.SCANNER_WORKER_CONCURRENCY,
+                        help="scans to run at once in this process")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}",
+                        help="lease owner name recorded on claimed scans")
+    args = parser.parse_args()
+
+    user_model.Base.metadata.create_all(bind=engine)
+    scan_model.Base.metadata.create_all(bind=engine)
+    asyncio.run(ScanWorker(args.worker_id, args.concurrency).serve())
+
+
+if __name__ == "__main__":
+    main()
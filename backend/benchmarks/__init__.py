@@ -0,0 +1,18 @@
+"""
+Scanner benchmarks.
+
+  benchmarks/target.py  mock target (ASGI) with configurable latency, error rate and body size
+  benchmarks/specs.py   synthetic OpenAPI specs with 10 to 10,000 operations
+  benchmarks/run.py     runs ScannerEngine.run against the target and records
+                        wall time, requests/sec, findings/sec and peak RSS as JSON
+  benchmarks/spec_parse.py  times loading JSON and YAML specs from 100 KB to 20 MB,
+                        and how long the event loop stalls meanwhile
+
+From the backend directory:
+
+  python -m benchmarks.run --operations 10 100 1000 --output bench.json
+  python -m benchmarks.run --operations 10 100 1000 --compare bench.json
+  python -m benchmarks.run --operations 1000 --target asgi --record cassettes/
+  python -m benchmarks.run --operations 1000 --replay cassettes/ --repeat 1000
+  python -m benchmarks.spec_parse --sizes 100K 1M 5M 20M --output parse.json
+"""
@@ -0,0 +1,299 @@
+"""
+Benchmark ScannerEngine.run against the mock target.
+
+Each case is a scan of a synthetic spec (benchmarks/specs.py) with the given
+number of operations. By default each case runs in a fresh process, so peak
+RSS is that scan's own. Results are written as JSON:
+
+  {"created_at": ..., "git_commit": ..., "python": ..., "options": {...},
+   "results": [{"operations": 100, "endpoints": 100, "wall_seconds": ...,
+                "requests": ..., "requests_per_second": ..., "findings": ...,
+                "findings_per_second": ..., "peak_rss_bytes": ..., ...}]}
+
+``--compare BASELINE.json`` exits with status 1 when a case got slower, or
+used more memory, by more than ``--tolerance`` (default 20%) compared to the
+baseline case with the same number of operations.
+
+Targets:
+  asgi     the mock target runs in the scan's process via httpx.ASGITransport (no sockets)
+  uvicorn  the mock target runs as a separate uvicorn process on a local port (default)
+  URL      any other value is used as the target's base URL
+
+``--record DIR`` saves each case's exchanges as ``DIR/ops-<n>.cassette``
+(app/scanner/cassette.py). ``--replay DIR --repeat N`` then scans N times
+from those cassettes with no network at all; ``cpu_seconds`` is then
+essentially rule and engine CPU cost.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where ``resource`` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _target_options(options: Dict) -> Dict:
+    return {key: options[key] for key in ("latency", "jitter", "error_rate", "body_size", "seed")}
+
+
+def cassette_path(directory: str, operations: int) -> str:
+    return os.path.join(directory, f"ops-{operations}.cassette")
+
+
+def run_case(operations: int, options: Dict) -> Dict:
+    """
+    Scan a synthetic spec with ``operations`` operations and measure it.
+    With ``repeat`` > 1 the scan runs that many times; times are averaged.
+    """
+    import httpx
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.core.config import settings
+    from app.db.session import Base
+    from app.models import scan as scan_model, user as user_model  # noqa: F401  (registers tables)
+    from app.models.scan import ScanJob, ScanResult
+    from app.scanner.cassette import Cassette, CassetteWriter, ReplayTransport
+    from app.scanner.engine import ScannerEngine
+    from app.scanner.perf import summary as perf_summary
+    from benchmarks.specs import generate_spec
+    from benchmarks.target import MockTarget
+
+    logging.getLogger().setLevel(logging.INFO if options.get("verbose") else logging.WARNING)
+    spec = generate_spec(operations, seed=options["seed"])
+
+    target_url = options["target"]
+    cassette = None
+    if options.get("replay"):
+        cassette = Cassette(cassette_path(options["replay"], operations))
+        target_url = "http://replay.bench"
+    elif target_url == "asgi":
+        target = MockTarget(**_target_options(options))
+        target_url = "http://target.bench"
+
+    db_engine = create_engine(options["database_url"], connect_args={"check_same_thread": False},
+                              poolclass=StaticPool) if options["database_url"].startswith("sqlite") \
+        else create_engine(options["database_url"])
+    Base.metadata.create_all(bind=db_engine)
+    db = sessionmaker(bind=db_engine)()
+
+    config = dict(options.get("scan_config") or {})
+    if options.get("rules"):
+        config["rules"] = options["rules"]
+    repeat = max(1, int(options.get("repeat") or 1))
+    walls, cpus, misses = [], [], 0
+    for _ in range(repeat):
+        scan = ScanJob(target_url=target_url, config=config)
+        db.add(scan)
+        db.commit()
+        transport = recorder = None
+        if cassette is not None:
+            transport = ReplayTransport(cassette)
+        elif options["target"] == "asgi":
+            transport = httpx.ASGITransport(app=target)
+        if options.get("record"):
+            recorder = CassetteWriter(cassette_path(options["record"], operations),
+                                      settings.SCANNER_CASSETTE_MAX_BODY_BYTES, meta={"operations": operations, "seed": options["seed"]})
+        engine = ScannerEngine(db, scan.id, transport=transport, cassette=recorder)
+
+        started, cpu_started = time.perf_counter(), time.process_time()
+        asyncio.run(engine.run(spec))
+        walls.append(time.perf_counter() - started)
+        cpus.append(time.process_time() - cpu_started)
+        misses += getattr(transport, "misses", 0)
+    if cassette is not None:
+        cassette.close()
+    wall = sum(walls) / repeat
+
+    db.refresh(scan)
+    findings = db.query(ScanResult).filter(ScanResult.job_id == scan.id).count()
+    traffic = (scan.traffic or {}).get("total", {})
+    latency = perf_summary(scan.perf)["latency"]
+    result = {
+        "operations": operations,
+        "endpoints": len(scan.endpoints or []),
+        "rules": len(engine.rules),
+        "status": scan.status,
+        "repeat": repeat,
+        "wall_seconds": round(wall, 3),
+        "wall_seconds_min": round(min(walls), 3),
+        "cpu_seconds": round(sum(cpus) / repeat, 3),
+        "requests": traffic.get("requests", 0),
+        "requests_per_second": round(traffic.get("requests", 0) / wall, 1) if wall else None,
+        "request_errors": traffic.get("errors", 0),
+        "response_bytes": traffic.get("bytes", 0),
+        "latency_p50": latency["p50"],
+        "latency_p95": latency["p95"],
+        "findings": findings,
+        "findings_per_second": round(findings / wall, 1) if wall else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    if cassette is not None:
+        result["replay_misses"] = misses
+    db.close()
+    db_engine.dispose()
+    return result
+
+
+def run_isolated(operations: int, options: Dict) -> Dict:
+    """``run_case`` in a fresh process, so peak RSS covers that scan only."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_case, operations, options).result()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_target(options: Dict):
+    """Start the mock target as a uvicorn process; returns (process, base URL)."""
+    port = _free_port()
+    target = _target_options(options)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.target", "--port", str(port),
+         "--latency", str(target["latency"]), "--jitter", str(target["jitter"]),
+         "--error-rate", str(target["error_rate"]), "--body-size", str(target["body_size"]),
+         "--seed", str(target["seed"])],
+        cwd=BACKEND_DIR,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock target did not start")
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of ``results`` against a baseline results document."""
+    previous = {case["operations"]: case for case in baseline.get("results", [])}
+    regressions = []
+    for case in results:
+        before = previous.get(case["operations"])
+        if before is None:
+            continue
+        for metric in ("wall_seconds", "peak_rss_bytes"):
+            old, new = before.get(metric), case.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{case['operations']} operations: {metric} {old} -> {new} "
+                                   f"(+{(new / old - 1) * 100:.0f}%)")
+        if before.get("findings") != case.get("findings"):
+            print(f"note: {case['operations']} operations: findings {before.get('findings')} -> "
+                  f"{case.get('findings')}", file=sys.stderr)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ScannerEngine.run against a mock target.")
+    parser.add_argument("--operations", type=int, nargs="+", default=[10, 100, 1000],
+                        help="spec sizes to scan (operations per spec)")
+    parser.add_argument("--target", default="uvicorn", help="asgi, uvicorn, or a base URL")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock target seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mock target extra random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock target share of 500 responses")
+    parser.add_argument("--body-size", type=int, default=512, help="mock target response body bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", metavar="DIR", help="record each case into DIR/ops-<n>.cassette")
+    parser.add_argument("--replay", metavar="DIR", help="replay DIR/ops-<n>.cassette instead of using a target")
+    parser.add_argument("--repeat", type=int, default=1, help="scans per case (times are averaged)")
+    parser.add_argument("--rules", help="comma-separated rule IDs to run (default: all)")
+    parser.add_argument("--scan-config", type=json.loads, default={}, help="scan config JSON, e.g. '{\"max_in_flight\": 32}'")
+    parser.add_argument("--database-url", default="sqlite://", help="database for scan results (default: in-memory SQLite)")
+    parser.add_argument("--in-process", action="store_true", help="run all cases in this process (peak RSS is cumulative)")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown / memory growth vs baseline")
+    parser.add_argument("--verbose", action="store_true", help="show scanner INFO logs")
+    args = parser.parse_args()
+
+    options = {
+        "target": args.target, "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+        "body_size": args.body_size, "seed": args.seed,
+        "rules": [r.strip() for r in args.rules.split(",")] if args.rules else None,
+        "scan_config": args.scan_config, "database_url": args.database_url, "verbose": args.verbose,
+        "record": args.record, "replay": args.replay, "repeat": args.repeat,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    process = None
+    if args.target == "uvicorn" and not args.replay:
+        process, options["target"] = start_target(options)
+    try:
+        results = []
+        for operations in args.operations:
+            result = run_case(operations, options) if args.in_process else run_isolated(operations, options)
+            results.append(result)
+            print(f"{operations:>6} ops  {result['wall_seconds']:>8.2f} s  {result['requests']:>7} req  "
+                  f"{result['requests_per_second'] or 0:>8.1f} req/s  {result['findings']:>6} findings  "
+                  f"{(result['peak_rss_bytes'] or 0) / 2**20:>7.1f} MiB", file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    document = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {**options, "target": args.target},
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Benchmark spec loading for specs from 100 KB to 20 MB.
+
+Each case is a synthetic spec (benchmarks/specs.py) grown to a target size
+and written as JSON or YAML. The case loads it through
+ScannerEngine.fetch_spec, with the spec cache off, and records:
+
+  parse_seconds        parse_document alone (the parser spec_format picks; libyaml for YAML when available)
+  fetch_seconds        fetch_spec: read, parse in a worker process or thread (``parsed_in``), return
+  loop_stall_seconds   longest the event loop went without running other coroutines during fetch_spec
+  cache_hit_seconds    loading the parsed spec back from the spec cache
+  baseline_seconds     the old path, json.loads falling back to pure-Python yaml.safe_load (--baseline)
+
+From the backend directory:
+
+  python -m benchmarks.spec_parse --sizes 100K 1M 5M 20M --output parse.json
+  python -m benchmarks.spec_parse --sizes 1M 5M --formats yaml --baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import _git_commit  # noqa: E402
+from benchmarks.specs import generate_spec  # noqa: E402
+
+UNITS = {"K": 1000, "M": 1000 ** 2}
+
+
+def parse_size(text: str) -> int:
+    """``"100K"``, ``"20M"`` or a plain number of bytes."""
+    text = text.strip().upper().rstrip("B")
+    if text[-1:] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def _serialize(spec: Dict, fmt: str) -> bytes:
+    if fmt == "json":
+        return json.dumps(spec, indent=2).encode()
+    import yaml
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump(spec, Dumper=dumper, sort_keys=False).encode()
+
+
+def build_spec(size: int, fmt: str) -> bytes:
+    """A synthetic spec serialized as ``fmt`` that is at least ``size`` bytes."""
+    sample = 200
+    per_operation = len(_serialize(generate_spec(sample), fmt)) / sample
+    operations = max(1, int(size / per_operation) + 1)
+    content = _serialize(generate_spec(operations), fmt)
+    while len(content) < size:
+        operations = int(operations * size / len(content)) + 1
+        content = _serialize(generate_spec(operations), fmt)
+    return content
+
+
+async def _with_loop_stall(load: Callable[[], Awaitable]) -> tuple:
+    """Run ``load`` next to a 1 ms ticker; returns (result, longest gap between ticks beyond 1 ms)."""
+    stall = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stall = max(stall, now - last - 0.001)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        result = await load()
+    finally:
+        done = True
+        await task
+    return result, stall
+
+
+def _old_parse(content: bytes):
+    import yaml
+    try:
+        return json.loads(content)
+    except ValueError:
+        return yaml.safe_load(content)
+
+
+def run_case(size: int, fmt: str, options: Dict) -> Dict:
+    """Build a ``size``-byte ``fmt`` spec and time loading it."""
+    import yaml
+    from app.core.config import settings
+    from app.scanner.engine import ScannerEngine
+    from app.scanner.spec import parse_document, parses_in_process, spec_format
+    from app.scanner.spec_cache import SpecCache, content_digest
+
+    content = build_spec(size, fmt)
+    repeat = max(1, options.get("repeat") or 1)
+    cache_bytes, settings.SCANNER_SPEC_CACHE_MAX_BYTES = settings.SCANNER_SPEC_CACHE_MAX_BYTES, 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"spec.{fmt}")
+        with open(path, "wb") as f:
+            f.write(content)
+
+        parse_times, fetch_times, stalls = [], [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            spec = parse_document(content, name=path)
+            parse_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            fetched, stall = asyncio.run(_with_loop_stall(lambda: ScannerEngine(None, None).fetch_spec(path)))
+            fetch_times.append(time.perf_counter() - started)
+            stalls.append(stall)
+        settings.SCANNER_SPEC_CACHE_MAX_BYTES = cache_bytes
+        assert fetched == spec, "fetch_spec and parse_document disagree"
+
+        cache = SpecCache(os.path.join(directory, "cache"), 1 << 40)
+        digest = content_digest(content)
+        cache.put(digest, spec)
+        started = time.perf_counter()
+        assert cache.get(digest) is not None
+        cache_hit = time.perf_counter() - started
+
+    result = {
+        "format": fmt,
+        "size_bytes": len(content),
+        "operations": sum(len(item) for item in spec["paths"].values()),
+        "parser": spec_format(content, name=path),
+        "libyaml": bool(yaml.__with_libyaml__),
+        "parsed_in": "process" if parses_in_process(content, name=path) else "thread",
+        "parse_seconds": round(min(parse_times), 4),
+        "fetch_seconds": round(min(fetch_times), 4),
+        "loop_stall_seconds": round(max(stalls), 4),
+        "cache_hit_seconds": round(cache_hit, 4),
+        "baseline_seconds": None,
+    }
+    if options.get("baseline"):
+        started = time.perf_counter()
+        _old_parse(content)
+        result["baseline_seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark spec parsing for specs of different sizes.")
+    parser.add_argument("--sizes", nargs="+", default=["100K", "1M", "5M", "20M"],
+                        help="spec sizes, e.g. 100K 1M 20M")
+    parser.add_argument("--formats", nargs="+", choices=["json", "yaml"], default=["json", "yaml"])
+    parser.add_argument("--repeat", type=int, default=1, help="loads per case (the fastest is kept)")
+    parser.add_argument("--baseline", action="store_true",
+                        help="also time the old json-then-pure-Python-YAML parse (slow for large YAML)")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    options = {"repeat": args.repeat, "baseline": args.baseline}
+    results: List[Dict] = []
+    for fmt in args.formats:
+        for size in args.sizes:
+            result = run_case(parse_size(size), fmt, options)
+            results.append(result)
+            baseline = f"  old {result['baseline_seconds']:>7.3f} s" if result["baseline_seconds"] is not None else ""
+            print(f"{fmt:>4} {result['size_bytes'] / 1e6:>7.2f} MB  parse {result['parse_seconds']:>7.3f} s  "
+                  f"fetch {result['fetch_seconds']:>7.3f} s  stall {result['loop_stall_seconds'] * 1000:>6.1f} ms  "
+                  f"cached {result['cache_hit_seconds']:>6.3f} s{baseline}", file=sys.stderr)
+
+    document = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {**options, "sizes": args.sizes, "formats": args.formats},
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
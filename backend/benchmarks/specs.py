@@ -0,0 +1,94 @@
+"""
+Synthetic OpenAPI 3 specs of a given size.
+
+``generate_spec(n)`` returns a spec with exactly ``n`` operations spread over
+resources that look like a real API: collections and items with ``{id}``
+path parameters, query parameters, JSON request bodies and ``$ref``-ed
+component schemas. The resources include file, URL-taking, admin, auth and
+payment endpoints, so the rules that only target those have work to do.
+Output is deterministic for a given ``n`` and ``seed``.
+"""
+import random
+from typing import Dict, List
+
+RESOURCES = [
+    "users", "orders", "products", "files", "reports", "invoices", "payments",
+    "documents", "webhooks", "admin/settings", "auth/sessions", "media", "exports",
+]
+
+# (suffix, method, has request body)
+OPERATIONS = [
+    ("", "get", False),
+    ("", "post", True),
+    ("/{id}", "get", False),
+    ("/{id}", "put", True),
+    ("/{id}", "patch", True),
+    ("/{id}", "delete", False),
+    ("/{id}/download", "get", False),
+    ("/{id}/callback", "post", True),
+]
+
+FIELD_TYPES = ["string", "integer", "boolean", "number"]
+EXTRA_FIELDS = ["name", "email", "role", "is_admin", "url", "file", "amount", "status", "owner_id", "path"]
+
+
+def _schema(name: str, rng: random.Random) -> Dict:
+    fields = rng.sample(EXTRA_FIELDS, k=rng.randint(2, 6))
+    properties = {"id": {"type": "integer"}}
+    for field in fields:
+        properties[field] = {"type": rng.choice(FIELD_TYPES)}
+    return {"type": "object", "title": name, "properties": properties, "required": ["id"]}
+
+
+def _operation(resource: str, method: str, suffix: str, has_body: bool, ref: str, index: int) -> Dict:
+    operation: Dict = {
+        "operationId": f"op{index}_{method}_{resource.replace('/', '_')}",
+        "summary": f"{method.upper()} {resource}{suffix}",
+        "tags": [resource.split("/")[0]],
+        "responses": {
+            "200": {"description": "OK", "content": {"application/json": {"schema": {"$ref": ref}}}},
+            "404": {"description": "Not found"},
+        },
+    }
+    parameters: List[Dict] = []
+    if "{id}" in suffix:
+        parameters.append({"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}})
+    if method == "get":
+        parameters += [
+            {"name": "q", "in": "query", "schema": {"type": "string"}},
+            {"name": "page", "in": "query", "schema": {"type": "integer"}},
+        ]
+    if parameters:
+        operation["parameters"] = parameters
+    if has_body:
+        operation["requestBody"] = {"content": {"application/json": {"schema": {"$ref": ref}}}}
+    return operation
+
+
+def generate_spec(operations: int, seed: int = 0) -> Dict:
+    """An OpenAPI 3.0 spec with exactly ``operations`` operations."""
+    rng = random.Random(seed)
+    paths: Dict[str, Dict] = {}
+    schemas: Dict[str, Dict] = {}
+    count = 0
+    version = 0
+    while count < operations:
+        version += 1
+        for resource in RESOURCES:
+            name = f"{resource.replace('/', '_').title().replace('_', '')}V{version}"
+            schemas[name] = _schema(name, rng)
+            ref = f"#/components/schemas/{name}"
+            for suffix, method, has_body in OPERATIONS:
+                if count >= operations:
+                    break
+                path = f"/api/v{version}/{resource}{suffix}"
+                paths.setdefault(path, {})[method] = _operation(resource, method, suffix, has_body, ref, count)
+                count += 1
+            if count >= operations:
+                break
+    return {
+        "openapi": "3.0.3",
+        "info": {"title": f"Synthetic API ({operations} operations)", "version": "1.0.0"},
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
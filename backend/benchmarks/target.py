@@ -0,0 +1,85 @@
+"""
+Mock scan target: a bare ASGI app answering every path and method with a
+JSON body of ``body_size`` bytes after ``latency`` (+ up to ``jitter``)
+seconds, or with a 500 for a random ``error_rate`` share of requests. It
+sends no security headers, so header rules have something to report.
+
+Run it in-process through ``httpx.ASGITransport`` or as a real server:
+
+  python -m benchmarks.target --port 8900 --latency 0.02 --error-rate 0.01 --body-size 4096
+"""
+import argparse
+import asyncio
+import json
+import random
+
+
+class MockTarget:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 body_size: int = 512, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.body_size = body_size
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def body(self, method: str, path: str) -> bytes:
+        head = json.dumps({"id": self.requests, "method": method, "path": path, "data": ""})
+        filler = max(0, self.body_size - len(head))
+        return (head[:-2] + "x" * filler + '"}').encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        self.requests += 1
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+        delay = self.latency + (self.random.random() * self.jitter if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            status, body = 500, b'{"detail": "injected error"}'
+        else:
+            status, body = 200, self.body(scope["method"], scope["path"])
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def serve(host: str, port: int, **options) -> None:
+    import uvicorn
+    uvicorn.run(MockTarget(**options), host=host, port=port, log_level="warning", access_log=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a mock scan target.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--body-size", type=int, default=512, help="response body bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    serve(args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+          body_size=args.body_size, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
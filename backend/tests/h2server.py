@@ -0,0 +1,131 @@
+"""
+Minimal local TLS test server speaking HTTP/2 (via the ``h2`` package) and
+HTTP/1.1, picked by ALPN. Every request gets ``200 ok <path>``.
+
+    async with H2TestServer() as server:             # offers h2 and http/1.1
+    async with H2TestServer(alpn=["http/1.1"]) as server:  # HTTP/1.1-only target
+"""
+import asyncio
+import datetime
+import ipaddress
+import os
+import ssl
+import tempfile
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import ConnectionTerminated, DataReceived, RequestReceived
+
+
+def _self_signed_context(alpn):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+        with open(cert_path, "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(key_path, "wb") as f:
+            f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                      serialization.NoEncryption()))
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert_path, key_path)
+    context.set_alpn_protocols(list(alpn))
+    return context
+
+
+class H2TestServer:
+    def __init__(self, alpn=("h2", "http/1.1")):
+        self.alpn = alpn
+        self.connections = 0
+        self.requests = []  # (protocol, path)
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"https://127.0.0.1:{port}"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0, ssl=_self_signed_context(self.alpn)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        protocol = writer.get_extra_info("ssl_object").selected_alpn_protocol()
+        try:
+            if protocol == "h2":
+                await self._serve_h2(reader, writer)
+            else:
+                await self._serve_h1(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_h2(self, reader, writer):
+        conn = H2Connection(config=H2Configuration(client_side=False, header_encoding="utf-8"))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        while True:
+            data = await reader.read(65535)
+            if not data:
+                return
+            for event in conn.receive_data(data):
+                if isinstance(event, RequestReceived):
+                    path = dict(event.headers)[":path"]
+                    self.requests.append(("HTTP/2", path))
+                    body = f"ok {path}".encode()
+                    conn.send_headers(event.stream_id, [
+                        (":status", "200"),
+                        ("content-type", "text/plain"),
+                        ("content-length", str(len(body))),
+                    ])
+                    conn.send_data(event.stream_id, body, end_stream=True)
+                elif isinstance(event, DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, ConnectionTerminated):
+                    writer.write(conn.data_to_send())
+                    return
+            writer.write(conn.data_to_send())
+            await writer.drain()
+
+    async def _serve_h1(self, reader, writer):
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            path = request_line.split(" ")[1]
+            headers = dict(line.split(": ", 1) for line in header_lines if ": " in line)
+            length = int(headers.get("Content-Length", headers.get("content-length", 0)))
+            if length:
+                await reader.readexactly(length)
+            self.requests.append(("HTTP/1.1", path))
+            body = f"ok {path}".encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
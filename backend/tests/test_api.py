@@ -7,3 +7,77 @@ def test_read_openapi():
     response = client.get("/api/v1/openapi.json")
     assert response.status_code == 200
     assert "openapi" in response.json()
+
+
+def test_metrics_exposition():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.api.deps import get_db
+    from app.core.metrics import instrument_engine
+    from app.db.session import Base
+    from app.models.scan import ScanJob
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    instrument_engine(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([ScanJob(target_url="http://a", status="pending"), ScanJob(target_url="http://b", status="running")])
+    db.commit()
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        client.get("/api/v1/openapi.json")
+        client.get("/api/v1/scans/12345/does-not-exist")
+        response = client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE apiscan_http_request_duration_seconds histogram" in text
+    assert 'apiscan_http_request_duration_seconds_count{method="GET",route="/api/v1/openapi.json",status="200"}' in text
+    assert 'route="unmatched",status="404"' in text
+    assert 'apiscan_scans{status="pending"} 1' in text
+    assert 'apiscan_scans{status="completed"} 0' in text
+    assert 'apiscan_db_query_duration_seconds_bucket{statement="SELECT",le="+Inf"}' in text
+
+
+def test_metric_types_render_prometheus_text():
+    from app.core.metrics import Counter, Histogram, Registry
+
+    registry = Registry()
+    requests = registry.register(Counter("t_requests_total", "Requests.", ["rule"]))
+    latency = registry.register(Histogram("t_latency_seconds", "Latency.", buckets=(0.1, 1)))
+    requests.inc("A")
+    requests.inc("A", amount=2)
+    requests.inc('q"uote')
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 't_requests_total{rule="A"} 3' in lines
+    assert 't_requests_total{rule="q\\"uote"} 1' in lines
+    assert [line for line in lines if line.startswith("t_latency_seconds")] == [
+        't_latency_seconds_bucket{le="0.1"} 2',
+        't_latency_seconds_bucket{le="1"} 3',
+        't_latency_seconds_bucket{le="+Inf"} 4',
+        "t_latency_seconds_sum 3.65",
+        "t_latency_seconds_count 4",
+    ]
+
+
+def test_missing_columns_lists_columns_create_all_cannot_add():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.session import missing_columns
+    from app.models import scan
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE scan_results (id INTEGER PRIMARY KEY, job_id INTEGER, rule_id VARCHAR)"))
+    scan.Base.metadata.create_all(bind=engine)
+    missing = missing_columns(engine, scan.Base.metadata)
+    assert "scan_results.position" in missing
+    assert "scan_results.carried_from_scan_id" in missing
+    assert not [column for column in missing if not column.startswith("scan_results.")]
@@ -0,0 +1,54 @@
+from benchmarks.run import compare, run_case
+from benchmarks.spec_parse import parse_size, run_case as run_parse_case
+from benchmarks.specs import generate_spec
+
+
+def test_generated_specs_have_exact_operation_counts():
+    for operations in (10, 137, 10_000):
+        spec = generate_spec(operations)
+        methods = [m for item in spec["paths"].values() for m in item]
+        assert len(methods) == operations
+    spec = generate_spec(50)
+    ref = spec["paths"]["/api/v1/users"]["post"]["requestBody"]["content"]["application/json"]["schema"]["$ref"]
+    assert ref.split("/")[-1] in spec["components"]["schemas"]
+    assert generate_spec(50) == spec
+
+
+def test_benchmark_case_reports_throughput_against_in_process_target():
+    options = {
+        "target": "asgi", "latency": 0.0, "jitter": 0.0, "error_rate": 0.5, "body_size": 2048, "seed": 1,
+        "rules": ["SEC-HEADERS", "BOLA-IDOR"], "scan_config": {}, "database_url": "sqlite://",
+    }
+    result = run_case(10, options)
+    assert result["status"] == "completed"
+    assert result["endpoints"] == 10
+    assert result["requests"] > 0 and result["requests_per_second"] > 0
+    assert result["response_bytes"] > 0
+    assert result["findings"] > 0
+
+    slower = {**result, "wall_seconds": result["wall_seconds"] * 2 + 1}
+    assert compare([slower], {"results": [result]}, tolerance=0.2)
+    assert not compare([result], {"results": [slower]}, tolerance=0.2)
+
+
+def test_replayed_cassette_reproduces_recorded_scan(tmp_path):
+    options = {
+        "target": "asgi", "latency": 0.0, "jitter": 0.0, "error_rate": 0.2, "body_size": 1024, "seed": 3,
+        "rules": ["SEC-HEADERS", "BOLA-IDOR", "RATE-LIMIT"], "scan_config": {}, "database_url": "sqlite://",
+        "record": str(tmp_path),
+    }
+    recorded = run_case(10, options)
+    replayed = run_case(10, {**options, "record": None, "replay": str(tmp_path), "repeat": 3})
+    assert replayed["repeat"] == 3
+    assert replayed["replay_misses"] == 0
+    assert replayed["requests"] == recorded["requests"]
+    assert replayed["findings"] == recorded["findings"]
+
+
+def test_spec_parse_case_loads_json_and_yaml_specs_of_the_requested_size():
+    assert parse_size("100K") == 100_000 and parse_size("20MB") == 20_000_000
+    for fmt in ("json", "yaml"):
+        result = run_parse_case(20_000, fmt, {"repeat": 1, "baseline": True})
+        assert result["size_bytes"] >= 20_000 and result["operations"] > 0
+        assert result["parser"] == fmt and result["parsed_in"] == "thread"
+        assert result["parse_seconds"] >= 0 and result["baseline_seconds"] is not None
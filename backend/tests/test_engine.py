@@ -0,0 +1,592 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.session import Base
+from app.models import scan as scan_model  # noqa: F401  (registers tables)
+from app.models import user as user_model  # noqa: F401
+from app.models.scan import ScanJob, ScanResult
+from app.scanner import queue, registry
+from app.scanner.engine import ScannerEngine
+from app.scanner.rules.base import BaseRule
+from app.scanner.rules.bola import BolaRule
+from app.scanner.rules.auth_checks import AuthRequiredRule
+
+
+def _session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+class _SleepRule(BaseRule):
+    def __init__(self, rule_id, delay, fail=False):
+        self.id = rule_id
+        self.delay = delay
+        self.fail = fail
+
+    async def run(self, target_url, endpoints, config, client=None):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return [self.build_finding(
+            description=f"{self.id} finding",
+            details={},
+            endpoint="/",
+            method="GET",
+        )]
+
+
+def test_rules_run_concurrently_and_persist_in_rule_order():
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={})
+    db.add(scan)
+    db.commit()
+
+    engine = ScannerEngine(db, scan.id, max_parallel_rules=4)
+    engine.rules = [
+        _SleepRule("SLOW", 0.3),
+        _SleepRule("BROKEN", 0.2, fail=True),
+        _SleepRule("FAST", 0.2),
+    ]
+    spec = {"paths": {"/": {"get": {}}}}
+
+    loop = asyncio.new_event_loop()
+    start = loop.time()
+    loop.run_until_complete(engine.run(spec))
+    elapsed = loop.time() - start
+    loop.close()
+
+    db.refresh(scan)
+    assert scan.status == "completed"
+    assert elapsed < 0.3 + 0.2 + 0.2 - 0.1
+    # FAST is stored first, but results read back in rule order.
+    inserted = [r.rule_id for r in db.query(ScanResult).order_by(ScanResult.id)]
+    assert inserted == ["FAST", "SLOW"]
+    assert [r.rule_id for r in scan.results] == ["SLOW", "FAST"]
+
+
+def test_rules_share_injected_client_and_keep_their_own_headers():
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={"auth_header": "Bearer t0k"})
+    db.add(scan)
+    db.commit()
+
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers.get("authorization")))
+        return httpx.Response(200, text=f"item {request.url.path}")
+
+    engine = ScannerEngine(db, scan.id, transport=httpx.MockTransport(handler))
+    engine.rules = [BolaRule(), AuthRequiredRule()]
+    asyncio.run(engine.run({"paths": {"/items/1": {"get": {}}}}))
+
+    # BOLA sends the scan's auth header, the auth check deliberately does not.
+    assert ("/items/1", "Bearer t0k") in seen
+    assert ("/items/2", "Bearer t0k") in seen
+    assert ("/items/1", None) in seen
+    rule_ids = {r.rule_id for r in db.query(ScanResult)}
+    assert rule_ids == {"BOLA-IDOR", "AUTH-MISSING"}
+
+
+class _CountingRule(_SleepRule):
+    endpoint_scoped = True
+
+    def __init__(self, rule_id):
+        super().__init__(rule_id, 0)
+        self.calls = []
+
+    async def run(self, target_url, endpoints, config, client=None):
+        self.calls.append([ep["path"] for ep in endpoints])
+        if self.fail:
+            raise RuntimeError("interrupted")
+        return await super().run(target_url, endpoints, config, client)
+
+
+def test_resume_skips_checkpointed_units(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SCANNER_CHECKPOINT_CHUNK_SIZE", 2)
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={})
+    db.add(scan)
+    db.commit()
+
+    spec = {"paths": {f"/p{i}": {"get": {}} for i in range(3)}}
+    first, second = _CountingRule("FIRST"), _CountingRule("SECOND")
+    second.fail = True
+    engine = ScannerEngine(db, scan.id)
+    engine.rules = [first, second]
+    asyncio.run(engine.run(spec))
+    assert first.calls == [["/p0", "/p1"], ["/p2"]]
+
+    db.refresh(scan)
+    assert (scan.units_total, scan.units_done) == (4, 2)
+
+    # A different rule set cannot resume: finding positions belong to the frozen rule order.
+    scan.status = "interrupted"
+    db.commit()
+    third = _CountingRule("THIRD")
+    engine.rules = [first, third]
+    asyncio.run(engine.run(resume=True))
+    db.refresh(scan)
+    assert scan.status == "failed" and "added: THIRD; removed: SECOND" in scan.status_reason
+    assert third.calls == [] and [r.rule_id for r in scan.results] == ["FIRST", "FIRST"]
+
+    # Simulate a restart mid-scan, then resume with SECOND healthy again, listed in another order.
+    scan.status, scan.status_reason = "interrupted", None
+    db.commit()
+    second.fail = False
+    first.calls.clear()
+    second.calls.clear()
+    engine.rules = [second, first]
+    asyncio.run(engine.run(resume=True))
+
+    db.refresh(scan)
+    assert scan.status == "completed"
+    assert scan.plan["rule_order"] == ["FIRST", "SECOND"]
+    assert first.calls == []
+    assert second.calls == [["/p0", "/p1"], ["/p2"]]
+    assert [r.rule_id for r in scan.results] == ["FIRST", "FIRST", "SECOND", "SECOND"]
+
+
+def test_queue_claims_each_scan_once_and_requeues_stale_leases():
+    db = _session()
+    first = ScanJob(target_url="http://api.test", status="pending")
+    second = ScanJob(target_url="http://api.test", status="pending")
+    db.add_all([first, second])
+    db.commit()
+
+    assert queue.claim_next_scan(db, "worker-a") == first.id
+    assert queue.claim_next_scan(db, "worker-b") == second.id
+    assert queue.claim_next_scan(db, "worker-c") is None
+    assert queue.heartbeat(db, first.id, "worker-a")
+    assert not queue.heartbeat(db, first.id, "worker-b")
+
+    # worker-a dies: once its lease is stale the scan goes back to the queue.
+    assert queue.requeue_stale_scans(db, lease_timeout=-1, max_attempts=2) == [first.id, second.id]
+    db.refresh(first)
+    assert (first.status, first.lease_owner, first.attempts) == ("pending", None, 1)
+
+    assert queue.claim_next_scan(db, "worker-c") == first.id
+    assert queue.requeue_stale_scans(db, lease_timeout=-1, max_attempts=2) == []
+    db.refresh(first)
+    assert first.status == "failed"
+
+
+def test_large_scan_is_sharded_and_reduced(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SCAN_EXECUTION_MODE", "queue")
+    monkeypatch.setattr(settings, "SCANNER_CHECKPOINT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "SCANNER_SHARD_ENDPOINTS", 2)
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={})
+    db.add(scan)
+    db.commit()
+
+    rule = _CountingRule("SCOPED")
+    engine = ScannerEngine(db, scan.id)
+    engine.rules = [rule, _SleepRule("GLOBAL", 0)]
+    asyncio.run(engine.run({"paths": {f"/p{i}": {"get": {}} for i in range(4)}}))
+
+    # The claiming worker only plans: 3 units over 2 shards, nothing executed yet.
+    db.refresh(scan)
+    assert (scan.status, scan.shard_count, scan.units_total) == ("running", 2, 3)
+    assert [s.units_total for s in scan.shards] == [1, 2]
+    assert rule.calls == []
+
+    # Two workers pick up the shards; the second one to finish completes the scan.
+    while (shard_id := queue.claim_next_shard(db, "worker")) is not None:
+        asyncio.run(engine.run_shard(shard_id))
+
+    db.refresh(scan)
+    assert scan.status == "completed"
+    assert sorted(rule.calls) == [["/p0", "/p1"], ["/p2", "/p3"]]
+    assert [(s.status, s.units_done) for s in scan.shards] == [("completed", 1), ("completed", 2)]
+    assert [r.rule_id for r in scan.results] == ["SCOPED", "SCOPED", "GLOBAL"]
+
+
+
+def test_worker_skips_a_shard_deleted_after_it_was_claimed(monkeypatch):
+    from app import worker
+
+    db = _session()
+    monkeypatch.setattr(worker, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    asyncio.run(worker.ScanWorker("worker", 1).run_shard(12345))  # no such shard: returns quietly
+
+
+def test_deadline_budget_and_cancel_stop_early_and_keep_findings(monkeypatch):
+    from datetime import datetime
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SCANNER_CANCEL_POLL_INTERVAL", 0.05)
+    spec = {"paths": {"/": {"get": {}}}}
+
+    def scan_with(config):
+        db = _session()
+        scan = ScanJob(target_url="http://target.invalid", config=config)
+        db.add(scan)
+        db.commit()
+        engine = ScannerEngine(db, scan.id)
+        engine.rules = [_SleepRule("FAST", 0), _SleepRule("HANGS", 30)]
+        return db, scan, engine
+
+    # Per-rule budget: the hanging rule is cut off, the scan still completes.
+    db, scan, engine = scan_with({"rule_budgets": {"HANGS": 0.1}})
+    asyncio.run(engine.run(spec))
+    db.refresh(scan)
+    assert scan.status == "completed"
+    assert "HANGS" in scan.status_reason
+    assert [r.rule_id for r in scan.results] == ["FAST"]
+
+    # Scan deadline.
+    db, scan, engine = scan_with({"deadline_seconds": 0.2})
+    asyncio.run(engine.run(spec))
+    db.refresh(scan)
+    assert scan.status == "timed_out"
+    assert [r.rule_id for r in scan.results] == ["FAST"]
+
+    # Cancellation requested while the scan runs.
+    db, scan, engine = scan_with({})
+
+    async def cancel_soon():
+        await asyncio.sleep(0.2)
+        scan.cancel_requested_at = datetime.utcnow()
+        db.commit()
+
+    async def main():
+        await asyncio.gather(engine.run(spec), cancel_soon())
+
+    asyncio.run(main())
+    db.refresh(scan)
+    assert scan.status == "cancelled"
+    assert [r.rule_id for r in scan.results] == ["FAST"]
+
+
+class _ProbeRule(_SleepRule):
+    """Sends ``probes`` GETs per endpoint, counting the ones that were refused."""
+
+    def __init__(self, rule_id, probes):
+        super().__init__(rule_id, 0)
+        self.probes = probes
+        self.refused = 0
+
+    async def run(self, target_url, endpoints, config, client=None):
+        async with self.session(client) as client:
+            for ep in endpoints:
+                for i in range(self.probes):
+                    try:
+                        await client.get(f"{target_url}{ep['path']}", params={"i": i})
+                    except httpx.TransportError:
+                        self.refused += 1
+        return []
+
+
+def test_traffic_is_accounted_per_rule_and_endpoint_and_budget_stops_rules():
+    def handler(request):
+        if request.url.path == "/broken":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, text="x" * 10)
+
+    spec = {"paths": {"/a": {"get": {}}, "/broken": {"get": {}}}}
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={"response_cache": False})
+    db.add(scan)
+    db.commit()
+    engine = ScannerEngine(db, scan.id, transport=httpx.MockTransport(handler))
+    engine.rules = [_ProbeRule("ONE", 1), _ProbeRule("THREE", 3)]
+    asyncio.run(engine.run(spec))
+
+    db.refresh(scan)
+    traffic = scan.traffic
+    assert traffic["total"]["requests"] == 8
+    assert traffic["total"]["errors"] == 4
+    assert traffic["total"]["bytes"] == 40
+    assert traffic["rules"]["ONE"]["requests"] == 2
+    assert traffic["rules"]["THREE"] == {**traffic["rules"]["THREE"], "requests": 6, "errors": 3, "bytes": 30}
+    assert traffic["endpoints"]["GET /broken"]["errors"] == 4
+    assert scan.status_reason is None
+    assert scan.perf["latency"]["count"] == 4
+    assert set(scan.perf["rules"]) == {"ONE", "THREE"}
+
+    # With a budget of 3 requests the rules' remaining probes are refused without being sent.
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={"response_cache": False, "max_requests": 3})
+    db.add(scan)
+    db.commit()
+    sent = []
+    engine = ScannerEngine(db, scan.id, max_parallel_rules=1,
+                           transport=httpx.MockTransport(lambda r: sent.append(r) or handler(r)))
+    engine.rules = [_ProbeRule("THREE", 3), _ProbeRule("SKIPPED", 1)]
+    asyncio.run(engine.run(spec))
+
+    db.refresh(scan)
+    assert len(sent) == 3
+    assert engine.rules[0].refused == 3
+    assert engine.rules[1].refused == 0  # its unit never started
+    assert scan.status == "completed"
+    assert scan.status_reason == "Request budget of 3 requests exhausted"
+    assert scan.traffic["budget_exhausted"] is True
+    assert scan.traffic["total"]["requests"] == 3
+
+
+class _PluginRule(BaseRule):
+    id = "PLUGIN-001"
+    category = "API8"
+    tags = ("passive",)
+
+    async def run(self, target_url, endpoints, config, client=None):
+        return []
+
+
+def test_rule_selection_imports_only_selected_rules(monkeypatch):
+    code = (
+        "import sys, app.scanner.engine\n"
+        "from app.scanner.registry import load_rules\n"
+        "rules = load_rules({'rules': ['SEC-HEADERS'], 'rule_tags': ['transport']})\n"
+        "print(' '.join(rule.id for rule in rules))\n"
+        "print(' '.join(sorted(m for m in sys.modules if m.startswith('app.scanner.rules.') and m != 'app.scanner.rules.base')))\n"
+    )
+    ids, modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.dirname(__file__))).stdout.splitlines()
+    assert ids == "SEC-HEADERS TLS-ENFORCE"
+    assert modules == "app.scanner.rules.security_headers app.scanner.rules.tls_enforcement"
+
+    plugin = EntryPoint("PLUGIN-001", f"{__name__}:_PluginRule", registry.ENTRY_POINT_GROUP)
+    monkeypatch.setattr(registry, "entry_points", lambda group: [plugin])
+    assert [s.id for s in registry.resolve({"rule_categories": ["API8"], "exclude_rules": ["CORS-001"]})] == [
+        "SEC-HEADERS", "HTML-INJ-001", "PATH-TRAV-001", "COOKIE-SEC", "TLS-ENFORCE", "FINGERPRINT", "PLUGIN-001",
+    ]
+    assert len(registry.resolve({})) == len(registry.BUILTIN_RULES) + 1
+    with pytest.raises(registry.UnknownRuleError):
+        registry.resolve({"rules": ["NOPE"]})
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", config={"rules": ["PLUGIN-001"]})
+    db.add(scan)
+    db.commit()
+    engine = ScannerEngine(db, scan.id)
+    asyncio.run(engine.run({"openapi": "3.0.0", "paths": {"/a": {"get": {}}}}))
+    assert [rule.id for rule in engine.rules] == ["PLUGIN-001"]
+    db.refresh(scan)
+    assert scan.status == "completed"
+
+
+def test_planned_probes_are_deduplicated_across_rules():
+    from app.scanner.rules.fingerprint_headers import FingerprintHeadersRule
+    from app.scanner.rules.security_headers import SecurityHeadersRule
+    from app.scanner.rules.sensitive_data import SensitiveDataRule
+    from app.scanner.rules.tls_enforcement import TLSEnforcementRule
+
+    sent = []
+
+    def handler(request):
+        sent.append(request.url.path)
+        return httpx.Response(200, headers={"server": "demo/1.0"}, text='{"email": "a@b.example"}')
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.test", config={})
+    db.add(scan)
+    db.commit()
+    engine = ScannerEngine(db, scan.id, transport=httpx.MockTransport(handler))
+    engine.rules = [SecurityHeadersRule(), FingerprintHeadersRule(), TLSEnforcementRule(), SensitiveDataRule(),
+                    _SleepRule("IMPERATIVE", 0)]
+    spec = {"openapi": "3.0.0", "paths": {"/users": {"get": {}, "post": {}}, "/items": {"get": {}}}}
+    asyncio.run(engine.run(spec))
+
+    db.refresh(scan)
+    assert scan.plan["probes"] == 5 and scan.plan["unique_probes"] == 3
+    assert scan.plan["rules"]["SENSITIVE-DATA"] == {"units": 1, "probes": 2}
+    assert scan.plan["unplanned_rules"] == ["IMPERATIVE"]
+    assert sorted(sent) == ["/", "/items", "/users"]
+    rules = {r.rule_id for r in db.query(ScanResult).filter(ScanResult.job_id == scan.id)}
+    assert rules == {"SEC-HEADERS", "FINGERPRINT", "TLS-ENFORCE", "SENSITIVE-DATA", "IMPERATIVE"}
+
+
+def test_units_start_by_user_priority_then_severity_then_sensitive_endpoints(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SCANNER_CHECKPOINT_CHUNK_SIZE", 2)
+    started = []
+
+    class _Rule(_SleepRule):
+        endpoint_scoped = True
+
+        def __init__(self, rule_id, severity):
+            super().__init__(rule_id, 0)
+            self.severity = severity
+
+        async def run(self, target_url, endpoints, config, client=None):
+            started.append((self.id, [e["path"] for e in endpoints]))
+            return []
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid",
+                   config={"max_parallel_rules": 1, "rule_priorities": {"LOW-BUT-WANTED": 1},
+                           "priority_paths": ["^/reports"]})
+    db.add(scan)
+    db.commit()
+    engine = ScannerEngine(db, scan.id)
+    whole = _Rule("WHOLE-API", "info")
+    whole.endpoint_scoped = False
+    engine.rules = [_Rule("MEDIUM", "medium"), _Rule("CRITICAL", "critical"), _Rule("LOW-BUT-WANTED", "low"), whole]
+    spec = {"openapi": "3.0.0", "paths": {p: {"get": {}} for p in ("/items", "/tags", "/reports", "/admin/users")}}
+    asyncio.run(engine.run(spec))
+
+    db.refresh(scan)
+    # Priority groups endpoints into units; the endpoint list itself keeps spec order
+    assert [e["path"] for e in scan.endpoints] == ["/items", "/tags", "/reports", "/admin/users"]
+    assert started == [
+        ("LOW-BUT-WANTED", ["/reports", "/admin/users"]), ("LOW-BUT-WANTED", ["/items", "/tags"]),
+        ("CRITICAL", ["/reports", "/admin/users"]), ("CRITICAL", ["/items", "/tags"]),
+        ("MEDIUM", ["/reports", "/admin/users"]), ("MEDIUM", ["/items", "/tags"]),
+        ("WHOLE-API", ["/items", "/tags", "/reports", "/admin/users"]),
+    ]
+
+
+class _PerEndpointRule(_CountingRule):
+    async def run(self, target_url, endpoints, config, client=None):
+        self.calls.append(sorted(ep["path"] for ep in endpoints))
+        return [self.build_finding(description=f"{self.id} on {ep['path']}", details={},
+                                   endpoint=ep["path"], method=ep["method"]) for ep in endpoints]
+
+
+def test_incremental_rescan_scans_changed_operations_and_carries_other_findings():
+    db = _session()
+    user = {"type": "object", "properties": {"name": {"type": "string"}}}
+    spec = {
+        "paths": {
+            "/users": {"get": {"responses": {"200": {"$ref": "#/components/schemas/User"}}}},
+            "/orders": {"get": {"summary": "orders"}},
+            "/items": {"get": {"summary": "items"}},
+        },
+        "components": {"schemas": {"User": user}},
+    }
+
+    def scan_with(spec, rules, **config):
+        scan = ScanJob(target_url="http://target.invalid", config={"incremental": True, **config})
+        db.add(scan)
+        db.commit()
+        engine = ScannerEngine(db, scan.id)
+        engine.rules = rules
+        asyncio.run(engine.run(spec))
+        db.refresh(scan)
+        return scan
+
+    scoped, whole = _PerEndpointRule("SCOPED"), _SleepRule("WHOLE", 0)
+    first = scan_with(spec, [scoped, whole])
+    assert first.diff is None and len(first.results) == 4
+
+    # /users changes through its referenced schema, /items is removed, /new is added
+    changed = json.loads(json.dumps(spec))
+    changed["components"]["schemas"]["User"]["properties"]["email"] = {"type": "string"}
+    del changed["paths"]["/items"]
+    changed["paths"]["/new"] = {"post": {}}
+    scoped.calls.clear()
+    late = _PerEndpointRule("LATE")  # not in the baseline, so it scans everything
+    second = scan_with(changed, [scoped, whole, late])
+    assert scoped.calls == [["/new", "/users"]] and late.calls == [["/new", "/orders", "/users"]]
+    assert second.baseline_scan_id == first.id
+    assert second.diff == {"baseline_scan_id": first.id, "added": 1, "changed": 1, "removed": 1, "unchanged": 1,
+                           "carried_rules": ["SCOPED"], "carried_findings": 1}
+    carried = [r for r in second.results if r.carried_from_scan_id]
+    assert [(r.rule_id, r.endpoint, r.carried_from_scan_id) for r in carried] == [("SCOPED", "/orders", first.id)]
+    assert sorted(r.description for r in second.results if r.rule_id == "SCOPED") == [
+        "SCOPED on /new", "SCOPED on /orders", "SCOPED on /users"]
+
+    scoped.calls.clear()
+    third = scan_with(changed, [scoped, whole])
+    assert scoped.calls == [] and third.diff["unchanged"] == 3
+    assert {r.endpoint: r.carried_from_scan_id for r in third.results if r.rule_id == "SCOPED"} == {
+        "/orders": first.id, "/users": second.id, "/new": second.id}
+
+    # Findings depend on the credentials: a scan with other auth has no baseline; rate settings don't matter.
+    scoped.calls.clear()
+    other_auth = scan_with(changed, [scoped, whole], auth_header="Bearer other", max_in_flight=2)
+    assert other_auth.diff is None and scoped.calls == [["/new", "/orders", "/users"]]
+    assert not [r for r in other_auth.results if r.carried_from_scan_id]
+    fourth = scan_with(changed, [scoped, whole], max_in_flight=2)
+    assert fourth.baseline_scan_id == third.id
+
+
+
+def test_yaml_spec_with_int_and_string_response_keys_scans_and_hashes(tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.scanner.incremental import hash_endpoints
+
+    monkeypatch.setattr(settings, "SCANNER_SPEC_CACHE_MAX_BYTES", 0)
+    path = tmp_path / "api.yaml"
+    path.write_text(
+        "openapi: 3.0.0\n"
+        "paths:\n"
+        "  /users:\n"
+        "    get:\n"
+        "      responses:\n"
+        "        200: {description: ok}\n"
+        "        default: {description: error}\n"
+    )
+    db = _session()
+    scan = ScanJob(target_url="http://target.invalid", spec_url=str(path), config={})
+    db.add(scan)
+    db.commit()
+    engine = ScannerEngine(db, scan.id)
+    engine.rules = [_PerEndpointRule("SCOPED")]
+    asyncio.run(engine.run())
+
+    db.refresh(scan)
+    assert scan.status == "completed"
+    # Same hash as the JSON round trip the spec cache returns, so cached and uncached scans agree
+    cached = json.loads(json.dumps(scan.endpoints))
+    for endpoint in cached:
+        endpoint.pop("hash")
+    hash_endpoints(cached)
+    assert [e["hash"] for e in cached] == [e["hash"] for e in scan.endpoints]
+
+
+def test_endpoints_are_classified_once_and_rules_filter_by_tag(monkeypatch):
+    from app.scanner import classify
+    from app.scanner.rules.broken_function_auth import BrokenFunctionAuthRule
+
+    assert classify.classify("/api/v1/admin/settings/{id}/download") == [
+        "admin", "file-serving", "id-bearing", "sensitive", "url-accepting"]
+    assert classify.classify("/Payments/7") == ["id-bearing", "payment", "sensitive"]
+    assert classify.classify("/loader/v2") == ["file-serving", "url-accepting"]  # "/load" is a prefix of the path
+    assert classify.classify("/items") == []
+
+    classified = []
+    real = classify.classify
+    monkeypatch.setattr(classify, "classify", lambda path: classified.append(path) or real(path))
+    sent = []
+
+    def handler(request):
+        sent.append(request.url.path)
+        return httpx.Response(403)
+
+    db = _session()
+    scan = ScanJob(target_url="http://target.test", config={})
+    db.add(scan)
+    db.commit()
+    engine = ScannerEngine(db, scan.id, transport=httpx.MockTransport(handler))
+    engine.rules = [BrokenFunctionAuthRule(), BolaRule()]
+    spec = {"openapi": "3.0.0", "paths": {p: {"get": {}} for p in ("/items", "/admin/users", "/orders/{id}")}}
+    asyncio.run(engine.run(spec))
+
+    db.refresh(scan)
+    assert {e["path"]: e["tags"] for e in scan.endpoints} == {
+        "/admin/users": ["admin", "sensitive"], "/orders/{id}": ["id-bearing", "payment"], "/items": []}
+    assert sorted(classified) == ["/admin/users", "/items", "/orders/{id}"]  # once per endpoint, not per rule
+    assert sent and set(sent) == {"/admin/users"}
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.session import Base
+from app.models import scan as scan_model, user as user_model  # noqa: F401  (registers tables)
+from app.models.scan import ScanJob, ScanResult
+from app.scanner.engine import ScannerEngine
+from app.scanner.rules.openapi_contract import OpenAPIContractRule
+from app.scanner.spec import SpecResolver, spec_format
+
+
+def _write(path, document):
+    path.write_text(json.dumps(document))
+    return str(path)
+
+
+def test_resolver_follows_local_and_file_refs_and_stops_on_recursion(tmp_path):
+    (tmp_path / "shared").mkdir()
+    _write(tmp_path / "shared" / "people.json", {
+        "Person": {"allOf": [{"$ref": "#/Base"}], "properties": {
+            "phone": {"type": "string"},
+            "manager": {"$ref": "#/Person"},
+            "reports": {"type": "array", "items": {"$ref": "#/Person"}},
+        }},
+        "Base": {"properties": {"id": {"type": "integer"}}},
+    })
+    spec = {"components": {"schemas": {
+        "Employee": {"$ref": "shared/people.json#/Person"},
+        "Team": {"properties": {"lead": {"$ref": "#/components/schemas/Employee"}}},
+    }}}
+    loads = []
+
+    def loader(location):
+        loads.append(location)
+        with open(location) as f:
+            return json.load(f)
+
+    resolver = SpecResolver(spec, _write(tmp_path / "api.json", spec), loader=loader)
+    names = [name for name, _ in resolver.properties({"$ref": "#/components/schemas/Team"})]
+    assert names == ["lead", "lead.id", "lead.phone", "lead.manager", "lead.reports"]
+    assert resolver.properties({"$ref": "#/components/schemas/Employee"}) is \
+        resolver.properties({"$ref": "shared/people.json#/Person"})  # walked once, memoized
+    assert loads == [str(tmp_path / "shared" / "people.json")]
+    assert resolver.resolve({"$ref": "#/components/schemas/Missing"}) == {"$ref": "#/components/schemas/Missing"}
+    assert resolver.unresolved == {"#/components/schemas/Missing"}
+
+
+
+def test_resolver_reads_files_only_for_specs_read_from_files(tmp_path):
+    secret = _write(tmp_path / "secret.json", {"Secret": {"properties": {"password": {"type": "string"}}}})
+    spec = {"components": {"schemas": {
+        "Absolute": {"$ref": f"{secret}#/Secret"},
+        "Relative": {"$ref": "secret.json#/Secret"},
+    }}}
+    loads = []
+
+    def loader(location):
+        loads.append(location)
+        with open(location) as f:
+            return json.load(f)
+
+    # A spec fetched by URL: file-looking refs stay on the spec's host, and nothing is read from disk.
+    remote = SpecResolver(spec, "https://api.example.com/specs/openapi.json", loader=loader)
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        return None
+
+    asyncio.run(remote.prefetch(fetch))
+    assert sorted(fetched) == sorted([f"https://api.example.com{secret}", "https://api.example.com/specs/secret.json"])
+    assert remote.properties({"$ref": "#/components/schemas/Absolute"}) == []
+    assert remote.properties({"$ref": "#/components/schemas/Relative"}) == []
+
+    # An inline spec has no directory of its own: file refs are refused.
+    inline = SpecResolver(spec, loader=loader)
+    assert inline.properties({"$ref": "#/components/schemas/Absolute"}) == []
+    assert inline.properties({"$ref": "#/components/schemas/Relative"}) == []
+    assert inline.unresolved == {f"{secret}#/Secret", "secret.json#/Secret"}
+    assert loads == []
+
+    # A spec read from a file still resolves both.
+    local = SpecResolver(spec, str(tmp_path / "api.json"), loader=loader)
+    assert [name for name, _ in local.properties({"$ref": "#/components/schemas/Relative"})] == ["password"]
+    assert [name for name, _ in local.properties({"$ref": "#/components/schemas/Absolute"})] == ["password"]
+
+
+
+def test_properties_of_mutually_recursive_schemas_do_not_depend_on_call_order():
+    spec = {"components": {"schemas": {
+        "A": {"properties": {"ssn": {"type": "string"}, "b": {"$ref": "#/components/schemas/B"}}},
+        "B": {"properties": {"email": {"type": "string"}, "a": {"$ref": "#/components/schemas/A"}}},
+    }}}
+    a, b = {"$ref": "#/components/schemas/A"}, {"$ref": "#/components/schemas/B"}
+    expected_a = ["ssn", "b", "b.email", "b.a"]
+    expected_b = ["email", "a", "a.ssn", "a.b"]
+    for first, second in ((a, b), (b, a)):
+        resolver = SpecResolver(spec)
+        resolver.properties(first)
+        resolver.properties(second)
+        assert [name for name, _ in resolver.properties(a)] == expected_a
+        assert [name for name, _ in resolver.properties(b)] == expected_b
+
+
+def test_prefetch_stays_on_the_spec_host_and_caps_documents(monkeypatch):
+    from app.scanner import spec as spec_module
+
+    monkeypatch.setattr(spec_module, "MAX_REF_DOCUMENTS", 3)
+    refs = {f"S{i}": {"$ref": f"s{i}.json#/S"} for i in range(5)}
+    refs["Elsewhere"] = {"$ref": "https://evil.example/x.json#/S"}
+    spec = {"components": {"schemas": refs}}
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        return {"S": {"$ref": "next.json#/S"}}  # every document links on
+
+    resolver = SpecResolver(spec, "https://api.example.com/openapi.json")
+    asyncio.run(resolver.prefetch(fetch))
+    assert len(fetched) == 3
+    assert all(url.startswith("https://api.example.com/") for url in fetched)
+
+
+def test_contract_rule_finds_pii_inside_referenced_components():
+    spec = {
+        "paths": {"/users": {"post": {
+            "security": [{}],
+            "requestBody": {"$ref": "#/components/requestBodies/NewUser"},
+            "responses": {"200": {"$ref": "#/components/responses/User"}},
+        }}},
+        "components": {
+            "schemas": {"User": {"properties": {"name": {}, "profile": {"properties": {"ssn": {}}}}}},
+            "requestBodies": {"NewUser": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}}},
+            "responses": {"User": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}}},
+        },
+    }
+    rule = OpenAPIContractRule()
+    endpoints = [{"path": "/users", "method": "POST", "details": spec["paths"]["/users"]["post"]}]
+    assert asyncio.run(rule.run("http://t", endpoints, {})) == []  # standalone: refs unresolved
+
+    rule.spec = SpecResolver(spec)
+    findings = asyncio.run(rule.run("http://t", endpoints, {}))
+    assert [json.loads(f["proof_of_concept"])["location"] for f in findings] == ["Request Body", "Response 200"]
+    assert all(json.loads(f["proof_of_concept"])["field"] == "profile.ssn" for f in findings)
+
+
+    db = sessionmaker(bind=create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                         poolclass=StaticPool))()
+    Base.metadata.create_all(bind=db.get_bind())
+    scan = ScanJob(target_url="http://t", config={"rules": ["OPENAPI-CONTRACT"]}, spec_content=spec,
+                   status="interrupted", endpoints=endpoints)
+    db.add(scan)
+    db.commit()
+    asyncio.run(ScannerEngine(db, scan.id).run(resume=True))  # endpoints are frozen; the spec is re-read for refs
+    assert db.query(ScanResult).filter(ScanResult.job_id == scan.id).count() == 2
+
+
+def test_spec_cache_uses_conditional_gets_and_evicts_least_recently_used(tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.scanner.spec_cache import SpecCache, content_digest
+
+    monkeypatch.setattr(settings, "SCANNER_SPEC_CACHE_DIR", str(tmp_path / "cache"))
+    body = b"openapi: 3.0.0\npaths:\n  /a:\n    get: {}\n"
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"etag": '"v1"'})
+
+    engine = ScannerEngine(None, None, transport=httpx.MockTransport(handler))
+    parses = []
+    real_parse = engine.parse_spec
+    monkeypatch.setattr(engine, "parse_spec", lambda *args: parses.append(1) or real_parse(*args))
+    first = asyncio.run(engine.fetch_spec("http://specs.test/api.yaml"))
+    second = asyncio.run(engine.fetch_spec("http://specs.test/api.yaml"))
+    assert first == second == {"openapi": "3.0.0", "paths": {"/a": {"get": {}}}}
+    assert seen == [None, '"v1"'] and len(parses) == 1  # the 304 skipped download and parse
+
+    # An error page that parses is returned as before, but never cached or remembered
+    error = b'{"error": "maintenance"}'
+    errors = ScannerEngine(None, None, transport=httpx.MockTransport(
+        lambda request: httpx.Response(503, content=error, headers={"etag": '"e"'})))
+    assert asyncio.run(errors.fetch_spec("http://specs.test/down.json")) == {"error": "maintenance"}
+    assert SpecCache(str(tmp_path / "cache"), 1 << 20).get(content_digest(error)) is None
+    assert SpecCache(str(tmp_path / "cache"), 1 << 20).validators("http://specs.test/down.json") == {}
+
+    local = tmp_path / "api.yaml"
+    local.write_bytes(body)
+    assert asyncio.run(engine.fetch_spec(str(local))) == first
+    assert asyncio.run(engine.parse_spec(body, SpecCache(str(tmp_path / "cache"), 1 << 20)))[0] == first
+
+    entry = len(json.dumps({"blob": "a" * 100}, separators=(",", ":")))
+    cache = SpecCache(str(tmp_path / "small"), entry * 2 + entry // 2)
+    for age, name in enumerate(("a", "b")):
+        cache.put(name, {"blob": name * 100})
+        os.utime(cache._spec_path(name), (age, age))
+    assert cache.get("a") is not None  # refreshes a, so b is now least recently used
+    cache.put("c", {"blob": "c" * 100})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    # Damaged entries are misses, whatever the error; entries are JSON, never unpickled.
+    for name, data in (("torn", b'{"blob": "a'), ("binary", b"\x80\x04\x95"), ("empty", b"")):
+        with open(cache._spec_path(name), "wb") as f:
+            f.write(data)
+        misses = cache.misses
+        assert cache.get(name) is None and cache.misses == misses + 1
+        assert not os.path.exists(cache._spec_path(name))
+    import datetime
+    cache.put("dated", {"info": {"released": datetime.date(2024, 1, 2)}})
+    assert cache.get("dated") == {"info": {"released": "2024-01-02"}}
+
+
+def test_spec_is_parsed_once_with_the_sniffed_parser_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+    import yaml
+    from app.core.config import settings
+    from app.scanner import spec as spec_module
+
+    assert spec_format(b'\xef\xbb\xbf\n  {"openapi": "3.0.0"}') == "json"
+    assert spec_format(b"openapi: 3.0.0\n") == "yaml"
+    assert spec_format(b"{openapi: 3.0.0}", content_type="application/x-yaml") == "yaml"
+    assert spec_format(b"{openapi: 3.0.0}", name="http://specs.test/api.yml?v=2") == "yaml"
+    if yaml.__with_libyaml__:
+        assert spec_module.YAML_LOADER is yaml.CSafeLoader
+
+    monkeypatch.setattr(settings, "SCANNER_SPEC_CACHE_MAX_BYTES", 0)
+    calls = []
+    real_load = yaml.load
+    monkeypatch.setattr(yaml, "load", lambda *a, **kw: calls.append(threading.get_ident()) or real_load(*a, **kw))
+    json_spec, yaml_spec = tmp_path / "api.json", tmp_path / "api.yaml"
+    json_spec.write_text(json.dumps({"openapi": "3.0.0", "paths": {}}))
+    yaml_spec.write_text("openapi: 3.0.0\npaths: {}\n")
+
+    async def load(path):
+        return await ScannerEngine(None, None).fetch_spec(str(path)), threading.get_ident()
+
+    spec, _ = asyncio.run(load(json_spec))
+    assert spec == {"openapi": "3.0.0", "paths": {}} and calls == []  # JSON never goes through YAML
+    spec, loop_thread = asyncio.run(load(yaml_spec))
+    assert spec == {"openapi": "3.0.0", "paths": {}}
+    assert len(calls) == 1 and calls[0] != loop_thread
+
+    monkeypatch.setattr(settings, "SCANNER_SPEC_PARSE_PROCESS_BYTES", 1)
+    spec, _ = asyncio.run(load(yaml_spec))
+    assert spec == {"openapi": "3.0.0", "paths": {}} and len(calls) == 1  # parsed in a worker process
@@ -0,0 +1,366 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.scanner.cache import CachingTransport, ResponseCache
+from app.scanner.cassette import Cassette, CassetteWriter, RecordingTransport, ReplayTransport
+from app.scanner.http import ConnectionStats, build_scan_client
+from app.scanner.scheduler import AIMDController, FairGate, RequestScheduler, SchedulingTransport
+
+
+def test_fair_gate_alternates_between_rules():
+    async def scenario():
+        gate = FairGate(1)
+        await gate.acquire("holder")
+        order = []
+
+        async def worker(rule, i):
+            await gate.acquire(rule)
+            order.append(f"{rule}{i}")
+            gate.release()
+
+        # A noisy rule queues three requests before the quiet rule queues one.
+        tasks = [asyncio.create_task(worker("noisy", i)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(worker("quiet", 0)))
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["noisy0", "quiet0", "noisy1", "noisy2"]
+
+
+def test_scheduling_transport_caps_in_flight_per_host():
+    peak = 0
+    current = 0
+
+    async def handler(request):
+        nonlocal peak, current
+        current += 1
+        peak = max(peak, current)
+        await asyncio.sleep(0.01)
+        current -= 1
+        return httpx.Response(200)
+
+    async def scenario():
+        scheduler = RequestScheduler(max_in_flight=50, max_in_flight_per_host=3)
+        transport = SchedulingTransport(httpx.MockTransport(handler), scheduler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(*[client.get("http://target.invalid/") for _ in range(20)])
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert peak == 3
+    assert scheduler.global_gate.in_flight == 0
+
+
+def test_cache_coalesces_identical_gets_and_skips_opt_outs():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, text="body")
+
+    async def scenario():
+        cache = ResponseCache(max_entries=10, max_bytes=1 << 20, max_body_bytes=1 << 16)
+        transport = CachingTransport(httpx.MockTransport(handler), cache)
+        async with httpx.AsyncClient(transport=transport) as client:
+            bodies = await asyncio.gather(*[client.get("http://target.invalid/a") for _ in range(5)])
+            await client.get("http://target.invalid/a")
+            await client.get("http://target.invalid/a", extensions={"scan_cache": False})
+            await client.post("http://target.invalid/a")
+        return cache, [b.text for b in bodies]
+
+    cache, bodies = asyncio.run(scenario())
+    assert bodies == ["body"] * 5
+    assert calls == 3
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 1)
+
+
+class _BrokenBody(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b"partial"
+        raise httpx.ReadError("connection reset")
+
+
+def test_cache_releases_scheduler_slot_on_broken_body_and_skips_transient_statuses():
+    statuses = iter([429, 503, 200])
+
+    async def handler(request):
+        if request.url.path == "/broken":
+            return httpx.Response(200, stream=_BrokenBody())
+        return httpx.Response(next(statuses), text="x")
+
+    async def scenario():
+        scheduler = RequestScheduler(max_in_flight=10, max_in_flight_per_host=2)
+        cache = ResponseCache(max_entries=10, max_bytes=1 << 20, max_body_bytes=1 << 16)
+        transport = CachingTransport(SchedulingTransport(httpx.MockTransport(handler), scheduler), cache)
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(3):  # more failures than the per-host limit
+                with pytest.raises(httpx.ReadError):
+                    await asyncio.wait_for(client.get("http://target.invalid/broken"), 1)
+            codes = [(await asyncio.wait_for(client.get("http://target.invalid/a"), 1)).status_code
+                     for _ in range(4)]
+        return scheduler, cache, codes
+
+    scheduler, cache, codes = asyncio.run(scenario())
+    assert codes == [429, 503, 200, 200]  # throttled answers are not replayed to later requests
+    assert cache.hits == 1
+    assert scheduler.global_gate.in_flight == 0
+
+
+def test_aimd_controller_backs_off_on_throttling_and_grows_when_healthy():
+    gate = FairGate(1)
+    controller = AIMDController(gate, initial_limit=4, max_limit=32)
+    assert gate.limit == 4
+
+    # Healthy windows: slow start doubles the limit.
+    for _ in range(8):
+        controller.record(0.01, 200)
+    assert gate.limit == 8
+
+    # A 429 halves it, ends slow start and honours Retry-After.
+    controller.record(0.01, 429, "2")
+    assert gate.limit == 4
+    assert controller.paused_until > 0
+    for _ in range(8):
+        controller.record(0.01, 200)
+    assert gate.limit == 5
+
+    # Latency far above the best p95 seen so far also counts as congestion.
+    for _ in range(8):
+        controller.record(0.5, 200)
+    assert gate.limit == 2
+    assert controller.stats()["decreases"] == 2
+
+
+
+def test_aimd_controller_cuts_once_for_a_burst_of_concurrent_throttles():
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(429)
+
+    async def scenario():
+        scheduler = RequestScheduler(max_in_flight=50, max_in_flight_per_host=32, adaptive=True,
+                                     adaptive_initial_limit=8)
+        transport = SchedulingTransport(httpx.MockTransport(handler), scheduler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(*[client.get("http://target.invalid/") for _ in range(8)])
+        return scheduler
+
+    stats = asyncio.run(scenario()).stats()["target.invalid:http"]
+    assert stats["limit"] == 4
+    assert stats["decreases"] == 1
+    assert stats["throttled"] == 8
+
+    # Without send times, throttles count again once a window of responses has passed.
+    controller = AIMDController(FairGate(1), initial_limit=8, max_limit=32)
+    for _ in range(5):
+        controller.record(0.01, 429)
+    assert controller.limit == 4
+    for _ in range(4):
+        controller.record(0.01, 200)
+    controller.record(0.01, 429)
+    assert controller.limit == 2
+
+
+
+def test_rate_limit_burst_keeps_host_cap_but_skips_adaptive_feedback():
+    from app.scanner.rules.rate_limit import RateLimitRule
+
+    peak = 0
+    current = 0
+    calls = 0
+
+    async def handler(request):
+        nonlocal peak, current, calls
+        calls += 1
+        current += 1
+        peak = max(peak, current)
+        await asyncio.sleep(0.01)
+        current -= 1
+        if request.url.path == "/items" and calls > 40:
+            return httpx.Response(429, headers={"Retry-After": "30"})
+        return httpx.Response(200)
+
+    async def scenario():
+        scheduler = RequestScheduler(max_in_flight=50, max_in_flight_per_host=4, adaptive=True,
+                                     adaptive_initial_limit=4)
+        async with build_scan_client({}, transport=httpx.MockTransport(handler), scheduler=scheduler,
+                                     cache=ResponseCache(100, 1 << 20, 1 << 16)) as client:
+            findings = await RateLimitRule().run("http://target.invalid", [{"method": "GET", "path": "/items"}],
+                                                 {}, client=client)
+            # Other rules are neither paused by the burst's Retry-After nor slowed by its 429s.
+            await asyncio.wait_for(client.get("http://target.invalid/other"), 1)
+        return findings, scheduler
+
+    findings, scheduler = asyncio.run(scenario())
+    assert findings == []
+    assert calls == 51
+    assert peak == 4  # the burst still honours the per-host cap
+    stats = scheduler.stats()["target.invalid:http"]
+    assert stats["limit"] == 4
+    assert stats["decreases"] == 0
+    assert stats["throttled"] == 0
+    assert scheduler.global_gate.in_flight == 0
+
+
+@pytest.mark.parametrize("alpn, version, max_connections", [
+    (("h2", "http/1.1"), "HTTP/2", 1),
+    (("http/1.1",), "HTTP/1.1", 20),
+])
+def test_http2_multiplexes_over_one_connection_and_falls_back_to_http11(alpn, version, max_connections):
+    pytest.importorskip("h2")
+    from h2server import H2TestServer
+
+    config = {"http2": True, "adaptive_concurrency": False, "max_in_flight_per_host": 20, "response_cache": False}
+
+    async def scenario():
+        async with H2TestServer(alpn=alpn) as server:
+            stats = ConnectionStats()
+            async with build_scan_client(config, connection_stats=stats) as client:
+                responses = await asyncio.gather(*[client.get(f"{server.url}/p{i}") for i in range(20)])
+            return server, stats, responses
+
+    server, stats, responses = asyncio.run(scenario())
+    assert {r.http_version for r in responses} == {version}
+    assert responses[3].text == "ok /p3"
+    assert stats.stats()["http_versions"] == {version: 20}
+    assert 1 <= server.connections <= max_connections
+    assert stats.stats()["connections"] == server.connections
+    if version == "HTTP/2":
+        assert stats.stats()["max_streams_per_connection"] == 20
+
+
+def test_rule_fetch_caps_body_and_stops_at_first_marker():
+    from app.scanner.body import BodyMatcher
+    from app.scanner.http import RuleClient
+
+    pulled = []
+
+    class Chunks(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(1000):
+                pulled.append(i)
+                yield (b"x" * 1020 + b"root" if i == 3 else b"x" * 1024)
+
+    def handler(request):
+        return httpx.Response(200, stream=Chunks())
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            rule_client = RuleClient(client, max_body_bytes=10_000)
+            capped = await rule_client.fetch("GET", "http://target.invalid/export")
+            pulled.clear()
+            # The marker ends chunk 3: nothing after it is pulled from the stream.
+            matched = await rule_client.fetch("GET", "http://target.invalid/export",
+                                              matcher=BodyMatcher(["ROOT"], ignore_case=True))
+            return capped, matched
+
+    capped, matched = asyncio.run(scenario())
+    assert capped.truncated and len(capped.content) == 10_000
+    assert capped.annotate({"a": 1}) == {"a": 1, "body_truncated": True, "body_bytes_read": 10_000}
+    assert matched.match == "root" and not matched.truncated
+    assert pulled == [0, 1, 2, 3]
+
+
+def test_body_matcher_finds_markers_split_across_chunks():
+    from app.scanner.body import BodyMatcher
+
+    matcher = BodyMatcher(["/bin/bash"])
+    assert matcher.feed("root:x:0:0:root:/root:/bin/ba") is None
+    assert matcher.feed("sh\n") == "/bin/bash"
+
+
+def test_latency_histogram_percentiles_stay_within_bucket_error():
+    from app.scanner.perf import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    for q, exact in ((50, 0.5), (95, 0.95), (99, 0.99)):
+        assert exact <= histogram.percentile(q) <= exact * 1.1
+    restored = LatencyHistogram(histogram.to_dict())
+    assert restored.summary() == histogram.summary()
+    assert len(histogram.counts) < 80
+
+
+def test_perf_hooks_split_queue_wait_from_latency_and_count_timeouts():
+    from app.scanner.http import RuleClient
+    from app.scanner.perf import ScanPerf, summary
+
+    async def handler(request):
+        if request.url.path == "/hang":
+            raise httpx.ReadTimeout("timed out", request=request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, text="ok")
+
+    async def scenario():
+        perf = ScanPerf()
+        scheduler = RequestScheduler(max_in_flight=1, max_in_flight_per_host=1)
+        async with build_scan_client({}, transport=httpx.MockTransport(handler), scheduler=scheduler,
+                                     cache=ResponseCache(100, 1 << 20, 1 << 16), perf=perf) as client:
+            rule = RuleClient(client, rule_id="R1")
+            await asyncio.gather(*[rule.get(f"http://t/a?{i}") for i in range(4)])
+            await rule.get("http://t/a?0")  # cache hit
+            with pytest.raises(httpx.ReadTimeout):
+                await rule.get("http://t/hang")
+        return perf
+
+    perf = asyncio.run(scenario())
+    report = summary(ScanPerf(perf.to_dict()).to_dict())
+    assert report["cache_hits"] == 1
+    assert report["latency"]["count"] == 4
+    assert report["latency"]["timeouts"] == 1
+    assert 0.04 <= report["latency"]["p50"] <= 0.1
+    # One slot: the last of four requests waits for the three before it.
+    assert report["queue"]["max"] >= 0.14
+    assert report["rules"]["R1"]["count"] == 4
+    assert report["endpoints"]["GET /a"]["count"] == 4
+    assert report["endpoints"]["GET /hang"]["timeouts"] == 1
+
+
+def test_cassette_dedupes_bodies_and_replays_errors_in_order(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/slow":
+            raise httpx.ReadTimeout("slow", request=request)
+        return httpx.Response(200 if len(calls) % 2 else 429, content=b"same body" * 100)
+
+    path = str(tmp_path / "scan.cassette")
+    writer = CassetteWriter(path, 64, meta={"seed": 1})
+
+    async def record():
+        async with httpx.AsyncClient(transport=RecordingTransport(httpx.MockTransport(handler), writer),
+                                     base_url="http://a.test") as client:
+            for _ in range(2):
+                await client.get("/items")
+            async with client.stream("GET", "/items") as response:
+                await response.aiter_bytes().__anext__()  # rule stops early; the rest is still recorded
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get("/slow")
+
+    asyncio.run(record())
+    stats = writer.close()
+    assert stats["exchanges"] == 4
+    assert stats["bodies"] == 1 and stats["body_bytes"] == 64
+
+    async def replay(cassette):
+        transport = ReplayTransport(cassette)
+        async with httpx.AsyncClient(transport=transport, base_url="http://b.test") as client:
+            statuses = [(await client.get("/items")).status_code for _ in range(4)]
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get("/slow")
+            with pytest.raises(httpx.ConnectError):
+                await client.get("/missing")
+        return statuses, transport.misses
+
+    with Cassette(path) as cassette:
+        assert cassette.meta == {"seed": 1}
+        assert asyncio.run(replay(cassette)) == ([200, 429, 200, 200], 1)
@@ -76,6 +76,7 @@ export const getScans = () => api.get('/scans/');
 export const getScan = (id) => api.get(`/scans/${id}`);
 export const getScanResults = (id) => api.get(`/scans/${id}/results`);
 export const deleteScan = (id) => api.delete(`/scans/${id}`);
+export const cancelScan = (id) => api.post(`/scans/${id}/cancel`);
 
 export const getUsers = () => api.get('/users/');
 export const createUser = (data) => api.post('/users/', data);
@@ -16,7 +16,7 @@ import {
 } from 'lucide-react'
 import jsPDF from 'jspdf'
 import autoTable from 'jspdf-autotable'
-import { getScan, getScanResults, updateFindingStatus, downloadDocxReport } from '../api.js'
+import { getScan, getScanResults, updateFindingStatus, downloadDocxReport, cancelScan } from '../api.js'
 
 const SEVERITY = {
   critical: {
@@ -197,12 +197,17 @@ const ScanDetail = () => {
     queryKey: ['scan', id],
     queryFn: async () => (await getScan(id)).data,
     enabled: !!id,
+    refetchInterval: (query) =>
+      ['pending', 'running'].includes(query.state.data?.status) ? 5000 : false,
   })
 
+  // Findings are stored as each rule finishes, so keep polling while the scan runs.
+  const scanActive = ['pending', 'running'].includes(scan?.status)
   const { data: results, isLoading: resultsLoading, refetch: refetchResults } = useQuery({
     queryKey: ['scan-results', id],
     queryFn: async () => (await getScanResults(id)).data,
     enabled: !!id,
+    refetchInterval: scanActive ? 5000 : false,
   })
 
   const statusMutation = useMutation({
@@ -215,6 +220,16 @@ const ScanDetail = () => {
     },
   })
 
+  const cancelMutation = useMutation({
+    mutationFn: () => cancelScan(id),
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ['scan', id] })
+    },
+    onError: (err) => {
+      alert(err.response?.data?.detail || 'Failed to cancel scan')
+    },
+  })
+
   const handleStatusChange = (resultId, status) => {
     statusMutation.mutate({ resultId, status })
   }
@@ -429,8 +444,11 @@ const ScanDetail = () => {
                       : 'bg-gray-100 text-gray-600'
                   }`}
                 >
-                  {scan?.status}
+                  {scan?.status?.replace('_', ' ')}
                 </span>
+                {scan?.status_reason && (
+                  <span className="text-xs text-gray-500">{scan.status_reason}</span>
+                )}
                 {scan?.created_at && (
                   <span className="text-xs text-gray-400">
                     {new Date(scan.created_at).toLocaleString()}
@@ -441,6 +459,26 @@ const ScanDetail = () => {
                     {results.length} total finding{results.length !== 1 ? 's' : ''}
                   </span>
                 )}
+                {scan?.traffic?.total && (
+                  <span className="text-xs text-gray-400">
+                    {scan.traffic.total.requests} requests
+                    {scan.traffic.max_requests ? ` of ${scan.traffic.max_requests}` : ''}
+                    {' · '}{(scan.traffic.total.bytes / 1024).toFixed(0)} KiB
+                    {' · '}{scan.traffic.total.errors} errors
+                  </span>
+                )}
+                {scan?.plan && (
+                  <span className="text-xs text-gray-400" title="Planned before the scan started">
+                    {scan.plan.units} units · {scan.plan.unique_probes} planned probes
+                    {scan.plan.probes > scan.plan.unique_probes ? ` (${scan.plan.probes - scan.plan.unique_probes} shared)` : ''}
+                  </span>
+                )}
+                {scan?.diff && (
+                  <span className="text-xs text-gray-400" title="Incremental rescan: only added and changed endpoints were scanned">
+                    vs scan #{scan.diff.baseline_scan_id}: {scan.diff.added} added · {scan.diff.changed} changed
+                    {' · '}{scan.diff.removed} removed · {scan.diff.carried_findings} findings carried
+                  </span>
+                )}
               </div>
             </>
           )}
@@ -589,10 +627,22 @@ const ScanDetail = () => {
       {scan?.status === 'running' && (
         <div className="bg-blue-50 border border-blue-200 rounded-lg p-4 flex items-center gap-3">
           <Clock className="w-5 h-5 text-blue-500 shrink-0" />
-          <div>
-            <p className="text-sm font-semibold text-blue-800">Scan in progress</p>
-            <p className="text-xs text-blue-600">Results will appear here as the scanner finds issues. Refresh to see updates.</p>
+          <div className="flex-1">
+            <p className="text-sm font-semibold text-blue-800">
+              {scan.cancel_requested_at ? 'Cancelling scan…' : 'Scan in progress'}
+            </p>
+            <p className="text-xs text-blue-600">Results will appear here as each check completes.</p>
           </div>
+          {!scan.cancel_requested_at && (
+            <button
+              onClick={() => cancelMutation.mutate()}
+              disabled={cancelMutation.isPending}
+              className="flex items-center gap-1.5 text-xs font-medium px-3 py-1.5 rounded-md border border-blue-300 text-blue-700 hover:bg-blue-100 disabled:opacity-50"
+            >
+              <XCircle className="w-3.5 h-3.5" />
+              Cancel scan
+            </button>
+          )}
         </div>
       )}
     </div>
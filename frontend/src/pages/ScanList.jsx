@@ -18,6 +18,8 @@ const STATUS_ICON = {
   running: <Clock className="w-3.5 h-3.5 text-blue-500 animate-spin" />,
   failed: <XCircle className="w-3.5 h-3.5 text-red-500" />,
   pending: <AlertCircle className="w-3.5 h-3.5 text-gray-400" />,
+  cancelled: <XCircle className="w-3.5 h-3.5 text-amber-500" />,
+  timed_out: <Clock className="w-3.5 h-3.5 text-amber-500" />,
 }
 
 const STATUS_DOT = {
@@ -25,6 +27,8 @@ const STATUS_DOT = {
   running: 'bg-blue-500 animate-pulse',
   failed: 'bg-red-500',
   pending: 'bg-gray-400',
+  cancelled: 'bg-amber-500',
+  timed_out: 'bg-amber-500',
 }
 
 const STATUS_BADGE = {
@@ -32,6 +36,8 @@ const STATUS_BADGE = {
   running: 'bg-blue-100 text-blue-700',
   failed: 'bg-red-100 text-red-700',
   pending: 'bg-gray-100 text-gray-600',
+  cancelled: 'bg-amber-100 text-amber-700',
+  timed_out: 'bg-amber-100 text-amber-700',
 }
 
 const ScanCard = ({ scan, onDelete, deleteLoading }) => {